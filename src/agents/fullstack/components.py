@@ -3,6 +3,11 @@ from typing import Tuple, List, Optional
 from src.core.interfaces import IFileSystem, IExecutor
 from src.core.models import Step
 from src.core.logger import logger
+from src.core.config import settings
+from src.core.memory.context_packing import pack_context, render_context
+from src.core.memory.index_queue import schedule_indexing
+from src.core.memory.symbol_index import get_symbol_index
+from src.core.memory.watcher import is_watched
 
 class CommandParser:
     """Responsável por analisar strings de comando e identificar o tipo de ação."""
@@ -79,10 +84,12 @@ class PromptBuilder:
         return self.SYSTEM_PROMPT
 
     def build_context(self, step: Step, history: str, task_input: str = None) -> str:
-        # 1. Indexação (se disponível)
-        if self.indexer:
+        # 1. Indexação (se disponível): enfileirada fora do caminho crítico.
+        #    Cobre mudanças feitas por comandos do sandbox, que não passam pelo ResponseHandler.
+        #    Com o watcher ativo essas mudanças já chegam à fila; a varredura completa é dispensada.
+        if self.indexer and not is_watched(self.indexer.project):
             try:
-                self.indexer.index_workspace()
+                schedule_indexing(self.indexer, wait_timeout=settings.INDEX_WAIT_TIMEOUT_SECONDS)
             except Exception as e:
                 logger.warning(f"Failed to index workspace: {e}")
 
@@ -90,25 +97,45 @@ class PromptBuilder:
         rag_context = ""
         if self.memory:
             try:
-                # [MODIFICADO] Reduzido k para 2 para focar no essencial
-                hits = self.memory.search(step.description, k=2)
-                for txt, meta in hits:
-                    # [NOVO] Truncagem de segurança para arquivos grandes (ex: 3000 caracteres)
-                    content_preview = txt[:3000] + "\n...[restante truncado]..." if len(txt) > 3000 else txt
-                    rag_context += f"\nFile: {meta.get('source', 'unknown')}\n{content_preview}\n"
+                # Só trechos do próprio projeto: outros workspaces indexados não entram no contexto
+                project = self.indexer.project if self.indexer else None
+                # Trechos abaixo da similaridade mínima não entram: melhor nenhum contexto que contexto irrelevante
+                # Descrições amplas do Tech Lead: primeiro os arquivos (tabela de resumos), depois os trechos
+                hits = self.memory.search(
+                    step.description,
+                    k=settings.CONTEXT_SEARCH_K,
+                    project=project,
+                    min_score=settings.CONTEXT_MIN_SIMILARITY,
+                    mmr=settings.CONTEXT_MMR,
+                    file_shortlist=settings.CONTEXT_FILE_SHORTLIST,
+                )
+                # Mescla trechos vizinhos do mesmo arquivo, remove duplicatas e respeita o orçamento
+                rag_context = render_context(pack_context(hits))
             except Exception as e:
                 logger.warning(f"Failed to search memory: {e}")
 
+        # 3. Definições citadas no passo: consulta exata à tabela de símbolos (sem embedding)
+        if self.indexer:
+            try:
+                definitions = get_symbol_index(self.indexer.manifest).mentioned_in(
+                    step.description, limit=settings.CONTEXT_MAX_SYMBOLS
+                )
+                if definitions:
+                    rag_context += "\nDEFINITIONS:\n" + "\n".join(d.describe() for d in definitions) + "\n"
+            except Exception as e:
+                logger.warning(f"Failed to look up symbols: {e}")
+
         extra_input = f"\nADDITIONAL INPUT/FEEDBACK:\n{task_input}" if task_input else ""
         return f"TASK: {step.description}{extra_input}\n\nCONTEXT:\n{rag_context}\n\n{history}"
 
 class ResponseHandler:
     """Responsável por executar as ações ditadas pela resposta do LLM (Files + Commands)."""
 
-    def __init__(self, file_system: IFileSystem, executor: IExecutor, parser: CommandParser = None):
+    def __init__(self, file_system: IFileSystem, executor: IExecutor, parser: CommandParser = None, indexer=None):
         self.fs = file_system
         self.executor = executor
         self.parser = parser or CommandParser()
+        self.indexer = indexer
 
     def handle(self, data: dict) -> Tuple[str, List[str], bool]:
         """
@@ -141,6 +168,13 @@ class ResponseHandler:
                     saved.append(f["filename"])
                 except Exception as e:
                     logger.error(f"Failed to write file {f.get('filename')}: {e}")
+
+        # Agenda a reindexação já com as escritas desta resposta (pedidos em rajada são coalescidos)
+        if saved and self.indexer:
+            try:
+                schedule_indexing(self.indexer, paths=saved)
+            except Exception as e:
+                logger.warning(f"Failed to schedule indexing: {e}")
         return saved
 
     def _execute_command(self, cmd_type: str, content: str) -> Tuple[str, bool]:
@@ -29,6 +29,86 @@ class Settings(BaseSettings):
 
     # Vector DB
     PGVECTOR_COLLECTION_NAME: str = "code_collection"
+    # Diretório (fora do workspace) onde ficam os manifestos de indexação incremental
+    INDEX_STATE_DIR: str = "./.index_state"
+    # Indexação: "background" (fila em thread, fora do caminho crítico) ou "sync"
+    INDEX_QUEUE_MODE: Literal["background", "sync"] = "background"
+    # Tempo sem novas escritas antes de rodar a passada de indexação agrupada
+    INDEX_DEBOUNCE_SECONDS: float = 0.5
+    # Quanto o PromptBuilder espera por um índice atualizado antes de buscar (0 = aceita dados antigos)
+    INDEX_WAIT_TIMEOUT_SECONDS: float = 0.0
+    # Watcher do workspace (watchdog se instalado, senão polling) alimentando a indexação incremental
+    INDEX_WATCH_ENABLED: bool = False
+    INDEX_WATCH_BACKEND: Literal["auto", "watchdog", "polling"] = "auto"
+    INDEX_WATCH_POLL_SECONDS: float = 2.0
+    # Chunking: símbolos de código até CODE_CHUNK_MAX_CHARS viram um chunk só; vizinhos menores
+    # que CODE_CHUNK_MIN_CHARS são agrupados. Texto (e símbolos gigantes) usa divisão com overlap.
+    CODE_CHUNK_MAX_CHARS: int = 1500
+    CODE_CHUNK_MIN_CHARS: int = 200
+    TEXT_CHUNK_SIZE: int = 500
+    TEXT_CHUNK_OVERLAP: int = 50
+    # Indexação em fluxo: chunks por lote de embedding/escrita e threads de leitura de arquivos
+    INDEX_BATCH_SIZE: int = 64
+    INDEX_READ_WORKERS: int = 4
+    # Em workspaces git, descobre arquivos alterados via git diff/ls-files em vez de percorrer a árvore
+    INDEX_GIT_CHANGE_DETECTION: bool = True
+    # Tabela de resumos por arquivo (caminho, símbolos públicos, docstring) usada pela busca em
+    # dois níveis: primeiro os arquivos, depois os chunks só desses arquivos
+    INDEX_FILE_SUMMARIES: bool = True
+    # Filtros de arquivos do indexador: .gitignore/.aiignore, tamanho máximo e linhas de bundle minificado
+    INDEX_RESPECT_GITIGNORE: bool = True
+    INDEX_MAX_FILE_BYTES: int = 262144
+    INDEX_MAX_LINE_LENGTH: int = 1000
+    # Backend da memória vetorial: "pgvector" (Postgres) ou "numpy" (matriz memory-mapped por projeto,
+    # em processo; bom para workspaces pequenos, execuções offline e CI sem Postgres)
+    VECTOR_STORE_BACKEND: Literal["pgvector", "numpy"] = "pgvector"
+    # Diretório dos arquivos do backend numpy (padrão: <INDEX_STATE_DIR>/vectors) e precisão dos vetores
+    NUMPY_STORE_DIR: Optional[str] = None
+    NUMPY_STORE_DTYPE: Literal["float32", "float16"] = "float32"
+    # Dimensão dos embeddings; se vazio é detectada a partir do modelo configurado
+    EMBEDDING_DIMENSION: Optional[int] = None
+    # Índice ANN da coluna 'embedding' (pgvector)
+    VECTOR_INDEX_TYPE: Literal["hnsw", "ivfflat", "none"] = "hnsw"
+    VECTOR_INDEX_HNSW_M: int = 16
+    VECTOR_INDEX_HNSW_EF_CONSTRUCTION: int = 64
+    VECTOR_INDEX_IVFFLAT_LISTS: int = 100
+    # Parâmetros padrão por consulta (podem ser sobrescritos em VectorMemory.search)
+    VECTOR_SEARCH_EF_SEARCH: int = 40
+    VECTOR_SEARCH_PROBES: int = 10
+    # Varredura iterativa do índice em buscas filtradas por projeto (requer pgvector >= 0.8).
+    # "auto" usa relaxed_order quando o pgvector instalado suporta e "off" caso contrário
+    VECTOR_SEARCH_ITERATIVE_SCAN: Literal["auto", "off", "relaxed_order", "strict_order"] = "auto"
+    # Sem varredura iterativa, buscas filtradas multiplicam ef_search/probes para compensar o filtro
+    VECTOR_SEARCH_FILTERED_MULTIPLIER: int = 4
+    # Modo de busca: "vector" (só embeddings, o comportamento original), "lexical" (tsvector, sem
+    # chamada de embedding) ou "hybrid" (opcional: ambos fundidos por RRF; cai para lexical se o
+    # provedor de embeddings falhar)
+    VECTOR_SEARCH_MODE: Literal["vector", "lexical", "hybrid"] = "vector"
+    HYBRID_RRF_K: int = 60
+    # Candidatos buscados por cada lado antes da fusão (múltiplo de k)
+    HYBRID_CANDIDATE_MULTIPLIER: int = 4
+    # Peso da relevância (vs. diversidade) no MMR de VectorMemory.search(mmr=True)
+    SEARCH_MMR_LAMBDA: float = 0.5
+    # Contexto RAG do Fullstack/search_codebase: similaridade mínima (cosseno) para um trecho
+    # entrar no prompt (opcional; vazio = sem limite, o comportamento original; não vale para o
+    # ts_rank_cd do modo lexical) e seleção diversificada por MMR
+    CONTEXT_MIN_SIMILARITY: Optional[float] = None
+    CONTEXT_MMR: bool = False
+    # Busca em dois níveis do contexto (opcional): arquivos pré-selecionados pela tabela de resumos
+    # antes da busca de chunks (0 = desliga e busca em todos os chunks do projeto, como antes)
+    CONTEXT_FILE_SHORTLIST: int = 0
+    # Definições (tabela de símbolos) dos nomes citados no passo que entram no contexto
+    CONTEXT_MAX_SYMBOLS: int = 10
+    # Hits buscados para o contexto (2, como antes do empacotamento) e orçamento do contexto
+    # empacotado (caracteres; ~4 por token). Trechos vizinhos/sobrepostos do mesmo arquivo são
+    # mesclados antes de gastar o orçamento.
+    CONTEXT_SEARCH_K: int = 2
+    CONTEXT_MAX_CHARS: int = 6000
+    # Cache (LRU + TTL) de embeddings de consultas e de resultados de busca; os resultados são
+    # indexados pela versão do índice e deixam de valer quando o indexador a incrementa
+    SEARCH_CACHE_ENABLED: bool = True
+    SEARCH_CACHE_MAX_ITEMS: int = 1024
+    SEARCH_CACHE_TTL_SECONDS: float = 600.0
 
     # LLM Global Configuration
     LLM_PROVIDER: Literal["google", "ollama", "local"] = "google"
@@ -38,6 +118,26 @@ class Settings(BaseSettings):
     GOOGLE_API_KEYS: Union[List[str], str] = Field(default=[])
     GOOGLE_RPM: int = Field(default=20)
     REQUEST_DELAY_SECONDS: float = Field(default=0.0)
+    # Lê as respostas do LLM como stream de tokens; chamadas estruturadas param de ler (e fecham
+    # a conexão) assim que o objeto JSON de nível superior fecha
+    LLM_STREAMING: bool = False
+    # Cache de respostas do LLM por conteúdo (provider, model, temperature, system, prompt, schema).
+    # Ligado, vale para chamadas determinísticas (temperature <= LLM_CACHE_MAX_TEMPERATURE); cache=False
+    # por chamada ignora. Backends além do LRU em memória: redis (compartilhado) ou disk
+    # (padrão: <INDEX_STATE_DIR>/llm_cache, limitado por LLM_CACHE_DISK_MAX_BYTES)
+    LLM_CACHE_ENABLED: bool = False
+    LLM_CACHE_BACKEND: Literal["memory", "redis", "disk"] = "memory"
+    LLM_CACHE_MAX_TEMPERATURE: float = 0.2
+    LLM_CACHE_MAX_ITEMS: int = 512
+    LLM_CACHE_TTL_SECONDS: float = 86400.0
+    LLM_CACHE_DIR: Optional[str] = None
+    LLM_CACHE_DISK_MAX_BYTES: int = 256 * 1024 * 1024
+    # Memória da estratégia de saída estruturada por (provider, model, schema): depois que a nativa
+    # falha e o parsing manual funciona, as chamadas seguintes vão direto ao parsing manual até o
+    # próximo re-probe. Arquivo padrão: <INDEX_STATE_DIR>/structured_strategies.json
+    STRUCTURED_STRATEGY_MEMORY: bool = True
+    STRUCTURED_STRATEGY_REPROBE_SECONDS: float = 86400.0
+    STRUCTURED_STRATEGY_FILE: Optional[str] = None
 
     @field_validator("GOOGLE_API_KEYS", mode="before")
     @classmethod
@@ -59,6 +159,16 @@ class Settings(BaseSettings):
     EMBEDDING_PROVIDER: Literal["google", "ollama", "local"] = "google"
     GOOGLE_EMBEDDING_MODEL: str = "embedding-001"
 
+    # Cache de embeddings por conteúdo (provider, model, sha256(texto))
+    EMBEDDING_CACHE_ENABLED: bool = True
+    # "postgres" (opcional) persiste o cache na tabela EMBEDDING_CACHE_TABLE, usando o engine do processo
+    EMBEDDING_CACHE_BACKEND: Literal["memory", "postgres"] = "memory"
+    # LRU em memória por processo, em float32: ~3 KB por vetor de 768 dimensões, ~12 KB com 3072.
+    # Vale o limite que for atingido primeiro (itens ou bytes)
+    EMBEDDING_CACHE_MAX_ITEMS: int = 5000
+    EMBEDDING_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    EMBEDDING_CACHE_TABLE: str = "embedding_cache"
+
     # Ollama / Local specific
     OLLAMA_BASE_URL: Optional[str] = None
     OLLAMA_EMBEDDING_URL: Optional[str] = None
@@ -67,6 +177,12 @@ class Settings(BaseSettings):
 
     # Generic Local LLM (LM Studio, etc)
     LOCAL_LLM_BASE_URL: Optional[str] = None
+    # Transporte HTTP dos clientes locais (chat e embeddings): conexões keep-alive por URL base.
+    # POOL_SIZE = conexões ociosas mantidas por origem; TIMEOUT = espera pela resposta
+    LOCAL_HTTP_POOL_SIZE: int = 8
+    LOCAL_HTTP_TIMEOUT_SECONDS: float = 600.0
+    LOCAL_HTTP_CONNECT_TIMEOUT_SECONDS: float = 10.0
+    LOCAL_HTTP_IDLE_TIMEOUT_SECONDS: float = 30.0
 
     # Workspace
     LOCAL_WORKSPACE_PATH: str = "./workspace"
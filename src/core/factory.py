@@ -7,6 +7,7 @@ from src.tools.file_io import FileIOTool
 from src.tools.secure_executor import SecureExecutorTool
 from src.core.memory.vector_store import VectorMemory
 from src.core.memory.indexer import CodeIndexer
+from src.core.memory.watcher import watch_workspace
 
 # Agents
 from src.agents.tech_lead.agent import TechLeadAgent
@@ -54,13 +55,15 @@ class AgentFactory:
                 try:
                     memory = VectorMemory()
                     indexer = CodeIndexer(workspace_path=project_path)
+                    if settings.INDEX_WATCH_ENABLED:
+                        watch_workspace(indexer)
                     logger.info("Vector Memory initialized in Factory.")
                 except Exception as e:
                     logger.error(f"Failed to initialize Vector Memory in Factory: {e}")
 
             # Components
             prompt_builder = PromptBuilder(memory=memory, indexer=indexer)
-            response_handler = ResponseHandler(file_system=file_io, executor=executor)
+            response_handler = ResponseHandler(file_system=file_io, executor=executor, indexer=indexer)
 
             return FullstackAgent(
                 llm=llm,
@@ -1,6 +1,7 @@
+import asyncio
 import threading
 import time
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from src.core.config import settings
 from src.core.logger import logger
 
@@ -37,27 +38,48 @@ class ApiKeyManager:
             self.current_index = 0
             self._initialized = True
 
-    def get_next_key(self) -> Optional[str]:
+    def _reserve_key(self) -> Tuple[str, float]:
         """
-        Obtains the next key and ensures rate limiting.
+        Reserves the next request slot and key; returns (key, seconds to wait before using it).
+        The wait happens outside the lock, so other callers are not blocked while one sleeps.
         """
-        if not self.keys:
-            return None
-
         with self._lock:
             # --- Rate Limiter Logic ---
-            elapsed = time.time() - self.last_request_time
-            if elapsed < self.delay_between_requests:
-                sleep_time = self.delay_between_requests - elapsed
-                logger.debug(f"Rate limit: sleeping for {sleep_time:.2f}s")
-                time.sleep(sleep_time)
-
-            self.last_request_time = time.time()
+            now = time.time()
+            slot = max(now, self.last_request_time + self.delay_between_requests)
+            self.last_request_time = slot
             # -----------------------------
 
             key = self.keys[self.current_index]
             self.current_index = (self.current_index + 1) % len(self.keys)
 
-            return key
+            return key, slot - now
+
+    def get_next_key(self) -> Optional[str]:
+        """
+        Obtains the next key and ensures rate limiting.
+        """
+        if not self.keys:
+            return None
+
+        key, wait = self._reserve_key()
+        if wait > 0:
+            logger.debug(f"Rate limit: sleeping for {wait:.2f}s")
+            time.sleep(wait)
+        return key
+
+    async def aget_next_key(self) -> Optional[str]:
+        """
+        Async variant of get_next_key: waits for the rate-limit slot with asyncio.sleep,
+        without blocking the event loop.
+        """
+        if not self.keys:
+            return None
+
+        key, wait = self._reserve_key()
+        if wait > 0:
+            logger.debug(f"Rate limit: waiting {wait:.2f}s")
+            await asyncio.sleep(wait)
+        return key
 
 key_manager = ApiKeyManager()
@@ -0,0 +1,390 @@
+import io
+import ssl
+import json
+import time
+import asyncio
+import weakref
+import threading
+import http.client
+import urllib.error
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+from src.core.config import settings
+from src.core.logger import logger
+
+# (esquema, host, porta)
+Origin = Tuple[str, str, int]
+
+# Erros de uma conexão ociosa que o servidor/proxy já fechou: a requisição nem chegou a ser processada
+_STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+_ASYNC_STALE_CONNECTION_ERRORS = (ConnectionError, asyncio.IncompleteReadError)
+_ASYNC_ERRORS = (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError)
+_READ_SIZE = 65536
+
+
+class PooledHTTPTransport:
+    """
+    Transporte HTTP(S) com conexões persistentes (keep-alive), compartilhado e thread-safe.
+
+    Mantém até `pool_size` conexões ociosas por origem (esquema, host, porta); cada requisição
+    pega uma conexão ociosa ou abre uma nova, e a devolve ao pool quando a resposta foi lida por
+    inteiro. Conexões ociosas há mais de `idle_timeout` segundos são descartadas (proxies reversos
+    costumam fechá-las), e uma conexão reaproveitada que o servidor já fechou é refeita uma vez.
+    Erros seguem as exceções do urllib (URLError / HTTPError), como o urlopen que ele substitui.
+    """
+
+    def __init__(
+        self,
+        pool_size: Optional[int] = None,
+        timeout: Optional[float] = None,
+        connect_timeout: Optional[float] = None,
+        idle_timeout: Optional[float] = None,
+    ):
+        self.pool_size = pool_size if pool_size is not None else settings.LOCAL_HTTP_POOL_SIZE
+        self.timeout = timeout if timeout is not None else settings.LOCAL_HTTP_TIMEOUT_SECONDS
+        self.connect_timeout = connect_timeout if connect_timeout is not None else settings.LOCAL_HTTP_CONNECT_TIMEOUT_SECONDS
+        self.idle_timeout = idle_timeout if idle_timeout is not None else settings.LOCAL_HTTP_IDLE_TIMEOUT_SECONDS
+        self._idle: Dict[Origin, List[Tuple[http.client.HTTPConnection, float]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _split(url: str) -> Tuple[Origin, str]:
+        parts = urlsplit(url)
+        scheme = parts.scheme or "http"
+        port = parts.port or (443 if scheme == "https" else 80)
+        path = parts.path or "/"
+        if parts.query:
+            path += f"?{parts.query}"
+        return (scheme, parts.hostname or "localhost", port), path
+
+    def _connect(self, origin: Origin) -> http.client.HTTPConnection:
+        scheme, host, port = origin
+        connection_class = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        conn = connection_class(host, port, timeout=self.connect_timeout)
+        conn.connect()
+        # Conectar tem prazo curto; a resposta de um LLM pode demorar bem mais
+        conn.sock.settimeout(self.timeout)
+        return conn
+
+    def _acquire(self, origin: Origin) -> Tuple[http.client.HTTPConnection, bool]:
+        """Retorna (conexão, reaproveitada)."""
+        now = time.monotonic()
+        with self._lock:
+            idle = self._idle.get(origin, [])
+            while idle:
+                conn, released_at = idle.pop()
+                if now - released_at < self.idle_timeout:
+                    return conn, True
+                conn.close()
+        return self._connect(origin), False
+
+    def _release(self, origin: Origin, conn: http.client.HTTPConnection):
+        with self._lock:
+            idle = self._idle.setdefault(origin, [])
+            if len(idle) < self.pool_size:
+                idle.append((conn, time.monotonic()))
+                return
+        conn.close()
+
+    def idle_connections(self, url: str) -> int:
+        origin, _ = self._split(url)
+        with self._lock:
+            return len(self._idle.get(origin, []))
+
+    def close(self):
+        with self._lock:
+            pools = list(self._idle.values())
+            self._idle.clear()
+        for pool in pools:
+            for conn, _ in pool:
+                conn.close()
+
+    def _send(self, origin: Origin, url: str, path: str, body: bytes, headers: dict):
+        for attempt in range(2):
+            try:
+                conn, reused = self._acquire(origin)
+            except (OSError, http.client.HTTPException) as e:
+                raise urllib.error.URLError(e)
+            try:
+                conn.request("POST", path, body=body, headers=headers)
+                return conn, conn.getresponse()
+            except _STALE_CONNECTION_ERRORS as e:
+                conn.close()
+                if reused and attempt == 0:
+                    logger.debug(f"Conexão keep-alive com {url} foi fechada pelo servidor; reconectando.")
+                    continue
+                raise urllib.error.URLError(e)
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                raise urllib.error.URLError(e)
+
+    @contextmanager
+    def post(self, url: str, payload: dict, headers: Optional[dict] = None) -> Iterator[http.client.HTTPResponse]:
+        """
+        POST com corpo JSON. Produz a resposta (status < 400) para leitura; ao sair, a conexão volta
+        ao pool se a resposta foi lida até o fim, senão é fechada (ex: leitura interrompida no meio).
+        """
+        origin, path = self._split(url)
+        body = json.dumps(payload).encode("utf-8")
+        headers = {"Content-Type": "application/json", **(headers or {}), "Content-Length": str(len(body))}
+        conn, response = self._send(origin, url, path, body, headers)
+        reusable = False
+        try:
+            if response.status >= 400:
+                data = response.read()
+                raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, io.BytesIO(data))
+            yield response
+            reusable = response.isclosed() and not response.will_close
+        except urllib.error.URLError:
+            raise
+        except (OSError, http.client.HTTPException) as e:
+            raise urllib.error.URLError(e)
+        finally:
+            if reusable:
+                self._release(origin, conn)
+            else:
+                conn.close()
+
+    def post_json(self, url: str, payload: dict, headers: Optional[dict] = None) -> dict:
+        with self.post(url, payload, headers) as response:
+            return json.loads(response.read())
+
+
+class AsyncHTTPResponse:
+    """
+    Resposta HTTP/1.1 lida de um StreamReader do asyncio: corpo com Content-Length, chunked ou até
+    o fim da conexão. `read()` lê o restante do corpo; `lines()` produz o corpo linha a linha (SSE).
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, status: int, reason: str, headers: Dict[str, str], version: str, timeout: float):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self._reader = reader
+        self._timeout = timeout
+        self._chunked = "chunked" in headers.get("transfer-encoding", "").lower()
+        length = headers.get("content-length")
+        self._remaining = int(length) if length is not None and not self._chunked else None
+        connection = headers.get("connection", "").lower()
+        self.will_close = (
+            connection == "close"
+            or (version == "HTTP/1.0" and connection != "keep-alive")
+            or (not self._chunked and self._remaining is None)
+        )
+        self.done = self._remaining == 0
+
+    async def _io(self, awaitable):
+        return await asyncio.wait_for(awaitable, self._timeout)
+
+    async def _read_piece(self) -> bytes:
+        """Próximo pedaço do corpo; b"" no fim."""
+        if self.done:
+            return b""
+        if self._chunked:
+            size_line = await self._io(self._reader.readline())
+            if not size_line:
+                raise asyncio.IncompleteReadError(b"", None)
+            size = int(size_line.split(b";", 1)[0].strip(), 16)
+            if size == 0:
+                # Trailers (normalmente nenhum) até a linha em branco final
+                while (await self._io(self._reader.readline())).strip():
+                    pass
+                self.done = True
+                return b""
+            data = await self._io(self._reader.readexactly(size + 2))
+            return data[:-2]
+        if self._remaining is not None:
+            data = await self._io(self._reader.read(min(self._remaining, _READ_SIZE)))
+            if not data:
+                raise asyncio.IncompleteReadError(b"", self._remaining)
+            self._remaining -= len(data)
+            self.done = self._remaining == 0
+            return data
+        data = await self._io(self._reader.read(_READ_SIZE))
+        self.done = not data
+        return data
+
+    async def read(self) -> bytes:
+        pieces = []
+        while not self.done:
+            pieces.append(await self._read_piece())
+        return b"".join(pieces)
+
+    async def lines(self) -> AsyncIterator[bytes]:
+        buffer = b""
+        while not self.done:
+            buffer += await self._read_piece()
+            *complete, buffer = buffer.split(b"\n")
+            for line in complete:
+                yield line + b"\n"
+        if buffer:
+            yield buffer
+
+
+class AsyncPooledHTTPTransport:
+    """
+    Equivalente assíncrono do PooledHTTPTransport (asyncio streams, sem dependências novas): muitas
+    requisições concorrentes num único event loop, sem uma thread bloqueada por requisição. Mesmo
+    pool keep-alive por origem, mesmos timeouts e as mesmas exceções do urllib. Conexões do asyncio
+    pertencem a um event loop: use get_async_http_transport(), que mantém um transporte por loop.
+    """
+
+    def __init__(
+        self,
+        pool_size: Optional[int] = None,
+        timeout: Optional[float] = None,
+        connect_timeout: Optional[float] = None,
+        idle_timeout: Optional[float] = None,
+    ):
+        self.pool_size = pool_size if pool_size is not None else settings.LOCAL_HTTP_POOL_SIZE
+        self.timeout = timeout if timeout is not None else settings.LOCAL_HTTP_TIMEOUT_SECONDS
+        self.connect_timeout = connect_timeout if connect_timeout is not None else settings.LOCAL_HTTP_CONNECT_TIMEOUT_SECONDS
+        self.idle_timeout = idle_timeout if idle_timeout is not None else settings.LOCAL_HTTP_IDLE_TIMEOUT_SECONDS
+        self._idle: Dict[Origin, List[Tuple[asyncio.StreamReader, asyncio.StreamWriter, float]]] = {}
+
+    async def _connect(self, origin: Origin) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        scheme, host, port = origin
+        context = ssl.create_default_context() if scheme == "https" else None
+        return await asyncio.wait_for(asyncio.open_connection(host, port, ssl=context), self.connect_timeout)
+
+    async def _acquire(self, origin: Origin) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter, bool]:
+        """Retorna (reader, writer, reaproveitada). Sem lock: o pool só é usado de dentro do seu loop."""
+        now = time.monotonic()
+        idle = self._idle.get(origin, [])
+        while idle:
+            reader, writer, released_at = idle.pop()
+            if now - released_at < self.idle_timeout and not reader.at_eof():
+                return reader, writer, True
+            writer.close()
+        reader, writer = await self._connect(origin)
+        return reader, writer, False
+
+    def _release(self, origin: Origin, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        idle = self._idle.setdefault(origin, [])
+        if len(idle) < self.pool_size:
+            idle.append((reader, writer, time.monotonic()))
+            return
+        writer.close()
+
+    def idle_connections(self, url: str) -> int:
+        origin, _ = PooledHTTPTransport._split(url)
+        return len(self._idle.get(origin, []))
+
+    def close(self):
+        pools = list(self._idle.values())
+        self._idle.clear()
+        for pool in pools:
+            for _, writer, _ in pool:
+                writer.close()
+
+    async def _read_head(self, reader: asyncio.StreamReader) -> AsyncHTTPResponse:
+        status_line = await reader.readline()
+        if not status_line:
+            # Equivalente ao RemoteDisconnected do http.client: conexão ociosa fechada pelo servidor
+            raise ConnectionResetError("Remote end closed connection without response")
+        version, status, *reason = status_line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if not line.strip():
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return AsyncHTTPResponse(reader, int(status), reason[0] if reason else "", headers, version, self.timeout)
+
+    async def _send(self, origin: Origin, url: str, request: bytes):
+        for attempt in range(2):
+            try:
+                reader, writer, reused = await self._acquire(origin)
+            except _ASYNC_ERRORS as e:
+                raise urllib.error.URLError(e)
+            try:
+                writer.write(request)
+                await writer.drain()
+                response = await asyncio.wait_for(self._read_head(reader), self.timeout)
+                return reader, writer, response
+            except _ASYNC_STALE_CONNECTION_ERRORS as e:
+                writer.close()
+                if reused and attempt == 0:
+                    logger.debug(f"Conexão keep-alive com {url} foi fechada pelo servidor; reconectando.")
+                    continue
+                raise urllib.error.URLError(e)
+            except (*_ASYNC_ERRORS, ValueError) as e:
+                # ValueError: linha de status/cabeçalhos malformada
+                writer.close()
+                raise urllib.error.URLError(e)
+
+    @asynccontextmanager
+    async def post(self, url: str, payload: dict, headers: Optional[dict] = None) -> AsyncIterator[AsyncHTTPResponse]:
+        """Como PooledHTTPTransport.post: a conexão volta ao pool só se o corpo foi lido até o fim."""
+        origin, path = PooledHTTPTransport._split(url)
+        scheme, host, port = origin
+        body = json.dumps(payload).encode("utf-8")
+        default_port = 443 if scheme == "https" else 80
+        headers = {
+            "Host": host if port == default_port else f"{host}:{port}",
+            "Content-Type": "application/json",
+            **(headers or {}),
+            "Content-Length": str(len(body)),
+        }
+        head = f"POST {path} HTTP/1.1\r\n" + "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+        reader, writer, response = await self._send(origin, url, head.encode("latin-1") + b"\r\n" + body)
+        reusable = False
+        try:
+            if response.status >= 400:
+                data = await response.read()
+                raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, io.BytesIO(data))
+            yield response
+            reusable = response.done and not response.will_close
+        except urllib.error.URLError:
+            raise
+        except _ASYNC_ERRORS as e:
+            raise urllib.error.URLError(e)
+        finally:
+            if reusable:
+                self._release(origin, reader, writer)
+            else:
+                writer.close()
+
+    async def post_json(self, url: str, payload: dict, headers: Optional[dict] = None) -> dict:
+        async with self.post(url, payload, headers) as response:
+            return json.loads(await response.read())
+
+
+_transport: Optional[PooledHTTPTransport] = None
+_transport_lock = threading.Lock()
+
+
+def get_http_transport() -> PooledHTTPTransport:
+    """Transporte compartilhado pelo processo (LocalOpenAIClient e LocalOpenAIEmbeddings)."""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = PooledHTTPTransport()
+        return _transport
+
+
+def reset_http_transport():
+    """Fecha as conexões ociosas e descarta os transportes (ex: após mudar as configurações, em testes)."""
+    global _transport
+    with _transport_lock:
+        transport, _transport = _transport, None
+    if transport is not None:
+        transport.close()
+    for async_transport in list(_async_transports.values()):
+        async_transport.close()
+    _async_transports.clear()
+
+
+# Um transporte assíncrono por event loop (conexões do asyncio não podem mudar de loop)
+_async_transports: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncPooledHTTPTransport]" = weakref.WeakKeyDictionary()
+
+
+def get_async_http_transport() -> AsyncPooledHTTPTransport:
+    """Transporte assíncrono compartilhado pelo event loop em execução."""
+    loop = asyncio.get_running_loop()
+    transport = _async_transports.get(loop)
+    if transport is None:
+        transport = _async_transports[loop] = AsyncPooledHTTPTransport()
+    return transport
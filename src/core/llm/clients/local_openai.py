@@ -1,11 +1,14 @@
 import json
-import urllib.request
 import urllib.error
-from typing import List, Any
+from typing import List, Any, AsyncIterator, Iterator
 from langchain_core.messages import HumanMessage, SystemMessage, BaseMessage
+from src.core.llm.clients.http_transport import get_async_http_transport, get_http_transport
 from src.core.logger import logger
 from src.core.config import settings
 
+# End of a streamed completion ("data: [DONE]")
+_STREAM_DONE = object()
+
 class LocalOpenAIClient:
     """
     Custom client to interact with OpenAI-compatible APIs (like LM Studio)
@@ -19,9 +22,7 @@ class LocalOpenAIClient:
         self.json_mode = json_mode
         self.temperature = temperature
 
-    def invoke(self, messages: List[BaseMessage], **kwargs) -> Any:
-        url = f"{self.base_url}/chat/completions"
-
+    def _build_payload(self, messages: List[BaseMessage], stream: bool, **kwargs) -> dict:
         # Convert LangChain messages to OpenAI format
         formatted_messages = []
         for msg in messages:
@@ -38,7 +39,7 @@ class LocalOpenAIClient:
             "model": self.model_name,
             "messages": formatted_messages,
             "temperature": self.temperature,
-            "stream": False
+            "stream": stream
         }
 
         # Check for response_format in kwargs (native structured output)
@@ -47,28 +48,100 @@ class LocalOpenAIClient:
         # Legacy JSON mode
         elif self.json_mode:
             payload["response_format"] = {"type": "json_object"}
+        return payload
 
-        headers = {
+    def _headers(self) -> dict:
+        return {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {settings.LOCAL_LLM_API_KEY or ''}"
         }
 
+    @staticmethod
+    def _response(result: dict) -> Any:
+        content = result["choices"][0]["message"]["content"]
+
+        # Return an object compatible with LangChain response (has .content)
+        class MockResponse:
+            def __init__(self, content):
+                self.content = content
+        return MockResponse(content)
+
+    @staticmethod
+    def _delta(raw_line: bytes) -> Any:
+        """Parses one server-sent event line: the delta text, None to skip, or _STREAM_DONE at [DONE]."""
+        line = raw_line.decode("utf-8").strip()
+        if not line.startswith("data:"):
+            return None
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return _STREAM_DONE
+        choices = json.loads(data).get("choices") or []
+        return (choices[0].get("delta") or {}).get("content") if choices else None
+
+    def invoke(self, messages: List[BaseMessage], **kwargs) -> Any:
+        url = f"{self.base_url}/chat/completions"
+        payload = self._build_payload(messages, stream=False, **kwargs)
+
+        try:
+            # Shared keep-alive pool (see http_transport): no new TCP connection per call
+            result = get_http_transport().post_json(url, payload, self._headers())
+            return self._response(result)
+
+        except urllib.error.URLError as e:
+            logger.error(f"Failed to connect to Local OpenAI API at {url}: {e}")
+            raise
+
+    def stream(self, messages: List[BaseMessage], **kwargs) -> Iterator[str]:
+        """
+        Yields the completion token by token ("stream": true, server-sent events).
+        Closing the generator early (e.g. once the expected JSON is complete) closes the
+        connection, which makes the server stop generating.
+        """
+        url = f"{self.base_url}/chat/completions"
+        payload = self._build_payload(messages, stream=True, **kwargs)
+
+        try:
+            with get_http_transport().post(url, payload, self._headers()) as response:
+                for raw_line in response:
+                    content = self._delta(raw_line)
+                    if content is _STREAM_DONE:
+                        # Drain the end of the chunked body so the connection can go back to the pool
+                        response.read()
+                        break
+                    if content:
+                        yield content
+
+        except urllib.error.URLError as e:
+            logger.error(f"Failed to connect to Local OpenAI API at {url}: {e}")
+            raise
+
+    async def ainvoke(self, messages: List[BaseMessage], **kwargs) -> Any:
+        """Async invoke: many calls can run concurrently on one event loop (no thread per request)."""
+        url = f"{self.base_url}/chat/completions"
+        payload = self._build_payload(messages, stream=False, **kwargs)
+
+        try:
+            result = await get_async_http_transport().post_json(url, payload, self._headers())
+            return self._response(result)
+
+        except urllib.error.URLError as e:
+            logger.error(f"Failed to connect to Local OpenAI API at {url}: {e}")
+            raise
+
+    async def astream(self, messages: List[BaseMessage], **kwargs) -> AsyncIterator[str]:
+        """Async counterpart of stream(); closing the generator early closes the connection."""
+        url = f"{self.base_url}/chat/completions"
+        payload = self._build_payload(messages, stream=True, **kwargs)
+
         try:
-            req = urllib.request.Request(
-                url,
-                data=json.dumps(payload).encode('utf-8'),
-                headers=headers,
-                method="POST"
-            )
-            with urllib.request.urlopen(req) as response:
-                result = json.load(response)
-                content = result["choices"][0]["message"]["content"]
-
-                # Return an object compatible with LangChain response (has .content)
-                class MockResponse:
-                    def __init__(self, content):
-                        self.content = content
-                return MockResponse(content)
+            async with get_async_http_transport().post(url, payload, self._headers()) as response:
+                async for raw_line in response.lines():
+                    content = self._delta(raw_line)
+                    if content is _STREAM_DONE:
+                        await response.read()
+                        break
+                    if content:
+                        yield content
 
         except urllib.error.URLError as e:
             logger.error(f"Failed to connect to Local OpenAI API at {url}: {e}")
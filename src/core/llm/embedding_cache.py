@@ -0,0 +1,283 @@
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+from langchain_core.embeddings import Embeddings
+from langchain_ollama import OllamaEmbeddings
+from sqlalchemy import text
+from src.core.config import settings
+from src.core.logger import logger
+
+
+def text_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def embed_queries(embeddings: Embeddings, texts: List[str]) -> List[List[float]]:
+    """
+    Embeda várias consultas numa única chamada ao provedor quando ele permite.
+    Não usa embed_documents diretamente: alguns provedores (Google) embedam consultas com outro
+    task type. Implementações com `embed_queries` (em lote) são usadas; o Ollama não distingue
+    consulta de documento; os demais caem em uma chamada embed_query por texto.
+    """
+    if not texts:
+        return []
+    batch = getattr(embeddings, "embed_queries", None)
+    if callable(batch):
+        return batch(list(texts))
+    if isinstance(embeddings, OllamaEmbeddings):
+        return embeddings.embed_documents(list(texts))
+    return [embeddings.embed_query(t) for t in texts]
+
+
+class LRUEmbeddingCache:
+    """
+    Cache LRU em memória, thread-safe, compartilhado pelo processo.
+    Chave: (provider, model, sha256(texto)).
+    Os vetores ficam como arrays float32 (4 bytes por dimensão, contra ~32 de uma lista de floats
+    Python) e o cache é limitado tanto por itens quanto por bytes (`max_bytes`, 0 = sem limite).
+    """
+
+    def __init__(self, max_items: int, max_bytes: int = 0):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[List[float]]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                return None
+            self._data.move_to_end(key)
+        return value.tolist()
+
+    def set(self, key: tuple, value: List[float]):
+        if self.max_items <= 0:
+            return
+        vector = np.asarray(value, dtype=np.float32)
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            self._data[key] = vector
+            self._bytes += vector.nbytes
+            while self._data and (
+                len(self._data) > self.max_items or (self.max_bytes > 0 and self._bytes > self.max_bytes)
+            ):
+                _, evicted = self._data.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class PostgresEmbeddingCacheStore:
+    """
+    Backend persistente do cache de embeddings numa tabela Postgres.
+    Falhas de conexão desativam o backend no processo (o cache em memória continua valendo),
+    para que um problema no cache nunca impeça a geração de embeddings.
+    """
+
+    def __init__(self, connection_string: str, table_name: str):
+        self.connection_string = connection_string
+        self.table_name = table_name
+        self._table_ready = False
+        self._disabled = False
+        self._lock = threading.Lock()
+
+    def _get_engine(self):
+        """Engine compartilhado do processo (registro de recursos); a tabela é garantida uma vez."""
+        if self._disabled:
+            return None
+        # Import tardio: o registro importa o provedor de embeddings, que importa este módulo
+        from src.core.memory.registry import get_sql_engine
+        engine = get_sql_engine(self.connection_string)
+        if self._table_ready:
+            return engine
+        with self._lock:
+            if not self._table_ready and not self._disabled:
+                try:
+                    with engine.connect() as conn:
+                        conn.execute(text(
+                            f"CREATE TABLE IF NOT EXISTS {self.table_name} ("
+                            "provider TEXT NOT NULL, "
+                            "model TEXT NOT NULL, "
+                            "text_hash CHAR(64) NOT NULL, "
+                            "embedding DOUBLE PRECISION[] NOT NULL, "
+                            "created_at TIMESTAMPTZ NOT NULL DEFAULT now(), "
+                            "PRIMARY KEY (provider, model, text_hash))"
+                        ))
+                        conn.commit()
+                    self._table_ready = True
+                except Exception as e:
+                    logger.warning(f"Cache de embeddings em Postgres indisponível ({e}). Usando apenas cache em memória.")
+                    self._disabled = True
+        return engine if self._table_ready else None
+
+    def get_many(self, provider: str, model: str, hashes: Sequence[str]) -> Dict[str, List[float]]:
+        engine = self._get_engine()
+        if engine is None or not hashes:
+            return {}
+        try:
+            with engine.connect() as conn:
+                rows = conn.execute(
+                    text(
+                        f"SELECT text_hash, embedding FROM {self.table_name} "
+                        "WHERE provider = :provider AND model = :model AND text_hash = ANY(:hashes)"
+                    ),
+                    {"provider": provider, "model": model, "hashes": list(hashes)},
+                ).fetchall()
+            return {row[0]: list(row[1]) for row in rows}
+        except Exception as e:
+            logger.warning(f"Falha ao ler cache de embeddings: {e}")
+            return {}
+
+    def set_many(self, provider: str, model: str, items: Dict[str, List[float]]):
+        engine = self._get_engine()
+        if engine is None or not items:
+            return
+        try:
+            with engine.connect() as conn:
+                conn.execute(
+                    text(
+                        f"INSERT INTO {self.table_name} (provider, model, text_hash, embedding) "
+                        "VALUES (:provider, :model, :text_hash, :embedding) "
+                        "ON CONFLICT (provider, model, text_hash) DO NOTHING"
+                    ),
+                    [
+                        {"provider": provider, "model": model, "text_hash": h, "embedding": emb}
+                        for h, emb in items.items()
+                    ],
+                )
+                conn.commit()
+        except Exception as e:
+            logger.warning(f"Falha ao gravar cache de embeddings: {e}")
+
+
+# Instâncias compartilhadas pelo processo (o LRU é comum a todos os wrappers)
+_memory_cache: Optional[LRUEmbeddingCache] = None
+_persistent_store: Optional[PostgresEmbeddingCacheStore] = None
+_registry_lock = threading.Lock()
+
+
+def get_memory_cache() -> LRUEmbeddingCache:
+    global _memory_cache
+    with _registry_lock:
+        if _memory_cache is None:
+            _memory_cache = LRUEmbeddingCache(settings.EMBEDDING_CACHE_MAX_ITEMS, settings.EMBEDDING_CACHE_MAX_BYTES)
+        return _memory_cache
+
+
+def get_persistent_store() -> Optional[PostgresEmbeddingCacheStore]:
+    global _persistent_store
+    if settings.EMBEDDING_CACHE_BACKEND != "postgres" or not settings.POSTGRES_URL:
+        return None
+    with _registry_lock:
+        if _persistent_store is None:
+            # A string de conexão é normalizada pelo registro (get_sql_engine)
+            _persistent_store = PostgresEmbeddingCacheStore(settings.POSTGRES_URL, settings.EMBEDDING_CACHE_TABLE)
+        return _persistent_store
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wrapper que adiciona cache por conteúdo a qualquer implementação de Embeddings.
+    Consulta primeiro o LRU em memória, depois o backend persistente e só então chama
+    o provedor real, apenas para os textos ausentes (deduplicados dentro do lote).
+    """
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        provider: str,
+        model: str,
+        memory_cache: Optional[LRUEmbeddingCache] = None,
+        store: Optional[PostgresEmbeddingCacheStore] = None,
+    ):
+        self.underlying = underlying
+        self.provider = provider
+        self.model = model
+        self.memory_cache = memory_cache if memory_cache is not None else get_memory_cache()
+        self.store = store
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed search docs."""
+        return self._embed_cached(texts, self.model, self.underlying.embed_documents)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embeda várias consultas (namespace de consultas do cache) com uma única chamada para as ausentes."""
+        return self._embed_cached(texts, f"{self.model}#query", lambda missing: embed_queries(self.underlying, missing))
+
+    def _embed_cached(self, texts: List[str], model: str, compute) -> List[List[float]]:
+        hashes = [text_hash(t) for t in texts]
+        found: Dict[str, List[float]] = {}
+
+        # 1. LRU em memória
+        for h in hashes:
+            if h not in found:
+                cached = self.memory_cache.get((self.provider, model, h))
+                if cached is not None:
+                    found[h] = cached
+
+        # 2. Backend persistente
+        missing = [h for h in dict.fromkeys(hashes) if h not in found]
+        if missing and self.store is not None:
+            from_store = self.store.get_many(self.provider, model, missing)
+            for h, emb in from_store.items():
+                found[h] = emb
+                self.memory_cache.set((self.provider, model, h), emb)
+
+        # 3. Provedor real, apenas para os textos inéditos
+        to_embed: Dict[str, str] = {}
+        for h, t in zip(hashes, texts):
+            if h not in found and h not in to_embed:
+                to_embed[h] = t
+
+        if to_embed:
+            logger.debug(
+                f"Cache de embeddings: {len(texts) - len(to_embed)} hits, {len(to_embed)} misses "
+                f"({self.provider}/{model})."
+            )
+            new_vectors = compute(list(to_embed.values()))
+            fresh = dict(zip(to_embed.keys(), new_vectors))
+            for h, emb in fresh.items():
+                found[h] = emb
+                self.memory_cache.set((self.provider, model, h), emb)
+            if self.store is not None:
+                self.store.set_many(self.provider, model, fresh)
+
+        return [found[h] for h in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed query text."""
+        h = text_hash(text)
+        key = (self.provider, f"{self.model}#query", h)
+        cached = self.memory_cache.get(key)
+        if cached is not None:
+            return cached
+
+        # Consultas usam um namespace próprio: alguns provedores (ex: Google) embedam
+        # queries e documentos com task types diferentes.
+        if self.store is not None:
+            stored = self.store.get_many(self.provider, f"{self.model}#query", [h])
+            if h in stored:
+                self.memory_cache.set(key, stored[h])
+                return stored[h]
+
+        emb = self.underlying.embed_query(text)
+        self.memory_cache.set(key, emb)
+        if self.store is not None:
+            self.store.set_many(self.provider, f"{self.model}#query", {h: emb})
+        return emb
@@ -1,11 +1,11 @@
 import os
-import json
-import urllib.request
 import urllib.error
 from typing import List
 from langchain_core.embeddings import Embeddings
 from langchain_ollama import OllamaEmbeddings
+from src.core.llm.clients.http_transport import get_http_transport
 from src.core.llm.rotating_embeddings import RotatingEmbeddings
+from src.core.llm.embedding_cache import CachedEmbeddings, get_persistent_store
 from src.core.logger import logger
 from src.core.config import settings
 
@@ -25,6 +25,10 @@ class LocalOpenAIEmbeddings(Embeddings):
         # OpenAI API supports batching in 'input'
         return self._embed_batch(texts)
 
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several query texts in one request (same endpoint as documents)."""
+        return self._embed_batch(texts)
+
     def embed_query(self, text: str) -> List[float]:
         """Embed query text."""
         result = self._embed_batch([text])
@@ -44,19 +48,13 @@ class LocalOpenAIEmbeddings(Embeddings):
         }
 
         try:
-            req = urllib.request.Request(
-                url,
-                data=json.dumps(payload).encode('utf-8'),
-                headers=headers,
-                method="POST"
-            )
-            with urllib.request.urlopen(req) as response:
-                result = json.load(response)
-                # Parse OpenAI format: { "data": [ { "embedding": [...], "index": 0 }, ... ] }
-                data_items = result.get("data", [])
-                # Ensure sorted by index just in case
-                data_items.sort(key=lambda x: x.get("index", 0))
-                return [item["embedding"] for item in data_items]
+            # Shared keep-alive pool: batches reuse the same connection instead of a new TCP handshake each
+            result = get_http_transport().post_json(url, payload, headers)
+            # Parse OpenAI format: { "data": [ { "embedding": [...], "index": 0 }, ... ] }
+            data_items = result.get("data", [])
+            # Ensure sorted by index just in case
+            data_items.sort(key=lambda x: x.get("index", 0))
+            return [item["embedding"] for item in data_items]
 
         except urllib.error.URLError as e:
             logger.error(f"Failed to connect to Local OpenAI Embeddings at {url}: {e}")
@@ -80,7 +78,38 @@ class EmbeddingProvider:
         """
         Retorna uma instância do modelo de embeddings configurado,
         suportando diferentes provedores (Google, Ollama, URL Local).
+        Quando EMBEDDING_CACHE_ENABLED, a instância é envolvida por CachedEmbeddings,
+        de modo que indexador, busca e seed compartilhem o mesmo cache por conteúdo.
         """
+        embeddings = self._create_embeddings()
+        if not settings.EMBEDDING_CACHE_ENABLED:
+            return embeddings
+        return CachedEmbeddings(
+            embeddings,
+            provider=self._cache_namespace(),
+            model=self.model_name,
+            store=get_persistent_store(),
+        )
+
+    @property
+    def model_name(self) -> str:
+        return self.google_model_name if self.provider == "google" else self.ollama_model_name
+
+    @property
+    def identity(self) -> str:
+        """Identifica unicamente o modelo de embeddings configurado (provedor/endpoint + modelo)."""
+        return f"{self._cache_namespace()}/{self.model_name}"
+
+    def _cache_namespace(self) -> str:
+        # Para provedores locais a URL faz parte da identidade: o mesmo nome de modelo
+        # pode apontar para pesos diferentes em servidores diferentes.
+        if self.provider.startswith("http"):
+            return f"local:{self.provider.rstrip('/')}"
+        if self.provider in ("ollama", "local"):
+            return f"{self.provider}:{(self.ollama_base_url or '').rstrip('/')}"
+        return self.provider
+
+    def _create_embeddings(self) -> Embeddings:
         # Se o provider for uma URL, usamos a lógica OpenAI Compatible (LM Studio, etc)
         if self.provider.startswith("http"):
             target_url = self.provider
@@ -1,6 +1,8 @@
 import time
 import json
-from typing import Optional, List, Type, Any, Union
+import asyncio
+import urllib.error
+from typing import Optional, List, Type, Any, Union, Iterator, AsyncIterator
 from pydantic import BaseModel
 from langchain_core.language_models.base import BaseLanguageModel
 from langchain_core.messages import HumanMessage, SystemMessage, BaseMessage
@@ -8,9 +10,11 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_ollama import ChatOllama
 from src.core.logger import logger
 from src.core.config import settings
-from src.core.utils.json_parser import extract_json_from_text
+from src.core.utils.json_parser import extract_json_from_text, JsonObjectScanner
 from src.core.llm.api_key_manager import key_manager
 from src.core.llm.clients.local_openai import LocalOpenAIClient
+from src.core.llm.response_cache import get_response_cache, response_cache_key, should_use_cache
+from src.core.llm.structured_strategy import STRATEGY_MANUAL, STRATEGY_NATIVE, get_strategy_memory
 
 class LLMProvider:
     temperature: float
@@ -41,11 +45,12 @@ class LLMProvider:
         # For Google, this might hold the first key. Rotation happens in get_llm().
         self.llm = self._create_llm_instance(self.model_name, self.temperature, self.ollama_base_url)
 
-    def _create_llm_instance(self, model_name: str, temperature: float, base_url: str, json_mode: bool = False) -> Any:
+    def _create_llm_instance(self, model_name: str, temperature: float, base_url: str, json_mode: bool = False, api_key: Optional[str] = None) -> Any:
         """
         Creates an LLM instance.
         Accepts explicit arguments to allow creating temporary instances (e.g. for JSON mode)
-        different from the default self.llm.
+        different from the default self.llm. 'api_key' (Google) skips the blocking key rotation
+        when the caller already obtained a key (async path).
         """
         if self.provider == "local":
             logger.info(f"Using Local LLM (OpenAI Compatible) with model: {model_name} at {base_url}")
@@ -66,7 +71,7 @@ class LLMProvider:
 
         # Google
         logger.info(f"Using Google LLM with model: {model_name}")
-        current_key = key_manager.get_next_key()
+        current_key = api_key or key_manager.get_next_key()
 
         return ChatGoogleGenerativeAI(
             model=model_name,
@@ -82,6 +87,15 @@ class LLMProvider:
         """
         return self._create_llm_instance(self.model_name, self.temperature, self.ollama_base_url)
 
+    async def _aget_api_key(self) -> Optional[str]:
+        # Rate limiting of the Google keys without blocking the event loop
+        return await key_manager.aget_next_key() if self.provider == "google" else None
+
+    async def aget_llm(self) -> BaseLanguageModel:
+        """Async get_llm: waits for the Google key rate limit with asyncio.sleep."""
+        api_key = await self._aget_api_key()
+        return self._create_llm_instance(self.model_name, self.temperature, self.ollama_base_url, api_key=api_key)
+
     def _apply_delay(self):
         try:
             delay = settings.REQUEST_DELAY_SECONDS
@@ -90,33 +104,124 @@ class LLMProvider:
         except (ValueError, TypeError):
             pass
 
+    async def _aapply_delay(self):
+        try:
+            delay = settings.REQUEST_DELAY_SECONDS
+            if delay > 0:
+                await asyncio.sleep(delay)
+        except (ValueError, TypeError):
+            pass
+
+    def _cached_response(self, prompt: str, system_message: Optional[str], schema: Optional[Type[BaseModel]], cache: Optional[bool]):
+        """Returns (cache key or None when the cache does not apply, cached result or None)."""
+        if not should_use_cache(self.temperature, cache):
+            return None, None
+        key = response_cache_key(self.provider, self.model_name, self.temperature, system_message, prompt, schema)
+        cached = get_response_cache().get(key, schema)
+        if cached is not None:
+            logger.info(f"Resposta do LLM servida do cache ({self.provider}/{self.model_name}).")
+        return key, cached
+
+    @staticmethod
+    def _content(response: Any) -> str:
+        return response.content if hasattr(response, 'content') else str(response)
+
+    @staticmethod
+    def _build_messages(prompt: str, system_message: Optional[str] = None) -> List[BaseMessage]:
+        messages = [HumanMessage(content=prompt)]
+        if system_message:
+            messages.insert(0, SystemMessage(content=system_message))
+        return messages
+
+    @staticmethod
+    def _chunk_text(chunk: Any) -> str:
+        """Text of a streamed piece (LocalOpenAIClient yields str, LangChain models yield chunks)."""
+        content = chunk.content if hasattr(chunk, 'content') else chunk
+        if isinstance(content, list):
+            # Gemini may return content as a list of parts
+            content = "".join(part if isinstance(part, str) else part.get("text", "") for part in content)
+        return str(content) if content else ""
+
+    def _stream_tokens(self, llm: Any, messages: List[BaseMessage], **kwargs) -> Iterator[str]:
+        """Yields text pieces from llm.stream."""
+        for chunk in llm.stream(messages, **kwargs):
+            text = self._chunk_text(chunk)
+            if text:
+                yield text
+
+    def _stream_json(self, llm: Any, messages: List[BaseMessage], **kwargs) -> JsonObjectScanner:
+        """
+        Streams the completion only until the first top-level JSON object is complete, then closes
+        the stream so the model stops generating (local models often keep explaining after the JSON).
+        """
+        scanner = JsonObjectScanner()
+        tokens = self._stream_tokens(llm, messages, **kwargs)
+        try:
+            for token in tokens:
+                if scanner.feed(token):
+                    logger.debug(f"JSON completo após {len(scanner.text)} caracteres; encerrando o stream.")
+                    break
+        finally:
+            tokens.close()
+        return scanner
+
+    def generate_stream(self, prompt: str, system_message: Optional[str] = None) -> Iterator[str]:
+        """
+        Streams a text response token by token (Legacy Mode output, incrementally).
+        Stopping the iteration early closes the underlying stream.
+        """
+        messages = self._build_messages(prompt, system_message)
+        try:
+            yield from self._stream_tokens(self.get_llm(), messages)
+        except Exception as e:
+            logger.error(f"❌ LLM Error in generate_stream: {e}")
+            raise
+        finally:
+            self._apply_delay()
+
     def generate_response(
         self,
         prompt: str,
         system_message: Optional[str] = None,
-        schema: Optional[Type[BaseModel]] = None
+        schema: Optional[Type[BaseModel]] = None,
+        stream: Optional[bool] = None,
+        cache: Optional[bool] = None
     ) -> Union[str, BaseModel]:
         """
         Generates a response from the LLM.
         - If 'schema' is provided, attempts to generate a structured Pydantic object (Structured Mode).
         - If 'schema' is None, returns a string (Legacy Mode).
+        - 'stream' (default: settings.LLM_STREAMING) reads the completion as a token stream; structured
+          calls stop reading as soon as the JSON object is complete.
+        - 'cache': None uses the response cache for deterministic calls when LLM_CACHE_ENABLED,
+          False bypasses it, True forces it regardless of temperature.
         """
+        stream = settings.LLM_STREAMING if stream is None else stream
+
+        cache_key, cached = self._cached_response(prompt, system_message, schema, cache)
+        if cached is not None:
+            return cached
 
         # Prepare messages
-        messages = [HumanMessage(content=prompt)]
-        if system_message:
-            messages.insert(0, SystemMessage(content=system_message))
+        messages = self._build_messages(prompt, system_message)
 
         try:
             # --- LEGACY MODE (No Schema) ---
             if not schema:
                 # Get a fresh LLM instance
                 llm = self.get_llm()
-                response = llm.invoke(messages)
-                return response.content if hasattr(response, 'content') else str(response)
+                if stream:
+                    result = "".join(self._stream_tokens(llm, messages))
+                else:
+                    result = self._content(llm.invoke(messages))
 
             # --- STRUCTURED MODE ---
-            return self._generate_structured_response(messages, schema)
+            else:
+                result = self._generate_structured_response(messages, schema, stream=stream)
+
+            if cache_key is not None:
+                get_response_cache().set(cache_key, result)
+            return result
 
         except Exception as e:
             logger.error(f"❌ LLM Error in generate_response: {e}")
@@ -125,92 +230,324 @@ class LLMProvider:
         finally:
             self._apply_delay()
 
+    @staticmethod
+    def _local_schema_payload(pydantic_schema: Type[BaseModel]) -> dict:
+        """response_format for LM Studio native structured output (Plan B)."""
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": pydantic_schema.__name__,
+                "strict": True,
+                "schema": pydantic_schema.model_json_schema()
+            }
+        }
+
+    @staticmethod
+    def _native_result(response_obj: Any, pydantic_schema: Type[BaseModel]) -> Optional[BaseModel]:
+        """Normalizes the result of with_structured_output (Plan A); None means 'use the fallback'."""
+        if isinstance(response_obj, pydantic_schema):
+            return response_obj
+
+        if isinstance(response_obj, dict):
+            return pydantic_schema.model_validate(response_obj)
+
+        if response_obj is None:
+             raise ValueError("Native structured output returned None.")
+        return None
+
+    @staticmethod
+    def _manual_parsing_messages(messages: List[BaseMessage], pydantic_schema: Type[BaseModel]) -> List[BaseMessage]:
+        """Messages for Plan C: the schema is appended to the system prompt."""
+        schema_json = pydantic_schema.model_json_schema()
+        final_instructions = f"\n\nIMPORTANT: Your response MUST be a valid JSON object that conforms to the provided schema. Do not wrap it in markdown.\nSchema:\n{json.dumps(schema_json, indent=2)}"
+
+        messages_c = list(messages)
+
+        if isinstance(messages_c[0], SystemMessage):
+             messages_c[0] = SystemMessage(content=str(messages_c[0].content) + final_instructions)
+        else:
+             messages_c.insert(0, SystemMessage(content=final_instructions))
+        return messages_c
+
+    def _text_llm(self, api_key: Optional[str] = None) -> Any:
+        # Use a text-mode instance (explicitly create one to be safe)
+        return self._create_llm_instance(
+            model_name=self.model_name,
+            temperature=self.temperature,
+            base_url=self.ollama_base_url,
+            json_mode=False,
+            api_key=api_key
+        )
+
+    def _should_try_native(self, pydantic_schema: Type[BaseModel]) -> bool:
+        """Skips Plan A/B while the strategy memory says they fail for this (provider, model, schema)."""
+        memory = get_strategy_memory()
+        if memory is None or memory.should_try_native(
+            self.provider, self.model_name, pydantic_schema, base_url=self._strategy_endpoint()
+        ):
+            return True
+        logger.info(f"Pulando saída estruturada nativa: falhou antes para {self.model_name}/{pydantic_schema.__name__}.")
+        return False
+
+    def _record_strategy(self, pydantic_schema: Type[BaseModel], strategy: str):
+        memory = get_strategy_memory()
+        if memory is not None:
+            memory.record(self.provider, self.model_name, pydantic_schema, strategy, base_url=self._strategy_endpoint())
+
+    def _strategy_endpoint(self) -> Optional[str]:
+        # Local servers are told apart by URL: the same model name can be served by LM Studio or Ollama
+        return self.ollama_base_url if self.provider == "local" else None
+
+    @staticmethod
+    def _is_format_failure(error: Exception) -> bool:
+        """
+        True when native output failed on the answer itself (invalid JSON or schema mismatch:
+        pydantic ValidationError, json.JSONDecodeError and OutputParserException are all ValueErrors)
+        or the server rejected the request format (e.g. HTTP 400 for an unsupported response_format).
+        Transport, auth and rate-limit errors (401/403, 408, 429, timeouts, connection resets) are not.
+        """
+        if isinstance(error, urllib.error.HTTPError):
+            return 400 <= error.code < 500 and error.code not in (401, 403, 408, 429)
+        return isinstance(error, ValueError)
+
+    @staticmethod
+    def _validate_manual(content: str, parsed_json: Any, pydantic_schema: Type[BaseModel]) -> BaseModel:
+        if not parsed_json:
+            raise ValueError(f"Não foi possível extrair um JSON válido da resposta. Resposta: {content}")
+
+        return pydantic_schema.model_validate(parsed_json)
+
+    @staticmethod
+    def _validate_streamed(scanner: JsonObjectScanner, pydantic_schema: Type[BaseModel]) -> BaseModel:
+        if scanner.complete:
+            return pydantic_schema.model_validate(scanner.value)
+        return pydantic_schema.model_validate_json(scanner.text)
+
     def _generate_structured_response(
         self,
         messages: List[BaseMessage],
-        pydantic_schema: Type[BaseModel]
+        pydantic_schema: Type[BaseModel],
+        stream: bool = False
     ) -> BaseModel:
         """
         Implements fallback logic to obtain a structured JSON output.
+        The winning strategy is remembered per (provider, model, schema): once native output failed
+        on the format (not on transport or rate limits) and Plan C worked, Plans A/B are skipped
+        until the next re-probe.
         """
-        llm = self.get_llm()
+        try_native = self.provider in ("google", "local") and self._should_try_native(pydantic_schema)
+        # Only a format/schema failure of native output is remembered (not transport or rate-limit errors)
+        native_format_failure = False
 
         # --- PLAN A: Native Structured Output (Gemini) ---
-        if self.provider == "google":
+        # The LLM is only created here: get_llm() reserves a rate-limited Google key slot
+        if self.provider == "google" and try_native:
             try:
                 logger.info("Tentando com Saída Estruturada Nativa do Gemini...")
-                structured_llm = llm.with_structured_output(pydantic_schema)
-                response_obj = structured_llm.invoke(messages)
-
-                if isinstance(response_obj, pydantic_schema):
-                    return response_obj
-
-                if isinstance(response_obj, dict):
-                    return pydantic_schema.model_validate(response_obj)
-
-                if response_obj is None:
-                     raise ValueError("Native structured output returned None.")
+                structured_llm = self.get_llm().with_structured_output(pydantic_schema)
+                result = self._native_result(structured_llm.invoke(messages), pydantic_schema)
+                if result is not None:
+                    self._record_strategy(pydantic_schema, STRATEGY_NATIVE)
+                    return result
+                native_format_failure = True
 
             except Exception as e:
                 logger.warning(f"Saída Estruturada Nativa do Gemini falhou: {e}. Usando fallback.")
+                native_format_failure = self._is_format_failure(e)
                 # Fallback to Plan C
 
         # --- PLAN B: Native Structured Output (LM Studio) ---
-        elif self.provider == "local":
+        elif self.provider == "local" and try_native:
             try:
                 logger.info("Tentando com Structured Output nativo do LM Studio...")
+                llm = self.get_llm()
 
                 # 1. Build payload for response_format
-                schema_payload = {
-                    "type": "json_schema",
-                    "json_schema": {
-                        "name": pydantic_schema.__name__,
-                        "strict": True,
-                        "schema": pydantic_schema.model_json_schema()
-                    }
-                }
-
-                # 2. Call invoke with response_format
-                response_raw = llm.invoke(messages, response_format=schema_payload)
-                response_str = response_raw.content if hasattr(response_raw, 'content') else str(response_raw)
-
-                # 3. Validate returned JSON
-                return pydantic_schema.model_validate_json(response_str)
+                schema_payload = self._local_schema_payload(pydantic_schema)
+
+                # 2. Call with response_format (streaming stops at the end of the JSON object)
+                if stream:
+                    result = self._validate_streamed(self._stream_json(llm, messages, response_format=schema_payload), pydantic_schema)
+                else:
+                    response_str = self._content(llm.invoke(messages, response_format=schema_payload))
+
+                    # 3. Validate returned JSON
+                    result = pydantic_schema.model_validate_json(response_str)
+                self._record_strategy(pydantic_schema, STRATEGY_NATIVE)
+                return result
             except Exception as e:
                 logger.warning(f"Structured Output do LM Studio falhou: {e}. Usando fallback.")
+                native_format_failure = self._is_format_failure(e)
                 # Fallback to Plan C
 
         # --- PLAN C: Final Fallback (Manual Text Parsing) ---
         try:
             logger.info("Usando fallback final: parsing manual de texto...")
 
-            schema_json = pydantic_schema.model_json_schema()
-            final_instructions = f"\n\nIMPORTANT: Your response MUST be a valid JSON object that conforms to the provided schema. Do not wrap it in markdown.\nSchema:\n{json.dumps(schema_json, indent=2)}"
+            messages_c = self._manual_parsing_messages(messages, pydantic_schema)
+            llm_text = self._text_llm()
+
+            if stream:
+                scanner = self._stream_json(llm_text, messages_c)
+                content = scanner.text
+                parsed_json = scanner.value if scanner.complete else extract_json_from_text(content)
+            else:
+                content = self._content(llm_text.invoke(messages_c))
+                parsed_json = extract_json_from_text(content)
+
+            result = self._validate_manual(content, parsed_json, pydantic_schema)
+            if native_format_failure:
+                # Native output failed on the format but manual parsing worked: skip native next time
+                self._record_strategy(pydantic_schema, STRATEGY_MANUAL)
+            return result
+        
+        except Exception as e3:
+            logger.error(f"Todas as tentativas de obter uma resposta estruturada falharam: {e3}")
+            raise
 
-            messages_c = list(messages)
+    # --- ASYNC API ---
+    # Same plans as the sync methods, on top of ainvoke/astream: many calls can run concurrently in
+    # one event loop (e.g. asyncio.gather of several reviews) without blocking a thread per request.
+
+    async def _astream_tokens(self, llm: Any, messages: List[BaseMessage], **kwargs) -> AsyncIterator[str]:
+        """Yields text pieces from llm.astream."""
+        async for chunk in llm.astream(messages, **kwargs):
+            text = self._chunk_text(chunk)
+            if text:
+                yield text
+
+    async def _astream_json(self, llm: Any, messages: List[BaseMessage], **kwargs) -> JsonObjectScanner:
+        """Async _stream_json: stops reading (and closes the stream) once the JSON object is complete."""
+        scanner = JsonObjectScanner()
+        tokens = self._astream_tokens(llm, messages, **kwargs)
+        try:
+            async for token in tokens:
+                if scanner.feed(token):
+                    logger.debug(f"JSON completo após {len(scanner.text)} caracteres; encerrando o stream.")
+                    break
+        finally:
+            await tokens.aclose()
+        return scanner
 
-            if isinstance(messages_c[0], SystemMessage):
-                 messages_c[0] = SystemMessage(content=str(messages_c[0].content) + final_instructions)
+    async def agenerate_stream(self, prompt: str, system_message: Optional[str] = None) -> AsyncIterator[str]:
+        """Async generate_stream."""
+        messages = self._build_messages(prompt, system_message)
+        try:
+            async for token in self._astream_tokens(await self.aget_llm(), messages):
+                yield token
+        except Exception as e:
+            logger.error(f"❌ LLM Error in agenerate_stream: {e}")
+            raise
+        finally:
+            await self._aapply_delay()
+
+    async def agenerate_response(
+        self,
+        prompt: str,
+        system_message: Optional[str] = None,
+        schema: Optional[Type[BaseModel]] = None,
+        stream: Optional[bool] = None,
+        cache: Optional[bool] = None
+    ) -> Union[str, BaseModel]:
+        """
+        Async generate_response (same modes, fallbacks and response cache). Rate-limit waits and
+        REQUEST_DELAY_SECONDS use asyncio.sleep instead of blocking the event loop.
+        """
+        stream = settings.LLM_STREAMING if stream is None else stream
+
+        cache_key, cached = self._cached_response(prompt, system_message, schema, cache)
+        if cached is not None:
+            return cached
+
+        messages = self._build_messages(prompt, system_message)
+
+        try:
+            # --- LEGACY MODE (No Schema) ---
+            if not schema:
+                llm = await self.aget_llm()
+                if stream:
+                    result = "".join([token async for token in self._astream_tokens(llm, messages)])
+                else:
+                    result = self._content(await llm.ainvoke(messages))
+
+            # --- STRUCTURED MODE ---
             else:
-                 messages_c.insert(0, SystemMessage(content=final_instructions))
-
-            # Use a text-mode instance (explicitly create one to be safe)
-            llm_text = self._create_llm_instance(
-                model_name=self.model_name,
-                temperature=self.temperature,
-                base_url=self.ollama_base_url,
-                json_mode=False
-            )
+                result = await self._agenerate_structured_response(messages, schema, stream=stream)
+
+            if cache_key is not None:
+                get_response_cache().set(cache_key, result)
+            return result
 
-            response = llm_text.invoke(messages_c)
-            content = response.content if hasattr(response, 'content') else str(response)
+        except Exception as e:
+            logger.error(f"❌ LLM Error in agenerate_response: {e}")
+            raise
 
-            parsed_json = extract_json_from_text(content)
-            if not parsed_json:
-                raise ValueError(f"Não foi possível extrair um JSON válido da resposta. Resposta: {content}")
+        finally:
+            await self._aapply_delay()
+
+    async def _agenerate_structured_response(
+        self,
+        messages: List[BaseMessage],
+        pydantic_schema: Type[BaseModel],
+        stream: bool = False
+    ) -> BaseModel:
+        """Async _generate_structured_response (Plans A, B and C, same strategy memory)."""
+        try_native = self.provider in ("google", "local") and self._should_try_native(pydantic_schema)
+        native_format_failure = False
+
+        # --- PLAN A: Native Structured Output (Gemini) ---
+        if self.provider == "google" and try_native:
+            try:
+                logger.info("Tentando com Saída Estruturada Nativa do Gemini...")
+                structured_llm = (await self.aget_llm()).with_structured_output(pydantic_schema)
+                result = self._native_result(await structured_llm.ainvoke(messages), pydantic_schema)
+                if result is not None:
+                    self._record_strategy(pydantic_schema, STRATEGY_NATIVE)
+                    return result
+                native_format_failure = True
+
+            except Exception as e:
+                logger.warning(f"Saída Estruturada Nativa do Gemini falhou: {e}. Usando fallback.")
+                native_format_failure = self._is_format_failure(e)
+
+        # --- PLAN B: Native Structured Output (LM Studio) ---
+        elif self.provider == "local" and try_native:
+            try:
+                logger.info("Tentando com Structured Output nativo do LM Studio...")
+                llm = await self.aget_llm()
+                schema_payload = self._local_schema_payload(pydantic_schema)
+
+                if stream:
+                    result = self._validate_streamed(await self._astream_json(llm, messages, response_format=schema_payload), pydantic_schema)
+                else:
+                    response_str = self._content(await llm.ainvoke(messages, response_format=schema_payload))
+                    result = pydantic_schema.model_validate_json(response_str)
+                self._record_strategy(pydantic_schema, STRATEGY_NATIVE)
+                return result
+            except Exception as e:
+                logger.warning(f"Structured Output do LM Studio falhou: {e}. Usando fallback.")
+                native_format_failure = self._is_format_failure(e)
+
+        # --- PLAN C: Final Fallback (Manual Text Parsing) ---
+        try:
+            logger.info("Usando fallback final: parsing manual de texto...")
+
+            messages_c = self._manual_parsing_messages(messages, pydantic_schema)
+            llm_text = self._text_llm(api_key=await self._aget_api_key())
+
+            if stream:
+                scanner = await self._astream_json(llm_text, messages_c)
+                content = scanner.text
+                parsed_json = scanner.value if scanner.complete else extract_json_from_text(content)
+            else:
+                content = self._content(await llm_text.ainvoke(messages_c))
+                parsed_json = extract_json_from_text(content)
+
+            result = self._validate_manual(content, parsed_json, pydantic_schema)
+            if native_format_failure:
+                self._record_strategy(pydantic_schema, STRATEGY_MANUAL)
+            return result
 
-            return pydantic_schema.model_validate(parsed_json)
-        
         except Exception as e3:
             logger.error(f"Todas as tentativas de obter uma resposta estruturada falharam: {e3}")
             raise
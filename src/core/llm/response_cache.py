@@ -0,0 +1,278 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Optional, Type, Union
+from pydantic import BaseModel
+from src.core.config import settings
+from src.core.logger import logger
+from src.core.memory.query_cache import TTLCache
+
+CACHE_KEY_PREFIX = "llm_response:"
+
+
+def schema_fingerprint(schema: Type[BaseModel]) -> str:
+    """Nome + sha256 do JSON schema: muda quando campos ou descrições mudam."""
+    schema_json = json.dumps(schema.model_json_schema(), sort_keys=True)
+    return f"{schema.__name__}:{hashlib.sha256(schema_json.encode('utf-8')).hexdigest()}"
+
+
+def response_cache_key(
+    provider: str,
+    model: str,
+    temperature: float,
+    system_message: Optional[str],
+    prompt: str,
+    schema: Optional[Type[BaseModel]] = None,
+) -> str:
+    """
+    Chave por conteúdo de uma chamada: sha256 de (provider, model, temperature, system message,
+    prompt, nome e hash do JSON schema). Mudar o schema (campos, descrições) muda a chave.
+    """
+    schema_id = schema_fingerprint(schema) if schema is not None else None
+    material = json.dumps(
+        [provider, model, round(float(temperature), 3), system_message, prompt, schema_id],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _serialize(value: Union[str, BaseModel]) -> dict:
+    if isinstance(value, BaseModel):
+        return {"type": "model", "value": value.model_dump(mode="json")}
+    return {"type": "text", "value": value}
+
+
+def _deserialize(entry: dict, schema: Optional[Type[BaseModel]]) -> Union[str, BaseModel]:
+    if entry["type"] == "model":
+        # Nova instância a cada hit: quem recebe pode alterar o objeto sem afetar o cache
+        return schema.model_validate(entry["value"])
+    return entry["value"]
+
+
+class RedisResponseCacheStore:
+    """
+    Backend compartilhado entre processos/workers no Redis (SETEX com a TTL). O limite de tamanho
+    fica a cargo do próprio Redis (maxmemory + política de evicção). Falhas desativam o backend no
+    processo: um problema no cache nunca impede a chamada ao LLM.
+    """
+
+    def __init__(self, url: str, ttl_seconds: float):
+        self.url = url
+        self.ttl_seconds = ttl_seconds
+        self._client = None
+        self._disabled = False
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        if self._disabled:
+            return None
+        if self._client is not None:
+            return self._client
+        with self._lock:
+            if self._client is None and not self._disabled:
+                try:
+                    import redis
+                    client = redis.Redis.from_url(self.url, socket_timeout=2)
+                    client.ping()
+                    self._client = client
+                except Exception as e:
+                    logger.warning(f"Cache de respostas do LLM no Redis indisponível ({e}). Usando apenas cache em memória.")
+                    self._disabled = True
+        return self._client
+
+    def get(self, key: str) -> Optional[dict]:
+        client = self._get_client()
+        if client is None:
+            return None
+        try:
+            raw = client.get(CACHE_KEY_PREFIX + key)
+            return json.loads(raw) if raw else None
+        except Exception as e:
+            logger.warning(f"Falha ao ler cache de respostas do LLM: {e}")
+            return None
+
+    def set(self, key: str, entry: dict):
+        client = self._get_client()
+        if client is None:
+            return
+        try:
+            client.setex(CACHE_KEY_PREFIX + key, max(1, int(self.ttl_seconds)), json.dumps(entry))
+        except Exception as e:
+            logger.warning(f"Falha ao gravar cache de respostas do LLM: {e}")
+
+
+class DiskResponseCacheStore:
+    """
+    Backend em disco: um arquivo JSON por chave (<dir>/<2 primeiros hex>/<chave>.json) com a
+    expiração. Ao passar de `max_bytes`, remove os arquivos menos usados (mtime, atualizado a cada
+    hit) até voltar a 90% do limite.
+    """
+
+    def __init__(self, directory: str, ttl_seconds: float, max_bytes: int):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        # Tamanho total conhecido (calculado no primeiro set); None = ainda não medido
+        self._total_bytes: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _files(self):
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, stat.st_size, stat.st_mtime
+
+    def get(self, key: str) -> Optional[dict]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if stored.get("expires_at", 0) <= time.time():
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return stored.get("entry")
+
+    def _remove(self, path: str):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes -= size
+
+    def set(self, key: str, entry: dict):
+        path = self._path(key)
+        data = json.dumps({"expires_at": time.time() + self.ttl_seconds, "entry": entry}, ensure_ascii=False).encode("utf-8")
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            # Escrita atômica: leitores concorrentes nunca veem um arquivo pela metade
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Falha ao gravar cache de respostas do LLM em disco: {e}")
+            return
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._files())
+            else:
+                self._total_bytes += len(data) - previous
+            over_limit = self.max_bytes > 0 and self._total_bytes > self.max_bytes
+        if over_limit:
+            self._evict()
+
+    def _evict(self):
+        target = int(self.max_bytes * 0.9)
+        files = sorted(self._files(), key=lambda item: item[2])
+        total = sum(size for _, size, _ in files)
+        for path, size, _ in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                continue
+        with self._lock:
+            self._total_bytes = total
+        logger.debug(f"Cache de respostas do LLM em disco reduzido para {total} bytes.")
+
+
+ResponseCacheStore = Union[RedisResponseCacheStore, DiskResponseCacheStore]
+
+
+class LLMResponseCache:
+    """
+    Cache de respostas do LLM em dois níveis: LRU em memória com TTL (sempre) e, opcionalmente,
+    um backend persistente/compartilhado (Redis ou disco). Hits do backend sobem para a memória.
+    Guarda o texto ou o JSON do objeto estruturado, revalidado com o schema a cada hit.
+    """
+
+    def __init__(self, memory: TTLCache, store: Optional[ResponseCacheStore] = None):
+        self.memory = memory
+        self.store = store
+
+    def get(self, key: str, schema: Optional[Type[BaseModel]] = None) -> Optional[Union[str, BaseModel]]:
+        entry = self.memory.get(key)
+        if entry is None and self.store is not None:
+            entry = self.store.get(key)
+            if entry is not None:
+                self.memory.set(key, entry)
+        if entry is None:
+            return None
+        try:
+            return _deserialize(entry, schema)
+        except Exception as e:
+            # Ex: resposta textual guardada e agora pedida com schema, ou schema incompatível
+            logger.warning(f"Entrada do cache de respostas do LLM inválida ({e}); ignorando.")
+            return None
+
+    def set(self, key: str, value: Union[str, BaseModel]):
+        entry = _serialize(value)
+        self.memory.set(key, entry)
+        if self.store is not None:
+            self.store.set(key, entry)
+
+    def clear(self):
+        self.memory.clear()
+
+
+_response_cache: Optional[LLMResponseCache] = None
+_registry_lock = threading.Lock()
+
+
+def _create_store() -> Optional[ResponseCacheStore]:
+    backend = settings.LLM_CACHE_BACKEND
+    if backend == "redis":
+        return RedisResponseCacheStore(settings.REDIS_URL, settings.LLM_CACHE_TTL_SECONDS)
+    if backend == "disk":
+        directory = settings.LLM_CACHE_DIR or os.path.join(settings.INDEX_STATE_DIR, "llm_cache")
+        return DiskResponseCacheStore(directory, settings.LLM_CACHE_TTL_SECONDS, settings.LLM_CACHE_DISK_MAX_BYTES)
+    return None
+
+
+def get_response_cache() -> LLMResponseCache:
+    """Cache compartilhado pelo processo (LLMProvider é instanciado por agente)."""
+    global _response_cache
+    with _registry_lock:
+        if _response_cache is None:
+            memory = TTLCache(settings.LLM_CACHE_MAX_ITEMS, settings.LLM_CACHE_TTL_SECONDS)
+            _response_cache = LLMResponseCache(memory, _create_store())
+        return _response_cache
+
+
+def reset_response_cache():
+    global _response_cache
+    with _registry_lock:
+        _response_cache = None
+
+
+def should_use_cache(temperature: float, cache: Optional[bool] = None) -> bool:
+    """
+    cache=False ignora o cache (nem lê nem grava); cache=True força o uso mesmo com temperatura
+    alta; None usa o cache só para chamadas determinísticas (temperature <= LLM_CACHE_MAX_TEMPERATURE).
+    Nada é usado com LLM_CACHE_ENABLED desligado.
+    """
+    if not settings.LLM_CACHE_ENABLED or cache is False:
+        return False
+    return cache is True or temperature <= settings.LLM_CACHE_MAX_TEMPERATURE
@@ -38,6 +38,14 @@ class RotatingEmbeddings(Embeddings):
         finally:
             self._apply_delay()
 
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several query texts in one batched request (RETRIEVAL_QUERY task type)."""
+        try:
+            result = self._get_embedding_model().embed_documents(texts, task_type="RETRIEVAL_QUERY")
+            return result
+        finally:
+            self._apply_delay()
+
     def embed_query(self, text: str) -> List[float]:
         """Embed query text."""
         try:
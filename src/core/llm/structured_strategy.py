@@ -0,0 +1,117 @@
+import os
+import json
+import time
+import tempfile
+import threading
+from typing import Dict, Optional, Type
+from pydantic import BaseModel
+from src.core.config import settings
+from src.core.logger import logger
+from src.core.llm.response_cache import schema_fingerprint
+
+STRATEGY_NATIVE = "native"
+STRATEGY_MANUAL = "manual"
+
+
+class StructuredStrategyMemory:
+    """
+    Lembra, por (provider, endpoint, model, schema), qual estratégia de saída estruturada funcionou: a
+    nativa (Plano A/B) ou o parsing manual de texto (Plano C). Quando a nativa falhou e o Plano C
+    resolveu, as próximas chamadas vão direto ao Plano C, sem pagar uma geração perdida; depois de
+    `reprobe_seconds` a nativa é tentada de novo (o modelo/servidor pode ter passado a suportá-la).
+    Persistido num JSON em `path` (escrita atômica) para valer entre execuções e workers.
+    """
+
+    def __init__(self, path: Optional[str], reprobe_seconds: float):
+        self.path = path
+        self.reprobe_seconds = reprobe_seconds
+        self._entries: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def key(provider: str, model: str, schema: Type[BaseModel], base_url: Optional[str] = None) -> str:
+        # O endpoint entra na chave: servidores locais diferentes (LM Studio, Ollama) podem servir
+        # o mesmo nome de modelo com suporte diferente a response_format
+        endpoint = (base_url or "").rstrip("/")
+        return f"{provider}|{endpoint}|{model}|{schema_fingerprint(schema)}"
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._entries = json.load(f).get("strategies", {})
+        except Exception as e:
+            logger.warning(f"Memória de estratégias de saída estruturada corrompida em '{self.path}': {e}. Ignorando.")
+            self._entries = {}
+
+    def _save(self):
+        if not self.path:
+            return
+        state_dir = os.path.dirname(self.path) or "."
+        try:
+            os.makedirs(state_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=state_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump({"strategies": self._entries}, f, indent=2)
+                os.replace(tmp_path, self.path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        except Exception as e:
+            # Sem persistência a memória continua valendo no processo
+            logger.warning(f"Falha ao gravar memória de estratégias de saída estruturada: {e}")
+
+    def should_try_native(
+        self, provider: str, model: str, schema: Type[BaseModel], base_url: Optional[str] = None
+    ) -> bool:
+        """False só quando a nativa falhou (e o Plano C funcionou) há menos de `reprobe_seconds`."""
+        with self._lock:
+            entry = self._entries.get(self.key(provider, model, schema, base_url))
+        if entry is None or entry.get("strategy") != STRATEGY_MANUAL:
+            return True
+        return time.time() - entry.get("updated_at", 0) >= self.reprobe_seconds
+
+    def record(
+        self, provider: str, model: str, schema: Type[BaseModel], strategy: str, base_url: Optional[str] = None
+    ):
+        """Registra a estratégia vencedora; só grava em disco quando ela muda ou quando renova um re-probe."""
+        key = self.key(provider, model, schema, base_url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.get("strategy") == strategy == STRATEGY_NATIVE:
+                return
+            if entry is None or entry.get("strategy") != strategy:
+                logger.info(f"Saída estruturada de {provider}/{model} ({schema.__name__}): estratégia '{strategy}'.")
+            self._entries[key] = {"strategy": strategy, "updated_at": time.time()}
+            self._save()
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self._save()
+
+
+_strategy_memory: Optional[StructuredStrategyMemory] = None
+_registry_lock = threading.Lock()
+
+
+def get_strategy_memory() -> Optional[StructuredStrategyMemory]:
+    """Memória compartilhada pelo processo; None com STRUCTURED_STRATEGY_MEMORY desligado."""
+    global _strategy_memory
+    if not settings.STRUCTURED_STRATEGY_MEMORY:
+        return None
+    with _registry_lock:
+        if _strategy_memory is None:
+            path = settings.STRUCTURED_STRATEGY_FILE or os.path.join(settings.INDEX_STATE_DIR, "structured_strategies.json")
+            _strategy_memory = StructuredStrategyMemory(path, settings.STRUCTURED_STRATEGY_REPROBE_SECONDS)
+        return _strategy_memory
+
+
+def reset_strategy_memory():
+    global _strategy_memory
+    with _registry_lock:
+        _strategy_memory = None
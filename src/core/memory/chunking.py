@@ -0,0 +1,315 @@
+import ast
+import os
+import re
+from typing import List, Optional, Tuple
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from src.core.config import settings
+
+# (linha inicial, linha final, símbolo) — linhas 1-based e inclusivas
+Segment = Tuple[int, int, Optional[str]]
+# (nome, tipo, linha inicial, linha final) de uma definição: function, class, method, interface, route...
+Definition = Tuple[str, str, int, int]
+
+_PYTHON_SYMBOLS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+_JS_DECLARATION = re.compile(
+    r"^(?:export\s+(?:default\s+)?)?(?:declare\s+)?(?:abstract\s+)?(?:async\s+)?"
+    r"(?:function\*?|class|interface|type|enum|const|let|var|namespace)\s+([A-Za-z_$][\w$]*)"
+)
+_RUST_DECLARATION = re.compile(
+    r"^(?:pub(?:\([^)]*\))?\s+)?(?:async\s+)?(?:unsafe\s+)?(?:extern\s+\"[^\"]*\"\s+)?"
+    r"(?:fn|struct|enum|trait|mod|const|static|type|union)\s+([A-Za-z_]\w*)"
+    r"|^(?:unsafe\s+)?impl(?:<[^>]*>)?\s+(?:[\w:<>, ]+\s+for\s+)?([A-Za-z_][\w:]*)"
+    r"|^macro_rules!\s*([A-Za-z_]\w*)"
+)
+_GO_DECLARATION = re.compile(
+    r"^func\s+(?:\([^)]*\)\s*)?([A-Za-z_]\w*)"
+    r"|^type\s+([A-Za-z_]\w*)"
+    r"|^(?:var|const)\s+(?:([A-Za-z_]\w*)|\()"
+)
+
+_JS_EXTENSIONS = {".js", ".jsx", ".mjs", ".ts", ".tsx"}
+
+DECLARATION_PATTERNS = {
+    ".js": _JS_DECLARATION,
+    ".jsx": _JS_DECLARATION,
+    ".mjs": _JS_DECLARATION,
+    ".ts": _JS_DECLARATION,
+    ".tsx": _JS_DECLARATION,
+    ".rs": _RUST_DECLARATION,
+    ".go": _GO_DECLARATION,
+}
+
+# Palavra-chave da declaração -> tipo registrado na tabela de símbolos
+_DECLARATION_KINDS = {
+    "function": "function", "fn": "function", "func": "function",
+    "class": "class", "struct": "class", "union": "class",
+    "interface": "interface", "trait": "interface",
+    "type": "type", "enum": "enum", "namespace": "module", "mod": "module",
+    "const": "variable", "let": "variable", "var": "variable", "static": "variable",
+    "impl": "impl", "macro_rules": "macro",
+}
+_DECLARATION_KEYWORD = re.compile(r"\b(" + "|".join(sorted(_DECLARATION_KINDS, key=len, reverse=True)) + r")\b")
+
+# Rotas HTTP: decorators (FastAPI/Flask) e chamadas (Express) do tipo app.get("/caminho", ...)
+_ROUTE_METHODS = {"get", "post", "put", "patch", "delete", "head", "options", "all", "route", "api_route", "websocket"}
+_JS_ROUTE = re.compile(
+    r"\b(?:app|router|server|api)\.(get|post|put|patch|delete|head|options|all)\(\s*['\"`]([^'\"`]+)['\"`]"
+)
+
+# Linhas que pertencem à declaração logo abaixo (comentários, decorators, atributos)
+_LEADING_LINE = re.compile(r"^\s*(?://|/\*|\*|@|#\[)")
+
+
+class CodeChunker:
+    """
+    Divide arquivos em chunks alinhados à sintaxe, com metadados start_line/end_line/symbol.
+
+    - .py: um chunk por símbolo de topo (função/classe) via `ast`; classes grandes demais
+      são divididas por método ("Classe.metodo").
+    - JS/TS/Rust/Go: um chunk por declaração de topo (linha na coluna 0), via regex.
+    - Demais arquivos (ou código com erro de sintaxe): divisão por caracteres com overlap.
+    Símbolos pequenos vizinhos são agrupados até `min_chars`; só símbolos maiores que
+    `max_chars` caem na divisão com overlap.
+    """
+
+    def __init__(
+        self,
+        max_chars: Optional[int] = None,
+        min_chars: Optional[int] = None,
+        text_chunk_size: Optional[int] = None,
+        overlap: Optional[int] = None,
+    ):
+        self.max_chars = max_chars or settings.CODE_CHUNK_MAX_CHARS
+        self.min_chars = min_chars if min_chars is not None else settings.CODE_CHUNK_MIN_CHARS
+        self.text_chunk_size = text_chunk_size or settings.TEXT_CHUNK_SIZE
+        self.overlap = overlap if overlap is not None else settings.TEXT_CHUNK_OVERLAP
+
+    def split(self, text: str, path: str, metadata: Optional[dict] = None) -> List[Document]:
+        return self.split_with_definitions(text, path, metadata)[0]
+
+    def split_with_definitions(
+        self, text: str, path: str, metadata: Optional[dict] = None
+    ) -> Tuple[List[Document], List[Definition]]:
+        """
+        Como `split`, mas também retorna as definições do arquivo (funções, classes, métodos,
+        rotas HTTP...) com suas linhas, extraídas da mesma análise (ast/regex) usada nos chunks.
+        """
+        metadata = metadata or {}
+        lines = text.split("\n")
+        _, ext = os.path.splitext(path)
+
+        segments = None
+        definitions: List[Definition] = []
+        if ext == ".py":
+            tree = self._parse_python(text)
+            if tree is not None:
+                segments = self._python_segments(tree, lines)
+                definitions = self._python_definitions(tree)
+        elif ext in DECLARATION_PATTERNS:
+            segments = self._declaration_segments(lines, DECLARATION_PATTERNS[ext], definitions)
+            if ext in _JS_EXTENSIONS:
+                definitions.extend(self._js_routes(lines))
+
+        if not segments:
+            return self._split_by_chars(text, 1, None, metadata, self.text_chunk_size), definitions
+
+        documents = []
+        for start, end, symbol in self._merge_small(segments, lines):
+            content = "\n".join(lines[start - 1:end])
+            if not content.strip():
+                continue
+            if len(content) > self.max_chars:
+                documents.extend(self._split_by_chars(content, start, symbol, metadata, self.max_chars))
+            else:
+                documents.append(self._document(content, start, end, symbol, metadata))
+        return documents, definitions
+
+    # --- Python ---------------------------------------------------------------------------
+
+    @staticmethod
+    def _parse_python(text: str) -> Optional[ast.Module]:
+        try:
+            return ast.parse(text)
+        except (SyntaxError, ValueError):
+            return None
+
+    def _python_segments(self, tree: ast.Module, lines: List[str]) -> Optional[List[Segment]]:
+        if not tree.body:
+            return None
+        return self._python_body_segments(tree.body, lines, 1, len(lines), None)
+
+    @classmethod
+    def _python_definitions(cls, tree: ast.Module) -> List[Definition]:
+        """Funções e classes de topo, métodos ("Classe.metodo") e rotas declaradas por decorators."""
+        definitions: List[Definition] = []
+        for node in tree.body:
+            if not isinstance(node, _PYTHON_SYMBOLS):
+                continue
+            if isinstance(node, ast.ClassDef):
+                definitions.append((node.name, "class", node.lineno, node.end_lineno))
+                for child in node.body:
+                    if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                        definitions.append((f"{node.name}.{child.name}", "method", child.lineno, child.end_lineno))
+                continue
+            definitions.append((node.name, "function", node.lineno, node.end_lineno))
+            for decorator in node.decorator_list:
+                route = cls._python_route(decorator)
+                if route:
+                    definitions.append((route, "route", decorator.lineno, node.end_lineno))
+        return definitions
+
+    @staticmethod
+    def _python_route(decorator) -> Optional[str]:
+        # @app.get("/users"), @router.post("/x"), @bp.route("/y", methods=["POST"])
+        if not (isinstance(decorator, ast.Call) and isinstance(decorator.func, ast.Attribute)):
+            return None
+        method = decorator.func.attr
+        if method not in _ROUTE_METHODS or not decorator.args:
+            return None
+        path = decorator.args[0]
+        if not (isinstance(path, ast.Constant) and isinstance(path.value, str)):
+            return None
+        verbs = [method.upper()]
+        if method in ("route", "api_route"):
+            verbs = ["GET"]
+            for keyword in decorator.keywords:
+                if keyword.arg == "methods" and isinstance(keyword.value, (ast.List, ast.Tuple)):
+                    verbs = [
+                        item.value.upper() for item in keyword.value.elts
+                        if isinstance(item, ast.Constant) and isinstance(item.value, str)
+                    ] or verbs
+        return f"{'|'.join(verbs)} {path.value}"
+
+    def _python_body_segments(
+        self, body, lines: List[str], first_line: int, last_line: int, container: Optional[str]
+    ) -> List[Segment]:
+        segments: List[Segment] = []
+        prefix = f"{container}." if container else ""
+        prev_end = first_line - 1
+        pending_start = None
+        pending_end = None
+
+        for node in body:
+            end = node.end_lineno
+            if isinstance(node, _PYTHON_SYMBOLS):
+                if pending_start is not None:
+                    segments.append((pending_start, pending_end, container))
+                    pending_start = None
+                start = self._skip_blank(lines, prev_end + 1, end)
+                content = "\n".join(lines[start - 1:end])
+                if isinstance(node, ast.ClassDef) and len(content) > self.max_chars:
+                    # Classe grande: cabeçalho + um chunk por método
+                    segments.extend(self._python_body_segments(node.body, lines, start, end, f"{prefix}{node.name}"))
+                else:
+                    segments.append((start, end, f"{prefix}{node.name}"))
+            else:
+                if pending_start is None:
+                    pending_start = self._skip_blank(lines, prev_end + 1, end)
+                pending_end = end
+            prev_end = end
+
+        if pending_start is not None:
+            segments.append((pending_start, pending_end, container))
+        # Comentários depois do último nó ficam com o último segmento
+        tail = last_line
+        while tail > prev_end and not lines[tail - 1].strip():
+            tail -= 1
+        if segments and tail > segments[-1][1]:
+            segments[-1] = (segments[-1][0], tail, segments[-1][2])
+        return segments
+
+    # --- JS/TS/Rust/Go --------------------------------------------------------------------
+
+    def _declaration_segments(
+        self, lines: List[str], pattern, definitions: Optional[List[Definition]] = None
+    ) -> Optional[List[Segment]]:
+        starts = []
+        declared = []
+        for number, line in enumerate(lines, start=1):
+            match = pattern.match(line)
+            if not match:
+                continue
+            symbol = next((group for group in match.groups() if group), None)
+            if symbol:
+                keyword = _DECLARATION_KEYWORD.search(line[:match.end()])
+                declared.append((symbol, _DECLARATION_KINDS[keyword.group(1)] if keyword else "declaration", number))
+            start = number
+            # Comentários/decorators imediatamente acima pertencem à declaração
+            while start > 1 and _LEADING_LINE.match(lines[start - 2]) and (not starts or start - 1 > starts[-1][0]):
+                start -= 1
+            starts.append((start, symbol))
+        if not starts:
+            return None
+
+        segments: List[Segment] = []
+        if starts[0][0] > 1:
+            segments.append((1, starts[0][0] - 1, None))
+        for index, (start, symbol) in enumerate(starts):
+            end = starts[index + 1][0] - 1 if index + 1 < len(starts) else len(lines)
+            while end > start and not lines[end - 1].strip():
+                end -= 1
+            segments.append((start, end, symbol))
+        if definitions is not None:
+            # A definição termina onde termina o seu segmento (antes da próxima declaração)
+            bounds = [(start, end) for start, end, _ in segments]
+            for name, kind, line in declared:
+                end = next((e for s, e in reversed(bounds) if s <= line), line)
+                definitions.append((name, kind, line, max(end, line)))
+        return segments
+
+    @staticmethod
+    def _js_routes(lines: List[str]) -> List[Definition]:
+        return [
+            (f"{match.group(1).upper()} {match.group(2)}", "route", number, number)
+            for number, line in enumerate(lines, start=1)
+            for match in _JS_ROUTE.finditer(line)
+        ]
+
+    # --- Utilitários ----------------------------------------------------------------------
+
+    @staticmethod
+    def _skip_blank(lines: List[str], start: int, end: int) -> int:
+        while start < end and not lines[start - 1].strip():
+            start += 1
+        return start
+
+    def _merge_small(self, segments: List[Segment], lines: List[str]) -> List[Segment]:
+        """Agrupa segmentos vizinhos pequenos (imports, constantes, funções de uma linha)."""
+        merged: List[Segment] = []
+        size = 0
+        for start, end, symbol in segments:
+            length = sum(len(line) + 1 for line in lines[start - 1:end])
+            if merged and size < self.min_chars and size + length <= self.max_chars:
+                prev_start, _, prev_symbol = merged[-1]
+                names = [name for name in (prev_symbol or "").split(", ") if name]
+                if symbol and symbol not in names:
+                    names.append(symbol)
+                merged[-1] = (prev_start, end, ", ".join(names) or None)
+                size += length
+            else:
+                merged.append((start, end, symbol))
+                size = length
+        return merged
+
+    def _split_by_chars(self, text: str, first_line: int, symbol: Optional[str], metadata: dict, chunk_size: int) -> List[Document]:
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=min(self.overlap, chunk_size // 2),
+            add_start_index=True,
+        )
+        documents = []
+        for piece in splitter.create_documents([text]):
+            offset = piece.metadata["start_index"]
+            start = first_line + text.count("\n", 0, max(offset, 0))
+            end = start + piece.page_content.count("\n")
+            documents.append(self._document(piece.page_content, start, end, symbol, metadata))
+        return documents
+
+    @staticmethod
+    def _document(content: str, start: int, end: int, symbol: Optional[str], metadata: dict) -> Document:
+        chunk_metadata = {**metadata, "start_line": start, "end_line": end}
+        if symbol:
+            chunk_metadata["symbol"] = symbol
+        return Document(page_content=content, metadata=chunk_metadata)
@@ -0,0 +1,120 @@
+from typing import Iterable, List, Optional, Sequence
+from src.core.config import settings
+
+# Maior sobreposição textual procurada entre o fim de um trecho e o início do seguinte
+MAX_TEXT_OVERLAP = 2000
+TRUNCATION_MARKER = "\n...[restante truncado]..."
+
+
+class PackedSnippet:
+    """Trecho contínuo de um arquivo pronto para o prompt (um ou mais hits mesclados)."""
+
+    def __init__(self, source: str, text: str, start_line: Optional[int], end_line: Optional[int], symbols: List[str], rank: int):
+        self.source = source
+        self.text = text
+        self.start_line = start_line
+        self.end_line = end_line
+        self.symbols = symbols
+        # Melhor posição (0 = mais relevante) entre os hits que formam o trecho
+        self.rank = rank
+
+    def header(self, file_label: str = "File", lines_label: str = "lines") -> str:
+        location = ""
+        if self.start_line is not None:
+            location = f" ({lines_label} {self.start_line}-{self.end_line}"
+            location += f", {', '.join(self.symbols)})" if self.symbols else ")"
+        return f"{file_label}: {self.source}{location}"
+
+
+def _text_overlap(left: str, right: str) -> int:
+    """Tamanho do maior sufixo de `left` que também é prefixo de `right` (overlap do splitter)."""
+    limit = min(len(left), len(right), MAX_TEXT_OVERLAP)
+    for size in range(limit, 0, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _merge(current: PackedSnippet, following: PackedSnippet):
+    """Anexa `following` (que começa em ou logo após o fim de `current`) sem repetir texto."""
+    overlap = _text_overlap(current.text, following.text) if following.start_line <= current.end_line else 0
+    if following.start_line > current.end_line:
+        current.text += "\n" + following.text
+    elif overlap:
+        current.text += following.text[overlap:]
+    else:
+        # Faixas se sobrepõem por linhas inteiras: descarta as linhas já presentes
+        repeated = current.end_line - following.start_line + 1
+        remainder = following.text.split("\n")[repeated:]
+        if remainder:
+            current.text += "\n" + "\n".join(remainder)
+    current.end_line = max(current.end_line, following.end_line)
+    current.rank = min(current.rank, following.rank)
+    for symbol in following.symbols:
+        if symbol not in current.symbols:
+            current.symbols.append(symbol)
+
+
+def _snippets(hits: Iterable[Sequence]) -> List[PackedSnippet]:
+    snippets = []
+    for rank, hit in enumerate(hits):
+        text, metadata = hit[0], hit[1] or {}
+        start = metadata.get("start_line")
+        end = metadata.get("end_line", start)
+        symbols = [name for name in (metadata.get("symbol") or "").split(", ") if name]
+        snippets.append(PackedSnippet(metadata.get("source", "unknown"), text, start, end, symbols, rank))
+    return snippets
+
+
+def pack_context(hits: Iterable[Sequence], max_chars: Optional[int] = None) -> List[PackedSnippet]:
+    """
+    Empacota hits de busca ((texto, metadados) ou (texto, metadados, score), em ordem de
+    relevância) para o prompt:
+
+    1. agrupa por arquivo e mescla faixas de linhas contíguas ou sobrepostas num único trecho,
+       sem repetir o overlap do splitter;
+    2. descarta trechos cujo texto já está contido em outro trecho selecionado;
+    3. preenche o orçamento de caracteres (settings.CONTEXT_MAX_CHARS, ~4 caracteres por token)
+       na ordem de relevância; o primeiro trecho que não cabe inteiro é truncado e os demais saem.
+    """
+    budget = settings.CONTEXT_MAX_CHARS if max_chars is None else max_chars
+    by_source = {}
+    merged: List[PackedSnippet] = []
+    for snippet in _snippets(hits):
+        if snippet.start_line is None:
+            merged.append(snippet)
+            continue
+        by_source.setdefault(snippet.source, []).append(snippet)
+
+    for snippets in by_source.values():
+        snippets.sort(key=lambda s: (s.start_line, s.end_line))
+        current = snippets[0]
+        for following in snippets[1:]:
+            if following.start_line <= current.end_line + 1:
+                _merge(current, following)
+            else:
+                merged.append(current)
+                current = following
+        merged.append(current)
+
+    selected: List[PackedSnippet] = []
+    used = 0
+    for snippet in sorted(merged, key=lambda s: s.rank):
+        text = snippet.text.strip("\n")
+        if not text.strip() or any(text in other.text for other in selected):
+            continue
+        remaining = budget - used
+        if remaining <= 0:
+            break
+        if len(text) > remaining:
+            snippet.text = text[:remaining] + TRUNCATION_MARKER
+            selected.append(snippet)
+            break
+        snippet.text = text
+        selected.append(snippet)
+        used += len(text)
+    return selected
+
+
+def render_context(snippets: Iterable[PackedSnippet], file_label: str = "File", lines_label: str = "lines") -> str:
+    return "".join(f"\n{snippet.header(file_label, lines_label)}\n{snippet.text}\n" for snippet in snippets)
@@ -0,0 +1,179 @@
+import os
+import re
+import fnmatch
+from typing import Iterable, List, Optional, Tuple
+from src.core.config import settings
+from src.core.logger import logger
+
+# Arquivos de ignore lidos da raiz do workspace (mesma sintaxe do .gitignore)
+IGNORE_FILES = (".gitignore", ".aiignore")
+
+# Lockfiles, bundles e source maps: grandes, gerados e sem valor para o contexto
+GENERATED_NAME_PATTERNS = (
+    "*.min.js", "*.min.css", "*.bundle.js", "*.chunk.js", "*.map",
+    "package-lock.json", "npm-shrinkwrap.json", "yarn.lock", "pnpm-lock.yaml",
+    "poetry.lock", "Pipfile.lock", "Cargo.lock", "composer.lock", "Gemfile.lock", "go.sum",
+)
+
+# Marcadores de arquivo gerado procurados nas primeiras linhas
+GENERATED_MARKERS = ("@generated", "code generated", "do not edit", "auto-generated", "autogenerated")
+
+SNIFF_BYTES = 64 * 1024
+
+
+def _translate_glob(pattern: str) -> str:
+    """Converte um glob do .gitignore em regex ('**' cruza diretórios, '*' e '?' não)."""
+    out = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            out.append("/.*")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif char == "*":
+            out.append("[^/]*")
+            i += 1
+        elif char == "?":
+            out.append("[^/]")
+            i += 1
+        elif char == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                out.append(re.escape(char))
+                i += 1
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = end + 1
+        elif char == "\\" and i + 1 < len(pattern):
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(char))
+            i += 1
+    return "".join(out)
+
+
+def compile_ignore_pattern(line: str) -> Optional[Tuple["re.Pattern", bool, bool]]:
+    """Compila uma linha de .gitignore em (regex, negada, só_diretório). Retorna None para linhas vazias/comentários."""
+    line = line.rstrip("\n").rstrip()
+    if not line or line.startswith("#"):
+        return None
+    negated = line.startswith("!")
+    if negated:
+        line = line[1:]
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+    # Com '/' no início ou no meio o padrão é relativo à raiz; senão vale em qualquer nível
+    anchored = "/" in line
+    line = line.lstrip("/")
+    prefix = "" if anchored else "(?:.*/)?"
+    return re.compile(f"^{prefix}{_translate_glob(line)}$"), negated, dir_only
+
+
+class IgnoreMatcher:
+    """
+    Regras de ignore do workspace: .gitignore/.aiignore da raiz mais os diretórios fixos
+    (CodeIndexer.EXCLUDE_DIRS). Segue a semântica do git: a última regra que casa decide,
+    '!' reinclui e um diretório ignorado ignora tudo abaixo dele. Os arquivos de ignore
+    são relidos automaticamente quando mudam (refresh).
+    """
+
+    def __init__(self, workspace_path: str, exclude_dirs: Iterable[str] = ()):
+        self.workspace_path = workspace_path
+        self.exclude_dirs = set(exclude_dirs)
+        self._rules: List[Tuple["re.Pattern", bool, bool]] = []
+        self._signature = None
+        self.refresh()
+
+    def _ignore_files_signature(self):
+        signature = []
+        for name in IGNORE_FILES:
+            try:
+                st = os.stat(os.path.join(self.workspace_path, name))
+                signature.append((name, st.st_size, st.st_mtime))
+            except OSError:
+                continue
+        return tuple(signature)
+
+    def refresh(self):
+        if not settings.INDEX_RESPECT_GITIGNORE:
+            self._rules = []
+            return
+        signature = self._ignore_files_signature()
+        if signature == self._signature:
+            return
+        rules = []
+        for name in IGNORE_FILES:
+            path = os.path.join(self.workspace_path, name)
+            try:
+                with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                    for line in f:
+                        rule = compile_ignore_pattern(line)
+                        if rule:
+                            rules.append(rule)
+            except OSError:
+                continue
+        self._rules = rules
+        self._signature = signature
+        if rules:
+            logger.debug(f"{len(rules)} regra(s) de ignore carregada(s) para '{self.workspace_path}'.")
+
+    def _match(self, rel_path: str, is_dir: bool) -> bool:
+        ignored = False
+        for regex, negated, dir_only in self._rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel_path):
+                ignored = not negated
+        return ignored
+
+    def is_ignored(self, rel_path: str, is_dir: bool = False) -> bool:
+        parts = rel_path.split("/")
+        for index in range(len(parts)):
+            part_is_dir = is_dir or index < len(parts) - 1
+            if part_is_dir and parts[index] in self.exclude_dirs:
+                return True
+            if self._rules and self._match("/".join(parts[:index + 1]), part_is_dir):
+                return True
+        return False
+
+
+def is_generated_name(file_name: str) -> bool:
+    return any(fnmatch.fnmatch(file_name, pattern) for pattern in GENERATED_NAME_PATTERNS)
+
+
+def sniff_content(abs_path: str) -> Optional[str]:
+    """
+    Lê o início do arquivo e retorna o motivo para não indexá-lo ('binary', 'minified',
+    'generated') ou None se o conteúdo parece código/texto escrito à mão.
+    """
+    with open(abs_path, "rb") as f:
+        head = f.read(SNIFF_BYTES)
+    if not head:
+        return None
+    if b"\x00" in head:
+        return "binary"
+
+    lines = head.split(b"\n")
+    longest = max(len(line) for line in lines)
+    if longest > settings.INDEX_MAX_LINE_LENGTH:
+        return "minified"
+    # Texto com linhas longas em média (bundle com quebras esparsas)
+    if len(head) > 4096 and len(head) / len(lines) > settings.INDEX_MAX_LINE_LENGTH / 4:
+        return "minified"
+
+    first_lines = b"\n".join(lines[:5]).decode("utf-8", errors="ignore").lower()
+    if any(marker in first_lines for marker in GENERATED_MARKERS):
+        return "generated"
+    return None
@@ -0,0 +1,121 @@
+import ast
+import os
+import re
+import uuid
+from typing import Iterable, List, Optional
+from langchain_core.documents import Document
+from src.core.memory.manifest import CHUNK_ID_NAMESPACE
+from src.core.memory.schema import delete_project_rows
+
+# A tabela de resumos de uma coleção é outra coleção com este sufixo (ex: code_collection_files)
+FILE_SUMMARY_SUFFIX = "_files"
+
+MAX_SUMMARY_SYMBOLS = 40
+MAX_DIGEST_CHARS = 600
+MAX_DIGEST_LINES = 8
+
+_COMMENT_LINE = re.compile(r"^\s*(?:#(?!!)|//|/\*+|\*(?!/)|<!--)\s?(.*?)\s*(?:\*/|-->)?\s*$")
+
+
+def file_summary_collection(collection_name: str) -> str:
+    return f"{collection_name}{FILE_SUMMARY_SUFFIX}"
+
+
+def file_summary_id(project: str, rel_path: str) -> str:
+    """ID determinístico do resumo de um arquivo: cada nova versão do arquivo faz upsert na mesma linha."""
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, f"{project}\x00{rel_path}\x00summary"))
+
+
+def _public_symbols(chunks: Iterable[Document]) -> List[str]:
+    """Símbolos de topo na ordem do arquivo ("Classe.metodo" vira "Classe"), sem os privados (_nome)."""
+    symbols: List[str] = []
+    for chunk in chunks:
+        for name in (chunk.metadata.get("symbol") or "").split(", "):
+            name = name.split(".", 1)[0]
+            if name and not name.startswith("_") and name not in symbols:
+                symbols.append(name)
+    return symbols[:MAX_SUMMARY_SYMBOLS]
+
+
+def _python_docstring(text: str) -> Optional[str]:
+    try:
+        docstring = ast.get_docstring(ast.parse(text))
+    except (SyntaxError, ValueError):
+        return None
+    # Só o primeiro parágrafo: é o resumo; o resto costuma ser detalhe de uso
+    return docstring.split("\n\n", 1)[0] if docstring else None
+
+
+def _markdown_headings(lines: List[str]) -> Optional[str]:
+    headings = [line.lstrip("#").strip() for line in lines if line.startswith("#")]
+    return "\n".join(headings[:MAX_DIGEST_LINES]) or None
+
+
+def _leading_comment(lines: List[str]) -> Optional[str]:
+    """Bloco de comentário do topo do arquivo (depois de shebang/linhas em branco)."""
+    collected = []
+    for line in lines:
+        if not line.strip():
+            if collected:
+                break
+            continue
+        if line.startswith("#!"):
+            continue
+        match = _COMMENT_LINE.match(line)
+        if not match:
+            break
+        if match.group(1):
+            collected.append(match.group(1))
+        if len(collected) >= MAX_DIGEST_LINES:
+            break
+    return "\n".join(collected) or None
+
+
+def _digest(rel_path: str, text: str) -> str:
+    lines = text.split("\n")
+    _, ext = os.path.splitext(rel_path)
+    digest = None
+    if ext == ".py":
+        digest = _python_docstring(text)
+    elif ext == ".md":
+        digest = _markdown_headings(lines)
+    if not digest:
+        digest = _leading_comment(lines)
+    if not digest:
+        # Sem docstring/comentário: as primeiras linhas não vazias dão uma ideia do conteúdo
+        digest = "\n".join([line.strip() for line in lines if line.strip()][:MAX_DIGEST_LINES // 2])
+    return digest[:MAX_DIGEST_CHARS]
+
+
+def build_file_summary(rel_path: str, text: str, chunks: List[Document]) -> Optional[Document]:
+    """
+    Documento-resumo de um arquivo para a tabela de resumos: caminho, símbolos públicos (a partir
+    dos metadados dos chunks) e um digest da docstring do módulo, dos títulos do markdown ou do
+    comentário de topo. Herda os metadados do primeiro chunk (source, project, source_type), sem as
+    linhas/símbolo do trecho. Retorna None para arquivos sem conteúdo.
+    """
+    if not chunks or not text.strip():
+        return None
+    symbols = _public_symbols(chunks)
+    parts = [f"Arquivo: {rel_path}"]
+    if symbols:
+        parts.append(f"Símbolos: {', '.join(symbols)}")
+    digest = _digest(rel_path, text)
+    if digest:
+        parts.append(digest)
+
+    metadata = {
+        key: value for key, value in chunks[0].metadata.items()
+        if key not in ("start_line", "end_line", "symbol")
+    }
+    metadata["path"] = rel_path
+    if symbols:
+        metadata["symbols"] = symbols
+    return Document(page_content="\n".join(parts), metadata=metadata)
+
+
+def delete_project_summaries(handle, collection_name: str, project: str) -> int:
+    """Apaga os resumos de um projeto da tabela de resumos (handle de get_file_summary_store)."""
+    if handle.engine is None:
+        return handle.store.delete_project(project)
+    return delete_project_rows(handle.engine, file_summary_collection(collection_name), project)
@@ -0,0 +1,111 @@
+import os
+import hashlib
+import subprocess
+from typing import Callable, List, Optional, Set
+from src.core.logger import logger
+
+GIT_TIMEOUT_SECONDS = 15
+
+
+class GitSnapshot:
+    """Estado do workspace segundo o git: commit atual, arquivos sujos e um hash desse conjunto sujo."""
+
+    def __init__(self, commit: str, dirty_paths: List[str], dirty_hash: str):
+        self.commit = commit
+        self.dirty_paths = dirty_paths
+        self.dirty_hash = dirty_hash
+
+    def to_dict(self) -> dict:
+        return {"commit": self.commit, "dirty_hash": self.dirty_hash, "dirty_paths": self.dirty_paths}
+
+    def matches(self, state: Optional[dict]) -> bool:
+        return bool(state) and state.get("commit") == self.commit and state.get("dirty_hash") == self.dirty_hash
+
+
+class GitChangeDetector:
+    """
+    Pergunta ao git o que mudou no workspace em vez de percorrer a árvore com stat.
+
+    Funciona também quando o workspace é um subdiretório do repositório: todos os comandos
+    rodam com cwd no workspace e usam caminhos relativos a ele (--relative / ls-files).
+    Qualquer falha (git ausente, diretório fora de um repositório, repositório sem commits,
+    commit anterior inexistente após rebase) retorna None e o chamador volta à varredura completa.
+    `path_filter` descarta caminhos que não interessam ao indexador (ex: node_modules não ignorado
+    pelo git), para que não pesem no hash dos arquivos sujos.
+    """
+
+    def __init__(self, workspace_path: str, path_filter: Optional[Callable[[str], bool]] = None):
+        self.workspace_path = workspace_path
+        self.path_filter = path_filter
+
+    def _git(self, *args: str) -> Optional[str]:
+        try:
+            result = subprocess.run(
+                ["git", "-c", "core.quotepath=off", *args],
+                cwd=self.workspace_path,
+                capture_output=True,
+                text=True,
+                timeout=GIT_TIMEOUT_SECONDS,
+            )
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.debug(f"git indisponível para '{self.workspace_path}': {e}")
+            return None
+        if result.returncode != 0:
+            return None
+        return result.stdout
+
+    @staticmethod
+    def _parse_name_status(output: str) -> Set[str]:
+        # Formato -z: STATUS\0caminho\0 (com --no-renames nunca há dois caminhos)
+        fields = [f for f in output.split("\0") if f]
+        return {fields[i + 1] for i in range(0, len(fields) - 1, 2)}
+
+    def _filtered(self, paths: Set[str]) -> Set[str]:
+        return paths if self.path_filter is None else {p for p in paths if self.path_filter(p)}
+
+    def _untracked(self) -> Optional[Set[str]]:
+        output = self._git("ls-files", "--others", "--exclude-standard", "-z")
+        return None if output is None else self._filtered({p for p in output.split("\0") if p})
+
+    def _diff_against(self, revision: str) -> Optional[Set[str]]:
+        """Arquivos rastreados que diferem entre `revision` e a working tree (commits, stage e edições)."""
+        output = self._git("diff", "--name-status", "--relative", "--no-renames", "--no-ext-diff", "-z", revision)
+        return None if output is None else self._filtered(self._parse_name_status(output))
+
+    def _dirty_hash(self, commit: str, dirty_paths: List[str]) -> str:
+        # O status do git não muda quando um arquivo já modificado é editado de novo; o stat muda
+        h = hashlib.sha256(commit.encode("utf-8"))
+        for rel_path in dirty_paths:
+            try:
+                st = os.stat(os.path.join(self.workspace_path, rel_path))
+                signature = f"{rel_path}\0{st.st_size}\0{st.st_mtime_ns}\n"
+            except OSError:
+                signature = f"{rel_path}\0missing\n"
+            h.update(signature.encode("utf-8"))
+        return h.hexdigest()
+
+    def snapshot(self) -> Optional[GitSnapshot]:
+        commit = self._git("rev-parse", "--verify", "-q", "HEAD")
+        if not commit:
+            return None
+        commit = commit.strip()
+        tracked = self._diff_against("HEAD")
+        untracked = self._untracked()
+        if tracked is None or untracked is None:
+            return None
+        dirty_paths = sorted(tracked | untracked)
+        return GitSnapshot(commit, dirty_paths, self._dirty_hash(commit, dirty_paths))
+
+    def changed_since(self, previous: dict, current: GitSnapshot) -> Optional[List[str]]:
+        """
+        Caminhos (relativos ao workspace) que podem ter mudado desde o estado `previous`:
+        diff do commit anterior contra a working tree, arquivos sujos agora e os que estavam
+        sujos antes (podem ter sido revertidos). None se o commit anterior não existe mais.
+        """
+        previous_commit = previous.get("commit")
+        if not previous_commit:
+            return None
+        committed = self._diff_against(previous_commit)
+        if committed is None:
+            return None
+        return sorted(committed | set(current.dirty_paths) | set(previous.get("dirty_paths", [])))
@@ -0,0 +1,149 @@
+import threading
+import time
+from typing import Dict, Iterable, Optional
+from src.core.config import settings
+from src.core.logger import logger
+
+
+class IndexQueue:
+    """
+    Fila de indexação em segundo plano (uma thread daemon por processo).
+
+    Pedidos de reindexação são agrupados por projeto: uma rajada de escritas vira uma única
+    passada do CodeIndexer, executada depois de `debounce_seconds` sem novos pedidos.
+    Cada pedido devolve um ticket; `wait()` permite a quem precisa de dados frescos esperar
+    até que uma passada iniciada depois do ticket termine. Quem aceita dados antigos não espera.
+    """
+
+    def __init__(self, debounce_seconds: float = 0.5):
+        self.debounce_seconds = debounce_seconds
+        self._cond = threading.Condition()
+        self._pending: Dict[str, dict] = {}
+        self._requested: Dict[str, int] = {}
+        self._completed: Dict[str, int] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="index-queue", daemon=True)
+            self._thread.start()
+
+    def request(self, indexer, paths: Optional[Iterable[str]] = None) -> int:
+        """
+        Agenda (ou reagenda) a indexação do projeto do `indexer` e retorna o ticket do pedido.
+        Pedidos repetidos antes da execução são coalescidos. `paths` restringe a passada aos
+        caminhos alterados; os caminhos de pedidos coalescidos são unidos, e um pedido sem
+        `paths` (varredura completa) prevalece sobre os restritos.
+        """
+        project = indexer.project
+        with self._cond:
+            ticket = self._requested.get(project, 0) + 1
+            self._requested[project] = ticket
+            previous = self._pending.get(project)
+            if paths is None or (previous is not None and previous["paths"] is None):
+                merged = None
+            else:
+                merged = set(previous["paths"]) if previous is not None else set()
+                merged.update(paths)
+            self._pending[project] = {
+                "indexer": indexer,
+                "ticket": ticket,
+                "paths": merged,
+                "last_request": time.monotonic(),
+            }
+            self._ensure_worker()
+            self._cond.notify_all()
+        return ticket
+
+    def completed(self, project: str) -> int:
+        """Maior ticket já atendido para o projeto."""
+        with self._cond:
+            return self._completed.get(project, 0)
+
+    def is_fresh(self, project: str) -> bool:
+        with self._cond:
+            return self._completed.get(project, 0) >= self._requested.get(project, 0)
+
+    def wait(self, project: str, ticket: int, timeout: Optional[float] = None) -> bool:
+        """Espera até o ticket ser atendido. Retorna False se o timeout expirar antes."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._completed.get(project, 0) < ticket:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def _next_due(self):
+        """Retorna (projeto, None) se há um projeto pronto para rodar, ou (None, segundos até o próximo)."""
+        now = time.monotonic()
+        next_in = None
+        for project, entry in self._pending.items():
+            waited = now - entry["last_request"]
+            if waited >= self.debounce_seconds:
+                return project, None
+            remaining = self.debounce_seconds - waited
+            next_in = remaining if next_in is None else min(next_in, remaining)
+        return None, next_in
+
+    def _run(self):
+        while True:
+            with self._cond:
+                project, sleep_for = self._next_due()
+                while project is None:
+                    self._cond.wait(sleep_for)
+                    project, sleep_for = self._next_due()
+                entry = self._pending.pop(project)
+
+            try:
+                if entry["paths"] is None:
+                    entry["indexer"].index_workspace()
+                else:
+                    entry["indexer"].index_workspace(paths=sorted(entry["paths"]))
+            except Exception as e:
+                # O ticket é marcado como atendido mesmo assim: quem espera não pode travar
+                logger.error(f"Falha na indexação em segundo plano do projeto '{project}': {e}")
+
+            with self._cond:
+                self._completed[project] = max(self._completed.get(project, 0), entry["ticket"])
+                self._cond.notify_all()
+
+
+_queue: Optional[IndexQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_index_queue() -> IndexQueue:
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = IndexQueue(debounce_seconds=settings.INDEX_DEBOUNCE_SECONDS)
+        return _queue
+
+
+def schedule_indexing(
+    indexer,
+    wait_timeout: Optional[float] = None,
+    paths: Optional[Iterable[str]] = None,
+) -> int:
+    """
+    Ponto único de entrada para pedir reindexação.
+    - INDEX_QUEUE_MODE="sync": indexa na hora (comportamento antigo).
+    - "background": enfileira e, se wait_timeout > 0, espera no máximo esse tempo por dados frescos.
+    `paths` restringe a passada aos caminhos alterados (None = varredura completa do workspace).
+    Retorna a versão do índice do projeto conhecida ao final da chamada.
+    """
+    if settings.INDEX_QUEUE_MODE == "sync":
+        if paths is None:
+            indexer.index_workspace()
+        else:
+            indexer.index_workspace(paths=list(paths))
+        return indexer.index_version
+
+    queue = get_index_queue()
+    ticket = queue.request(indexer, paths=paths)
+    if wait_timeout and wait_timeout > 0:
+        if not queue.wait(indexer.project, ticket, timeout=wait_timeout):
+            logger.info(f"Índice do projeto '{indexer.project}' ainda não atualizado; seguindo com dados anteriores.")
+    return indexer.index_version
@@ -1,106 +1,481 @@
 import os
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 from langchain_community.document_loaders import TextLoader
-from langchain_postgres import PGVectorStore, PGEngine
-from src.core.llm.embedding_provider import EmbeddingProvider
+from langchain_postgres import PGVectorStore
+from src.core.memory.chunking import CodeChunker
+from src.core.memory.file_filter import IGNORE_FILES, IgnoreMatcher, is_generated_name, sniff_content
+from src.core.memory.file_summary import build_file_summary, file_summary_id
+from src.core.memory.git_changes import GitChangeDetector
+from src.core.memory.registry import get_file_summary_store, get_vector_store, normalize_connection_string
+from src.core.memory.manifest import IndexManifest, chunk_id, file_sha256
+from src.core.memory.schema import SOURCE_TYPE_CODE
+from src.core.config import settings
 from src.core.logger import logger
 
+# Um lock por projeto: a fila em segundo plano e chamadas diretas (ex: update_codebase_memory)
+# nunca indexam o mesmo projeto ao mesmo tempo
+_project_locks: Dict[str, threading.Lock] = {}
+_project_locks_guard = threading.Lock()
+
+
+def _lock_for(project: str) -> threading.Lock:
+    with _project_locks_guard:
+        return _project_locks.setdefault(project, threading.Lock())
+
+
+def code_collection_name() -> str:
+    """Coleção do CodeIndexer; quem lê os manifestos do indexador (ex: find_symbol) usa a mesma."""
+    return os.getenv("PGVECTOR_COLLECTION_NAME", "code_collection")
+
+
 class CodeIndexer:
+    # Lista de diretórios a serem ignorados
+    EXCLUDE_DIRS = {
+        '.git', '__pycache__', 'node_modules', 'venv', '.venv', 'env',
+        'dist', 'build', '.idea', '.vscode', 'site-packages'
+    }
+
+    # Extensões válidas
+    VALID_EXTENSIONS = {
+        '.py', '.js', '.ts', '.html', '.css', '.md', '.txt',
+        '.json', '.yml', '.yaml', '.sh', '.Dockerfile',
+        '.jsx', '.tsx', '.mjs', '.rs', '.go'
+    }
+
     def __init__(self, workspace_path: str):
         if not os.path.isdir(workspace_path):
             raise ValueError(f"O caminho do workspace '{workspace_path}' não é um diretório válido.")
         self.workspace_path = workspace_path
-        self.embedding_provider = EmbeddingProvider()
 
-        self.connection_string = os.getenv("POSTGRES_URL")
-        if not self.connection_string:
+        connection_string = os.getenv("POSTGRES_URL")
+        if not connection_string and settings.VECTOR_STORE_BACKEND == "pgvector":
             raise ValueError("A variável de ambiente POSTGRES_URL não está definida.")
+        self.connection_string = normalize_connection_string(connection_string) if connection_string else None
 
-        # Normaliza para driver psycopg3 quando necessário
-        if "postgresql+psycopg2://" in self.connection_string:
-            self.connection_string = self.connection_string.replace("postgresql+psycopg2://", "postgresql+psycopg://")
-        elif self.connection_string.startswith("postgresql://"):
-            self.connection_string = self.connection_string.replace("postgresql://", "postgresql+psycopg://")
+        self.collection_name = code_collection_name()
+        self.manifest = IndexManifest(self.workspace_path, self.collection_name)
+        # .gitignore/.aiignore do workspace + EXCLUDE_DIRS
+        self.ignore_matcher = IgnoreMatcher(self.workspace_path, self.EXCLUDE_DIRS)
+        self.git = GitChangeDetector(self.workspace_path, path_filter=lambda p: p in IGNORE_FILES or self.is_indexable(p))
 
-        self.collection_name = os.getenv("PGVECTOR_COLLECTION_NAME", "code_collection")
+    @property
+    def project(self) -> str:
+        return self.manifest.project
 
-    def index_workspace(self):
+    @property
+    def index_version(self) -> int:
+        return self.manifest.index_version
+
+    def _scan_workspace(self) -> Dict[str, Tuple[str, os.stat_result]]:
         """
-        Carrega, divide e indexa todos os arquivos de código do workspace no banco de dados vetorial.
-        Usa os.walk manual para filtragem rigorosa de diretórios proibidos.
+        Percorre o workspace e retorna {caminho_relativo: (caminho_absoluto, stat)}
+        para todos os arquivos indexáveis.
+        Usa os.walk manual para filtragem rigorosa de diretórios proibidos/ignorados.
         """
-        logger.info(f"Iniciando indexação do workspace: {self.workspace_path}")
-
-        documents = []
-
-        # Lista de diretórios a serem ignorados
-        exclude_dirs = {
-            '.git', '__pycache__', 'node_modules', 'venv', '.venv', 'env',
-            'dist', 'build', '.idea', '.vscode', 'site-packages'
-        }
-
-        # Extensões válidas
-        valid_extensions = {
-            '.py', '.js', '.ts', '.html', '.css', '.md', '.txt',
-            '.json', '.yml', '.yaml', '.sh', '.Dockerfile'
-        }
-
-        has_files = False
-
+        self.ignore_matcher.refresh()
+        found = {}
         for root, dirs, files in os.walk(self.workspace_path):
+            rel_root = os.path.relpath(root, self.workspace_path).replace(os.sep, "/")
+            rel_root = "" if rel_root == os.curdir else rel_root + "/"
             # Filtragem in-place para impedir que os.walk entre em diretórios proibidos
-            dirs[:] = [d for d in dirs if d not in exclude_dirs]
+            dirs[:] = [
+                d for d in dirs
+                if d not in self.EXCLUDE_DIRS and not self.ignore_matcher.is_ignored(rel_root + d, is_dir=True)
+            ]
 
             for file in files:
-                # Verifica extensão ou nome exato (Dockerfile)
-                _, ext = os.path.splitext(file)
-                if ext in valid_extensions or file == 'Dockerfile':
-                    has_files = True
+                rel_path = rel_root + file
+                if self.is_indexable(rel_path):
                     file_path = os.path.join(root, file)
                     try:
-                        loader = TextLoader(file_path, autodetect_encoding=True)
-                        docs = loader.load()
-                        documents.extend(docs)
-                    except Exception as e:
-                        logger.warning(f"Erro ao carregar arquivo {file_path}: {e}")
+                        st = os.stat(file_path)
+                    except OSError as e:
+                        logger.warning(f"Erro ao acessar arquivo {file_path}: {e}")
+                        continue
+                    if self._within_size_limit(rel_path, st):
+                        found[rel_path] = (file_path, st)
+        return found
+
+    def is_indexable(self, rel_path: str) -> bool:
+        """
+        Critério por caminho: extensão válida (ou Dockerfile), fora de EXCLUDE_DIRS e das regras
+        do .gitignore/.aiignore, e sem nome de arquivo gerado (lockfiles, *.min.js, source maps).
+        """
+        rel_path = rel_path.replace(os.sep, "/")
+        name = rel_path.rsplit("/", 1)[-1]
+        _, ext = os.path.splitext(name)
+        if ext not in self.VALID_EXTENSIONS and name != 'Dockerfile':
+            return False
+        if is_generated_name(name):
+            return False
+        return not self.ignore_matcher.is_ignored(rel_path)
+
+    @staticmethod
+    def _within_size_limit(rel_path: str, st: os.stat_result) -> bool:
+        limit = settings.INDEX_MAX_FILE_BYTES
+        if limit and st.st_size > limit:
+            logger.debug(f"Ignorando '{rel_path}': {st.st_size} bytes excede INDEX_MAX_FILE_BYTES ({limit}).")
+            return False
+        return True
+
+    def to_relative(self, path: str) -> Optional[str]:
+        """Converte um caminho (absoluto ou relativo ao workspace) para a forma usada no manifesto."""
+        if not os.path.isabs(path):
+            path = os.path.join(self.workspace_path, path)
+        rel_path = os.path.relpath(os.path.abspath(path), os.path.abspath(self.workspace_path))
+        if rel_path == os.curdir or rel_path.startswith(os.pardir):
+            return None
+        return rel_path.replace(os.sep, "/")
+
+    def _scan_paths(self, rel_paths: Iterable[str]) -> Tuple[Dict[str, Tuple[str, os.stat_result]], Set[str]]:
+        """
+        Versão restrita de _scan_workspace: examina só os caminhos informados (arquivos ou
+        diretórios, ex: vindos do watcher). Retorna (encontrados, escopo), onde o escopo inclui
+        as entradas do manifesto sob esses caminhos, para que remoções também sejam detectadas.
+        """
+        self.ignore_matcher.refresh()
+        found = {}
+        scope: Set[str] = set()
+        manifest_paths = self.manifest.paths()
+        for rel_path in rel_paths:
+            prefix = rel_path.rstrip("/") + "/"
+            scope.add(rel_path)
+            scope.update(p for p in manifest_paths if p.startswith(prefix))
+
+            abs_path = os.path.join(self.workspace_path, rel_path)
+            if os.path.isdir(abs_path):
+                if self.ignore_matcher.is_ignored(rel_path, is_dir=True):
+                    continue
+                for root, dirs, files in os.walk(abs_path):
+                    rel_root = os.path.relpath(root, self.workspace_path).replace(os.sep, "/") + "/"
+                    dirs[:] = [
+                        d for d in dirs
+                        if d not in self.EXCLUDE_DIRS and not self.ignore_matcher.is_ignored(rel_root + d, is_dir=True)
+                    ]
+                    for file in files:
+                        file_path = os.path.join(root, file)
+                        file_rel = rel_root + file
+                        if self.is_indexable(file_rel):
+                            scope.add(file_rel)
+                            try:
+                                st = os.stat(file_path)
+                            except OSError as e:
+                                logger.warning(f"Erro ao acessar arquivo {file_path}: {e}")
+                                continue
+                            if self._within_size_limit(file_rel, st):
+                                found[file_rel] = (file_path, st)
+            elif os.path.isfile(abs_path) and self.is_indexable(rel_path):
+                try:
+                    st = os.stat(abs_path)
+                except OSError as e:
+                    logger.warning(f"Erro ao acessar arquivo {abs_path}: {e}")
+                    continue
+                if self._within_size_limit(rel_path, st):
+                    found[rel_path] = (abs_path, st)
+        return found, scope
+
+    def _diff_against_manifest(
+        self,
+        found: Dict[str, Tuple[str, os.stat_result]],
+        scope: Optional[Set[str]] = None,
+    ):
+        """
+        Compara o estado atual com o manifesto.
+        Retorna (alterados, removidos), onde alterados é uma lista de
+        (rel_path, abs_path, stat, sha256) e removidos é uma lista de rel_paths.
+        Arquivos com mesmo size/mtime são ignorados sem leitura; se só o mtime mudou
+        mas o hash é o mesmo, apenas o manifesto é atualizado. Com `scope`, só entradas do
+        manifesto dentro do escopo podem ser consideradas removidas.
+        Arquivos novos/alterados passam por uma inspeção do conteúdo (binário, minificado,
+        gerado); os rejeitados são tratados como ausentes e saem do índice se já estavam nele.
+        """
+        changed = []
+        rejected = set()
+        for rel_path, (abs_path, st) in found.items():
+            if self.manifest.is_unchanged(rel_path, st.st_size, st.st_mtime):
+                continue
+            try:
+                reason = sniff_content(abs_path)
+                if reason:
+                    logger.debug(f"Ignorando '{rel_path}': conteúdo {reason}.")
+                    rejected.add(rel_path)
+                    continue
+                digest = file_sha256(abs_path)
+            except OSError as e:
+                logger.warning(f"Erro ao ler arquivo {abs_path}: {e}")
+                continue
+
+            entry = self.manifest.get(rel_path)
+            if entry and entry.get("sha256") == digest:
+                # Conteúdo idêntico (ex: 'touch'): só atualiza o stat no manifesto
+                self.manifest.update(
+                    rel_path, st.st_size, st.st_mtime, digest, entry.get("chunk_ids", []), entry.get("symbols")
+                )
+                continue
+            changed.append((rel_path, abs_path, st, digest))
+
+        removed = [
+            p for p in self.manifest.paths()
+            if (p not in found or p in rejected) and (scope is None or p in scope)
+        ]
+        return changed, removed
 
-        if not has_files:
+    def _load_chunks(self, rel_path: str, abs_path: str, chunker: CodeChunker):
+        """
+        Lê e divide um arquivo (roda nas threads de leitura).
+        Retorna (chunks, chunk_ids, resumo do arquivo ou None, definições) ou None se a leitura falhar.
+        """
+        try:
+            loader = TextLoader(abs_path, autodetect_encoding=True)
+            docs = loader.load()
+            chunks, definitions = [], []
+            for doc in docs:
+                doc_chunks, doc_definitions = chunker.split_with_definitions(doc.page_content, rel_path, doc.metadata)
+                chunks.extend(doc_chunks)
+                definitions.extend(doc_definitions)
+        except Exception as e:
+            logger.warning(f"Erro ao carregar arquivo {abs_path}: {e}")
+            return None
+
+        project = self.manifest.project
+        for chunk in chunks:
+            chunk.metadata["project"] = project
+            chunk.metadata["source_type"] = SOURCE_TYPE_CODE
+        # IDs determinísticos: o mesmo chunk no mesmo lugar gera sempre o mesmo ID
+        chunk_ids = [chunk_id(project, rel_path, ordinal, chunk.page_content) for ordinal, chunk in enumerate(chunks)]
+        summary = None
+        if settings.INDEX_FILE_SUMMARIES:
+            summary = build_file_summary(rel_path, "\n".join(doc.page_content for doc in docs), chunks)
+        return chunks, chunk_ids, summary, definitions
+
+    def _iter_file_chunks(self, changed: List[tuple]) -> Iterator[tuple]:
+        """
+        Gera (rel_path, stat, sha256, chunks, chunk_ids, resumo, definições) arquivo a arquivo, na ordem de `changed`.
+        A leitura/divisão roda em um pool de threads, mas no máximo 2 arquivos por thread ficam
+        em memória à frente do consumidor, então o pico de memória não cresce com o workspace.
+        """
+        # Um chunk por símbolo (com start_line/end_line/symbol) em código; overlap só no resto
+        chunker = CodeChunker()
+        workers = max(1, settings.INDEX_READ_WORKERS)
+        window = deque()
+        items = iter(changed)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="index-reader") as pool:
+            def submit_next() -> bool:
+                item = next(items, None)
+                if item is None:
+                    return False
+                rel_path, abs_path, st, digest = item
+                window.append((rel_path, st, digest, pool.submit(self._load_chunks, rel_path, abs_path, chunker)))
+                return True
+
+            while len(window) < workers * 2 and submit_next():
+                pass
+            while window:
+                rel_path, st, digest, future = window.popleft()
+                submit_next()
+                result = future.result()
+                if result is None:
+                    continue
+                yield (rel_path, st, digest, *result)
+
+    def _create_store(self) -> PGVectorStore:
+        # Reutiliza o store "quente" do processo (esquema já validado, engines já conectados)
+        return get_vector_store(self.connection_string, self.collection_name).store
+
+    def _create_summary_store(self):
+        return get_file_summary_store(self.connection_string, self.collection_name).store
+
+    def index_workspace(
+        self,
+        paths: Optional[Iterable[str]] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ):
+        """
+        Indexa de forma incremental os arquivos de código do workspace no banco de dados vetorial.
+        Apenas arquivos novos ou alterados desde a última execução (segundo o manifesto
+        persistido) são carregados e divididos. Cada chunk recebe um ID determinístico
+        (projeto, caminho, ordinal, hash do conteúdo): chunks novos sofrem upsert, chunks
+        idênticos não são re-embedados e chunks que deixaram de existir são apagados da coleção.
+        Quando algo muda, a versão do índice do projeto é incrementada.
+
+        `paths` (opcional) restringe a passada aos caminhos informados, absolutos ou relativos
+        ao workspace (ex: eventos do WorkspaceWatcher), evitando percorrer o workspace inteiro.
+
+        Os arquivos são lidos em paralelo e processados em fluxo: chunks são embedados e
+        gravados em lotes de settings.INDEX_BATCH_SIZE, e o manifesto é salvo a cada lote.
+        Uma falha no meio preserva o que já foi gravado e a próxima passada continua dali.
+        Com settings.INDEX_FILE_SUMMARIES, cada arquivo alterado também tem seu resumo (caminho,
+        símbolos públicos, docstring) gravado na tabela de resumos usada pela busca em dois níveis.
+        `progress_callback(arquivos_gravados, arquivos_alterados)` é chamado a cada lote.
+        """
+        with _lock_for(self.project):
+            self._index_workspace(paths, progress_callback)
+
+    def _index_workspace(
+        self,
+        paths: Optional[Iterable[str]] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ):
+        logger.info(f"Iniciando indexação do workspace: {self.workspace_path}")
+
+        # Outra instância (ou processo) pode ter indexado desde a nossa última leitura
+        self.manifest.load()
+
+        # Sem caminhos informados, o git (quando disponível) diz o que mudou sem percorrer a árvore
+        snapshot = None
+        if paths is None and settings.INDEX_GIT_CHANGE_DETECTION:
+            snapshot = self.git.snapshot()
+            if snapshot is not None:
+                previous = self.manifest.git_state
+                if snapshot.matches(previous) and self.manifest.paths():
+                    logger.info("Nenhuma alteração segundo o git desde a última indexação. Pulando indexação.")
+                    return
+                paths = self.git.changed_since(previous, snapshot) if previous else None
+                # Regras de ignore mudaram: só a varredura completa sabe o que entra e o que sai
+                if paths is not None and any(p in IGNORE_FILES for p in paths):
+                    paths = None
+                if paths is not None:
+                    logger.info(f"Git: {len(paths)} caminho(s) alterado(s) desde o commit {previous['commit'][:8]}.")
+
+        self._run_pass(paths, progress_callback)
+
+        if snapshot is not None:
+            # Só registra o estado do git depois de uma passada completa sem erros
+            self.manifest.git_state = snapshot.to_dict()
+            self.manifest.save()
+
+    def _run_pass(
+        self,
+        paths: Optional[Iterable[str]] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ):
+        scope = None
+        if paths is None:
+            found = self._scan_workspace()
+        else:
+            rel_paths = {rel for rel in (self.to_relative(p) for p in paths) if rel}
+            if not rel_paths:
+                logger.info("Nenhum caminho do workspace entre os alterados. Pulando indexação.")
+                return
+            found, scope = self._scan_paths(rel_paths)
+
+        if not found and not self.manifest.paths():
             logger.info("Workspace vazio ou sem arquivos de código relevantes. Pulando indexação.")
             return
 
-        if not documents:
-            logger.warning("Nenhum documento válido encontrado para indexar após filtragem.")
+        changed, removed = self._diff_against_manifest(found, scope)
+
+        if not changed and not removed:
+            # Pode ter havido atualização de mtime (conteúdo igual); persiste para a próxima verificação rápida
+            self.manifest.save()
+            logger.info("Nenhuma alteração desde a última indexação. Pulando indexação.")
             return
 
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-        splits = text_splitter.split_documents(documents)
+        logger.info(
+            f"Indexação incremental: {len(changed)} arquivo(s) alterado(s), {len(removed)} removido(s), "
+            f"{len(found) - len(changed)} inalterado(s) na coleção '{self.collection_name}'..."
+        )
 
-        if not splits:
-            logger.warning("Nenhum chunk gerado após split.")
-            return
+        batch_size = max(1, settings.INDEX_BATCH_SIZE)
+        store = None
+        summary_store = None
+        batch_docs: List = []
+        batch_ids: List[str] = []
+        pending_files: List[tuple] = []
+        pending_summaries: List[tuple] = []
+        uncommitted = 0
+        files_done = 0
+        committed = False
+
+        def flush():
+            # add_documents com IDs explícitos faz upsert (ON CONFLICT DO UPDATE); embeda só este lote
+            nonlocal store
+            if not batch_docs:
+                return
+            if store is None:
+                store = self._create_store()
+            store.add_documents(list(batch_docs), ids=list(batch_ids))
+            batch_docs.clear()
+            batch_ids.clear()
 
-        embeddings = self.embedding_provider.get_embeddings()
+        def flush_summaries(removed_paths: List[str]):
+            # Upsert pelo ID do arquivo; arquivos apagados (ou agora vazios) perdem o resumo
+            nonlocal summary_store
+            project = self.manifest.project
+            written = [(file_summary_id(project, p), summary) for p, summary in pending_summaries if summary is not None]
+            stale = [file_summary_id(project, p) for p, summary in pending_summaries if summary is None]
+            stale.extend(file_summary_id(project, p) for p in removed_paths)
+            pending_summaries.clear()
+            if not written and not stale:
+                return
+            if summary_store is None:
+                summary_store = self._create_summary_store()
+            if written:
+                summary_store.add_documents([summary for _, summary in written], ids=[i for i, _ in written])
+            if stale:
+                summary_store.delete(ids=stale)
 
-        logger.info(f"Indexando {len(splits)} chunks de documentos na coleção '{self.collection_name}'...")
+        def commit(removed_paths: List[str] = ()):
+            # Checkpoint: só arquivos com todos os chunks gravados entram no manifesto.
+            # Se o processo cair depois daqui, a próxima passada recomeça a partir deste ponto.
+            nonlocal store, uncommitted, files_done, committed
+            flush()
+            if settings.INDEX_FILE_SUMMARIES:
+                flush_summaries(removed_paths)
+            stale_ids = [i for *_, stale, _ in pending_files for i in stale]
+            stale_ids.extend(i for rel_path in removed_paths for i in self.manifest.get(rel_path).get("chunk_ids", []))
+            if stale_ids:
+                if store is None:
+                    store = self._create_store()
+                store.delete(ids=stale_ids)
+            for rel_path, st, digest, chunk_ids, _, definitions in pending_files:
+                self.manifest.update(rel_path, st.st_size, st.st_mtime, digest, chunk_ids, definitions)
+            for rel_path in removed_paths:
+                self.manifest.remove(rel_path)
+            files_done += len(pending_files)
+            committed = committed or bool(pending_files) or bool(removed_paths)
+            pending_files.clear()
+            uncommitted = 0
+            self.manifest.save()
+            logger.info(f"Indexação: {files_done}/{len(changed)} arquivo(s) gravado(s).")
+            if progress_callback:
+                progress_callback(files_done, len(changed))
 
-        # Cria ou atualiza o banco de dados vetorial com os novos documentos
         try:
-            # A API instalada (langchain-postgres 0.0.16) espera um PGEngine e usa 'table_name'
-            engine = PGEngine.from_connection_string(self.connection_string)
-
-            store = PGVectorStore.create_sync(
-                engine=engine,
-                embedding_service=embeddings,
-                table_name=self.collection_name,
-                id_column="langchain_id",
-                metadata_json_column="cmetadata",
-            )
-
-            # Observação: algumas versões não expõem 'drop'/'clear'.
-            # Mantemos apenas a adição; se necessário, a limpeza pode ser feita externamente.
-            store.add_documents(splits)
+            for rel_path, st, digest, chunks, chunk_ids, summary, definitions in self._iter_file_chunks(changed):
+                entry = self.manifest.get(rel_path)
+                old_ids = set(entry.get("chunk_ids", [])) if entry else set()
+                for doc, cid in zip(chunks, chunk_ids):
+                    # Chunk idêntico já presente na coleção: não precisa ser re-embedado
+                    if cid in old_ids:
+                        continue
+                    batch_docs.append(doc)
+                    batch_ids.append(cid)
+                    uncommitted += 1
+                    if len(batch_docs) >= batch_size:
+                        flush()
+
+                # Chunks que deixaram de existir (arquivo encolheu ou trecho mudou)
+                new_ids = set(chunk_ids)
+                stale = [i for i in old_ids if i not in new_ids]
+                pending_files.append((rel_path, st, digest, chunk_ids, stale, definitions))
+                if settings.INDEX_FILE_SUMMARIES:
+                    pending_summaries.append((rel_path, summary))
+                uncommitted += 1
+                if uncommitted >= batch_size:
+                    commit()
+            # Último lote leva junto a remoção dos arquivos apagados
+            commit(removed)
         except Exception as e:
             logger.error(f"Falha ao indexar documentos no PGVectorStore: {e}")
             raise
+        finally:
+            # Lotes já confirmados ficam visíveis: a versão sobe mesmo se a passada parar no meio
+            if committed:
+                self.manifest.bump_version()
+            self.manifest.save()
 
         logger.info("Indexação do workspace concluída com sucesso.")
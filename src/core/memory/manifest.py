@@ -0,0 +1,230 @@
+import os
+import json
+import uuid
+import hashlib
+import tempfile
+import threading
+from typing import Dict, List, Optional
+from src.core.config import settings
+from src.core.logger import logger
+
+# Última versão de índice conhecida no processo, por (coleção, projeto)
+_index_versions: Dict[tuple, int] = {}
+_versions_lock = threading.Lock()
+
+
+def project_key(workspace_path: str) -> str:
+    """
+    Gera uma chave estável e legível para o projeto a partir do caminho do workspace.
+    Formato: <nome-do-diretorio>-<hash curto do caminho absoluto>.
+    """
+    absolute = os.path.realpath(os.path.abspath(workspace_path))
+    digest = hashlib.sha1(absolute.encode("utf-8")).hexdigest()[:8]
+    name = os.path.basename(absolute.rstrip(os.sep)) or "root"
+    return f"{name}-{digest}"
+
+
+CHUNK_ID_NAMESPACE = uuid.UUID("6f1c2b4e-7a1d-4f5e-9a2b-3c4d5e6f7a8b")
+
+
+def chunk_id(project: str, rel_path: str, ordinal: int, content: str) -> str:
+    """
+    ID determinístico (UUIDv5) de um chunk, derivado de (projeto, caminho, ordinal, hash do conteúdo).
+    O mesmo chunk gera sempre o mesmo ID, permitindo upsert em vez de duplicação.
+    """
+    content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, f"{project}\x00{rel_path}\x00{ordinal}\x00{content_hash}"))
+
+
+def file_sha256(path: str, block_size: int = 65536) -> str:
+    """Calcula o SHA-256 do conteúdo de um arquivo em blocos."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class IndexManifest:
+    """
+    Manifesto persistido por projeto com o estado da última indexação.
+    Para cada arquivo (caminho relativo ao workspace) guarda: size, mtime, sha256, chunk_ids e as
+    definições (símbolos) encontradas no arquivo, base da tabela de símbolos do projeto.
+    É gravado como JSON em settings.INDEX_STATE_DIR, fora do workspace, para não
+    poluir o repositório do projeto gerado.
+    """
+
+    # 2: chunking sintático (CodeChunker); muda os IDs dos chunks de todos os arquivos
+    # 3: resumos por arquivo (busca em dois níveis); todo arquivo precisa ganhar o seu
+    # 4: definições por arquivo (tabela de símbolos)
+    VERSION = 4
+
+    def __init__(self, workspace_path: str, collection_name: str, state_dir: Optional[str] = None):
+        self.workspace_path = workspace_path
+        self.collection_name = collection_name
+        self.project = project_key(workspace_path)
+        self.state_dir = state_dir or settings.INDEX_STATE_DIR
+        self.path = os.path.join(self.state_dir, f"{self.collection_name}__{self.project}.json")
+        self.files: Dict[str, dict] = {}
+        self.index_version = 0
+        # Último estado do git indexado por completo: {"commit", "dirty_hash", "dirty_paths"}
+        self.git_state: Optional[dict] = None
+        self.load()
+
+    def load(self):
+        self.git_state = None
+        if not os.path.exists(self.path):
+            self.files = {}
+            self.index_version = 0
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != self.VERSION:
+                logger.info(f"Manifesto de índice '{self.path}' em versão antiga. Reindexando do zero.")
+                # Mantém só os chunk_ids: todo arquivo é reprocessado e os chunks antigos apagados como obsoletos
+                self.files = {
+                    rel_path: {"chunk_ids": entry.get("chunk_ids", [])}
+                    for rel_path, entry in data.get("files", {}).items()
+                }
+                self.index_version = data.get("index_version", 0)
+                self._publish_version()
+                return
+            self.files = data.get("files", {})
+            self.index_version = data.get("index_version", 0)
+            self.git_state = data.get("git")
+            self._publish_version()
+        except Exception as e:
+            logger.warning(f"Manifesto de índice corrompido em '{self.path}': {e}. Reindexando do zero.")
+            self.files = {}
+
+    def save(self):
+        os.makedirs(self.state_dir, exist_ok=True)
+        payload = {
+            "version": self.VERSION,
+            "project": self.project,
+            "workspace": os.path.abspath(self.workspace_path),
+            "index_version": self.index_version,
+            "files": self.files,
+            "git": self.git_state,
+        }
+        # Escrita atômica: evita manifesto truncado se o processo morrer no meio
+        fd, tmp_path = tempfile.mkstemp(dir=self.state_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _publish_version(self):
+        with _versions_lock:
+            key = (self.collection_name, self.project)
+            _index_versions[key] = max(_index_versions.get(key, 0), self.index_version)
+
+    def bump_version(self) -> int:
+        """Incrementa a versão do índice do projeto (chamado quando o conteúdo indexado muda)."""
+        with _versions_lock:
+            key = (self.collection_name, self.project)
+            # Nunca retrocede, mesmo que o manifesto em disco tenha sido apagado/invalidado
+            self.index_version = max(self.index_version, _index_versions.get(key, 0)) + 1
+            _index_versions[key] = self.index_version
+        return self.index_version
+
+    def get(self, rel_path: str) -> Optional[dict]:
+        return self.files.get(rel_path)
+
+    def is_unchanged(self, rel_path: str, size: int, mtime: float) -> bool:
+        """Verificação rápida via stat (sem ler o arquivo)."""
+        entry = self.files.get(rel_path)
+        return bool(entry) and entry.get("size") == size and entry.get("mtime") == mtime
+
+    def update(
+        self, rel_path: str, size: int, mtime: float, sha256: str, chunk_ids: List[str],
+        symbols: Optional[List[list]] = None,
+    ):
+        """`symbols`: definições do arquivo como [nome, tipo, linha inicial, linha final]."""
+        self.files[rel_path] = {
+            "size": size,
+            "mtime": mtime,
+            "sha256": sha256,
+            "chunk_ids": list(chunk_ids),
+            "symbols": [list(definition) for definition in symbols or []],
+        }
+
+    def remove(self, rel_path: str) -> List[str]:
+        """Remove a entrada e retorna os chunk_ids que ela possuía."""
+        entry = self.files.pop(rel_path, None)
+        return list(entry.get("chunk_ids", [])) if entry else []
+
+    def paths(self) -> List[str]:
+        return list(self.files.keys())
+
+    def clear(self):
+        self.files = {}
+        self.git_state = None
+        self.bump_version()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    @staticmethod
+    def invalidate_collection(collection_name: str, state_dir: Optional[str] = None):
+        """
+        Apaga os manifestos de todos os projetos de uma coleção.
+        Deve ser chamado quando a tabela vetorial é recriada, senão o indexador
+        consideraria indexados arquivos cujos chunks não existem mais.
+        """
+        state_dir = state_dir or settings.INDEX_STATE_DIR
+        with _versions_lock:
+            # Invalida qualquer cache derivado: a próxima versão de cada projeto será maior
+            for key in list(_index_versions):
+                if key[0] == collection_name:
+                    _index_versions[key] += 1
+        if not os.path.isdir(state_dir):
+            return
+        prefix = f"{collection_name}__"
+        for name in os.listdir(state_dir):
+            if name.startswith(prefix) and name.endswith(".json"):
+                os.remove(os.path.join(state_dir, name))
+        logger.info(f"Manifestos de indexação da coleção '{collection_name}' invalidados.")
+
+    @staticmethod
+    def invalidate_project(collection_name: str, project: str, state_dir: Optional[str] = None):
+        """
+        Apaga o manifesto de um único projeto (ex: após remover as linhas do projeto da coleção).
+        A versão do índice continua crescendo para invalidar caches derivados.
+        """
+        state_dir = state_dir or settings.INDEX_STATE_DIR
+        version = current_index_version(collection_name, project)
+        with _versions_lock:
+            _index_versions[(collection_name, project)] = version + 1
+        path = os.path.join(state_dir, f"{collection_name}__{project}.json")
+        if os.path.exists(path):
+            os.remove(path)
+        logger.info(f"Manifesto de indexação do projeto '{project}' na coleção '{collection_name}' invalidado.")
+
+
+def collection_index_version(collection_name: str) -> int:
+    """
+    Versão agregada da coleção no processo (soma das versões conhecidas dos projetos).
+    Como as versões só crescem, qualquer incremento em qualquer projeto muda o valor; serve
+    de chave de cache para buscas sem filtro de projeto.
+    """
+    with _versions_lock:
+        return sum(version for (collection, _), version in _index_versions.items() if collection == collection_name)
+
+
+def current_index_version(collection_name: str, project: str) -> int:
+    """Versão atual do índice de um projeto (0 se nunca indexado neste processo nem em disco)."""
+    with _versions_lock:
+        version = _index_versions.get((collection_name, project))
+    if version is not None:
+        return version
+    path = os.path.join(settings.INDEX_STATE_DIR, f"{collection_name}__{project}.json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("index_version", 0)
+    except (OSError, ValueError):
+        return 0
@@ -0,0 +1,461 @@
+import os
+import json
+import glob
+import heapq
+import threading
+from collections import Counter
+from typing import Collection, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from src.core.config import settings
+from src.core.logger import logger
+from src.core.memory.manifest import IndexManifest
+from src.core.memory.ranking import lexical_query, tokenize
+from src.core.memory.schema import PARTITION_COLUMNS, SOURCE_TYPE_CODE, SOURCE_TYPE_KNOWLEDGE_BASE
+
+# Partição das linhas sem projeto (ex: base de conhecimento)
+SHARED_PARTITION = "_shared"
+FORMAT_VERSION = 1
+# Linhas multiplicadas por bloco na busca: limita a cópia float16 -> float32 em memória
+SCORE_BLOCK_ROWS = 8192
+# Compacta quando as linhas mortas (apagadas/substituídas) passam disso e das linhas vivas
+COMPACT_MIN_DEAD_ROWS = 1024
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class _Partition:
+    """
+    Vetores e documentos de um projeto em dois arquivos:
+
+    - `<base>.<geração>.vec`: matriz (linhas x dimensão) crua, normalizada, lida via np.memmap;
+    - `<base>.jsonl`: cabeçalho (dimensão, dtype, modelo, arquivo .vec atual) seguido de um log
+      append-only de operações {"op": "add", "start", "items"} / {"op": "delete", "ids"}.
+
+    Escritas só acrescentam bytes (custo proporcional ao lote, não à partição). Os vetores são
+    gravados antes da linha do log, então uma queda no meio deixa no máximo linhas órfãs no .vec,
+    descartadas na próxima compactação. A compactação grava um .vec de nova geração e troca o
+    log atomicamente (os.replace), de modo que o par em disco é sempre consistente.
+    """
+
+    def __init__(self, base_path: str, dimension: int, dtype: str, identity: str):
+        self.base_path = base_path
+        self.log_path = f"{base_path}.jsonl"
+        self.dimension = dimension
+        self.dtype = np.dtype(dtype)
+        self.identity = identity
+        self.generation = 0
+        self.records: List[Optional[dict]] = []
+        self.id_to_row: Dict[str, int] = {}
+        self._matrix: Optional[np.memmap] = None
+        self._masks: Dict[Optional[str], np.ndarray] = {}
+        self._tokens: Dict[int, Counter] = {}
+
+    @property
+    def vectors_path(self) -> str:
+        return f"{self.base_path}.{self.generation}.vec"
+
+    @property
+    def live_count(self) -> int:
+        return len(self.id_to_row)
+
+    def _header(self) -> dict:
+        return {
+            "version": FORMAT_VERSION,
+            "dimension": self.dimension,
+            "dtype": self.dtype.name,
+            "identity": self.identity,
+            "generation": self.generation,
+        }
+
+    # --- Persistência ---------------------------------------------------------------------
+
+    def load(self) -> bool:
+        """Carrega a partição do disco. Retorna False se ela existia mas foi descartada (modelo/dimensão diferentes)."""
+        if not os.path.exists(self.log_path):
+            return True
+        try:
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                header = json.loads(f.readline())
+                expected = self._header()
+                if any(header.get(key) != expected[key] for key in ("version", "dimension", "dtype", "identity")):
+                    logger.info(f"Partição vetorial '{self.log_path}' de outro modelo/formato. Descartando.")
+                    self.drop()
+                    return False
+                self.generation = header.get("generation", 0)
+                disk_rows = self._disk_rows()
+                self.records = [None] * disk_rows
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Linha truncada por queda durante a escrita: tudo antes dela é válido
+                        break
+                    if entry.get("op") == "add":
+                        self._apply_add(entry["start"], entry["items"], disk_rows)
+                    elif entry.get("op") == "delete":
+                        self._apply_delete(entry["ids"])
+        except Exception as e:
+            logger.warning(f"Partição vetorial corrompida em '{self.log_path}': {e}. Descartando.")
+            self.drop()
+            return False
+        return True
+
+    def _disk_rows(self) -> int:
+        try:
+            size = os.path.getsize(self.vectors_path)
+        except OSError:
+            return 0
+        return size // (self.dimension * self.dtype.itemsize)
+
+    def _append_log(self, entry: dict):
+        os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+        if not os.path.exists(self.log_path):
+            with open(self.log_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps(self._header()) + "\n")
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    def drop(self):
+        for path in [self.log_path] + glob.glob(f"{glob.escape(self.base_path)}.*.vec"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.generation = 0
+        self.records = []
+        self.id_to_row = {}
+        self._tokens = {}
+        self._invalidate()
+
+    def _invalidate(self):
+        self._matrix = None
+        self._masks = {}
+
+    # --- Mutação --------------------------------------------------------------------------
+
+    def _apply_add(self, start: int, items: List[dict], disk_rows: int):
+        for offset, item in enumerate(items):
+            row = start + offset
+            if row >= disk_rows:
+                break
+            previous = self.id_to_row.get(item["id"])
+            if previous is not None:
+                self.records[previous] = None
+                self._tokens.pop(previous, None)
+            self.records[row] = item
+            self.id_to_row[item["id"]] = row
+
+    def _apply_delete(self, ids: Iterable[str]) -> int:
+        deleted = 0
+        for id_ in ids:
+            row = self.id_to_row.pop(id_, None)
+            if row is not None:
+                self.records[row] = None
+                self._tokens.pop(row, None)
+                deleted += 1
+        return deleted
+
+    def add(self, vectors: np.ndarray, items: List[dict]):
+        start = self._disk_rows()
+        os.makedirs(os.path.dirname(self.base_path), exist_ok=True)
+        with open(self.vectors_path, "ab") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=self.dtype).tobytes())
+        self._append_log({"op": "add", "start": start, "items": items})
+        self.records.extend([None] * (start + len(items) - len(self.records)))
+        self._apply_add(start, items, start + len(items))
+        self._invalidate()
+        self._maybe_compact()
+
+    def delete(self, ids: Iterable[str]) -> int:
+        ids = [id_ for id_ in ids if id_ in self.id_to_row]
+        if not ids:
+            return 0
+        self._append_log({"op": "delete", "ids": ids})
+        deleted = self._apply_delete(ids)
+        self._invalidate()
+        self._maybe_compact()
+        return deleted
+
+    def _maybe_compact(self):
+        dead = len(self.records) - self.live_count
+        if dead < max(COMPACT_MIN_DEAD_ROWS, self.live_count):
+            return
+        rows = sorted(self.id_to_row.values())
+        matrix = self.matrix()
+        vectors = np.asarray(matrix[rows]) if rows and matrix is not None else np.empty((0, self.dimension), self.dtype)
+        items = [self.records[row] for row in rows]
+        old_vectors_path = self.vectors_path
+        self._matrix = None
+
+        self.generation += 1
+        with open(self.vectors_path, "wb") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=self.dtype).tobytes())
+        tmp_path = f"{self.log_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(self._header()) + "\n")
+            if items:
+                f.write(json.dumps({"op": "add", "start": 0, "items": items}) + "\n")
+        os.replace(tmp_path, self.log_path)
+        try:
+            os.remove(old_vectors_path)
+        except OSError:
+            pass
+
+        self.records = items
+        self.id_to_row = {item["id"]: row for row, item in enumerate(items)}
+        self._tokens = {}
+        self._invalidate()
+        logger.debug(f"Partição vetorial '{self.base_path}' compactada: {dead} linha(s) morta(s) removida(s).")
+
+    # --- Consulta -------------------------------------------------------------------------
+
+    def matrix(self) -> Optional[np.ndarray]:
+        if self._matrix is None:
+            rows = self._disk_rows()
+            if rows == 0:
+                return None
+            self._matrix = np.memmap(self.vectors_path, dtype=self.dtype, mode="r", shape=(rows, self.dimension))
+        return self._matrix
+
+    def _mask(self, source_type: Optional[str]) -> np.ndarray:
+        mask = self._masks.get(source_type)
+        if mask is None:
+            mask = np.fromiter(
+                (r is not None and (source_type is None or r.get("source_type") == source_type) for r in self.records),
+                dtype=bool,
+                count=len(self.records),
+            )
+            self._masks[source_type] = mask
+        return mask
+
+    def _filter(self, source_type: Optional[str], sources: Optional[Collection[str]]) -> np.ndarray:
+        mask = self._mask(source_type)
+        if sources is None:
+            return mask
+        # Busca em dois níveis: só os chunks de código dos arquivos pré-selecionados (o resto passa)
+        allowed = np.fromiter(
+            (
+                r is not None and (r.get("source_type") != SOURCE_TYPE_CODE or r["metadata"].get("source") in sources)
+                for r in self.records
+            ),
+            dtype=bool,
+            count=len(self.records),
+        )
+        return mask & allowed
+
+    def vector_top_k(
+        self, queries: np.ndarray, k: int, source_type: Optional[str], sources: Optional[Collection[str]] = None
+    ) -> List[List[Tuple[float, int]]]:
+        """Top-k por consulta para uma matriz de consultas (m x dimensão), num único passe sobre a partição."""
+        matrix = self.matrix()
+        if matrix is None:
+            return [[] for _ in queries]
+        mask = self._filter(source_type, sources)[:len(matrix)]
+        live = int(mask.sum())
+        if live == 0:
+            return [[] for _ in queries]
+        scores = np.empty((len(matrix), len(queries)), dtype=np.float32)
+        for start in range(0, len(matrix), SCORE_BLOCK_ROWS):
+            block = matrix[start:start + SCORE_BLOCK_ROWS]
+            scores[start:start + len(block)] = block.astype(np.float32, copy=False) @ queries.T
+        scores[~mask] = -np.inf
+        k = min(k, live)
+        results = []
+        for column in scores.T:
+            # argpartition: O(n) para separar os k melhores; só eles são ordenados
+            top = np.argpartition(-column, k - 1)[:k]
+            top = top[np.argsort(-column[top], kind="stable")]
+            results.append([(float(column[row]), int(row)) for row in top])
+        return results
+
+    def lexical_top_k(
+        self, terms: List[str], k: int, source_type: Optional[str], sources: Optional[Collection[str]] = None
+    ) -> List[Tuple[float, int]]:
+        mask = self._filter(source_type, sources)
+        scored = []
+        for row in np.flatnonzero(mask):
+            row = int(row)
+            counts = self._tokens.get(row)
+            if counts is None:
+                counts = Counter(tokenize(self.records[row]["content"]))
+                self._tokens[row] = counts
+            matched = [counts[term] for term in terms if term in counts]
+            if matched:
+                # Termos distintos encontrados decidem; ocorrências só desempatam (fica < 1)
+                occurrences = sum(matched)
+                scored.append((len(matched) + occurrences / (occurrences + 1), row))
+        return heapq.nlargest(k, scored)
+
+    def row(self, row: int, score: float, with_vector: bool = False) -> tuple:
+        record = self.records[row]
+        result = (record["id"], record["content"], record["metadata"], record["project"], record["source_type"], score)
+        if with_vector:
+            result += (self.matrix()[row].astype(np.float32),)
+        return result
+
+
+class NumpyVectorStore:
+    """
+    Backend vetorial em processo: uma matriz memory-mapped (float32/float16) por projeto e
+    similaridade de cosseno vetorizada com top-k via argpartition. Para workspaces de até algumas
+    dezenas de milhares de chunks, um produto matriz-vetor local sai mais barato que a ida ao
+    Postgres, e permite rodar indexação e busca (testes, CI, modo offline) sem pgvector.
+
+    Expõe o subconjunto da interface do PGVectorStore usado pelo CodeIndexer (add_documents /
+    delete com upsert por ID) e, para a VectorMemory, vector_rows / lexical_rows no mesmo formato
+    das linhas SQL: (id, content, metadata, project, source_type, score[, vetor]). project/source_type saem
+    do metadata para "colunas", como em PARTITION_COLUMNS no Postgres.
+    Os arquivos não são compartilhados entre processos: use um único processo escritor.
+    """
+
+    def __init__(
+        self,
+        collection_name: str,
+        embeddings: Embeddings,
+        dimension: int,
+        identity: str,
+        state_dir: Optional[str] = None,
+        dtype: Optional[str] = None,
+        manifest_collection: Optional[str] = None,
+    ):
+        self.collection_name = collection_name
+        # Coleção dos manifestos que dependem destes vetores (a tabela de resumos usa a da coleção principal)
+        self.manifest_collection = manifest_collection or collection_name
+        self.embeddings = embeddings
+        self.dimension = dimension
+        self.identity = identity
+        self.state_dir = state_dir or settings.NUMPY_STORE_DIR or os.path.join(settings.INDEX_STATE_DIR, "vectors")
+        self.dtype = dtype or settings.NUMPY_STORE_DTYPE
+        self._partitions: Dict[str, _Partition] = {}
+        self._lock = threading.RLock()
+
+    def _base_path(self, key: str) -> str:
+        return os.path.join(self.state_dir, f"{self.collection_name}__{key}")
+
+    def _partition(self, key: str) -> _Partition:
+        partition = self._partitions.get(key)
+        if partition is None:
+            partition = _Partition(self._base_path(key), self.dimension, self.dtype, self.identity)
+            if not partition.load() and key != SHARED_PARTITION:
+                # Vetores descartados: o manifesto do projeto precisa reindexar tudo
+                IndexManifest.invalidate_project(self.manifest_collection, key)
+            self._partitions[key] = partition
+        return partition
+
+    def _all_partitions(self) -> List[_Partition]:
+        prefix = f"{self.collection_name}__"
+        for path in glob.glob(os.path.join(glob.escape(self.state_dir), f"{glob.escape(prefix)}*.jsonl")):
+            self._partition(os.path.basename(path)[len(prefix):-len(".jsonl")])
+        return list(self._partitions.values())
+
+    def _partitions_for(self, project: Optional[str], source_type: Optional[str]) -> List[Tuple[_Partition, Optional[str]]]:
+        """
+        (partição, source_type efetivo) a consultar. Uma busca por projeto também vê a base de
+        conhecimento compartilhada (linhas sem projeto), como `project = :project OR source_type =
+        'knowledge_base'` no Postgres; da partição compartilhada só entram as linhas da base.
+        """
+        if project is None:
+            return [(partition, source_type) for partition in self._all_partitions()]
+        partitions = [(self._partition(project), source_type)]
+        if source_type in (None, SOURCE_TYPE_KNOWLEDGE_BASE):
+            partitions.append((self._partition(SHARED_PARTITION), SOURCE_TYPE_KNOWLEDGE_BASE))
+        return partitions
+
+    # --- Escrita (interface usada pelo CodeIndexer) ---------------------------------------
+
+    def add_documents(self, documents: List[Document], ids: Optional[List[str]] = None) -> List[str]:
+        if not documents:
+            return []
+        ids = list(ids) if ids else [str(i) for i in range(len(documents))]
+        vectors = np.asarray(self.embeddings.embed_documents([d.page_content for d in documents]), dtype=np.float32)
+        vectors = _normalize(vectors.reshape(len(documents), self.dimension))
+
+        by_partition: Dict[str, List[int]] = {}
+        items = []
+        for position, (id_, document) in enumerate(zip(ids, documents)):
+            metadata = dict(document.metadata or {})
+            columns = {column: metadata.pop(column, None) for column in PARTITION_COLUMNS}
+            items.append({"id": id_, "content": document.page_content, "metadata": metadata, **columns})
+            by_partition.setdefault(columns["project"] or SHARED_PARTITION, []).append(position)
+
+        with self._lock:
+            # Upsert dentro da partição: os IDs de chunk já incluem o projeto (manifest.chunk_id)
+            for key, positions in by_partition.items():
+                self._partition(key).add(vectors[positions], [items[p] for p in positions])
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None) -> bool:
+        if not ids:
+            return False
+        with self._lock:
+            for partition in self._all_partitions():
+                partition.delete(ids)
+        return True
+
+    def delete_project(self, project: str, source_type: Optional[str] = None) -> int:
+        with self._lock:
+            partition = self._partition(project)
+            if source_type is None:
+                deleted = partition.live_count
+                partition.drop()
+                return deleted
+            ids = [r["id"] for r in partition.records if r is not None and r.get("source_type") == source_type]
+            return partition.delete(ids)
+
+    # --- Consulta (interface usada pela VectorMemory) -------------------------------------
+
+    def vector_rows(
+        self, query_vector, k: int, project: Optional[str] = None, source_type: Optional[str] = None,
+        with_vectors: bool = False, sources: Optional[Collection[str]] = None,
+    ) -> list:
+        return self.vector_rows_many(
+            [query_vector], k, project=project, source_type=source_type, with_vectors=with_vectors, sources=sources
+        )[0]
+
+    def vector_rows_many(
+        self, query_vectors, k: int, project: Optional[str] = None, source_type: Optional[str] = None,
+        with_vectors: bool = False, sources: Optional[Collection[str]] = None,
+    ) -> List[list]:
+        """
+        Uma lista de linhas por consulta; todas as consultas são multiplicadas juntas contra cada partição.
+        `sources` (caminhos em metadata["source"]) restringe as linhas de código a esses arquivos.
+        """
+        queries = _normalize(np.asarray(query_vectors, dtype=np.float32).reshape(-1, self.dimension))
+        sources = set(sources) if sources is not None else None
+        with self._lock:
+            candidates: List[list] = [[] for _ in queries]
+            for partition, partition_source_type in self._partitions_for(project, source_type):
+                for index, top in enumerate(partition.vector_top_k(queries, k, partition_source_type, sources)):
+                    candidates[index].extend((score, row, partition) for score, row in top)
+            # Mesma escala do pgvector (<=>): distância de cosseno
+            return [
+                [
+                    partition.row(row, 1.0 - score, with_vectors)
+                    for score, row, partition in heapq.nlargest(k, found, key=lambda c: c[0])
+                ]
+                for found in candidates
+            ]
+
+    def lexical_rows(
+        self, query: str, k: int, project: Optional[str] = None, source_type: Optional[str] = None,
+        with_vectors: bool = False, sources: Optional[Collection[str]] = None,
+    ) -> list:
+        expression = lexical_query(query)
+        if not expression:
+            return []
+        terms = expression.split(" | ")
+        sources = set(sources) if sources is not None else None
+        with self._lock:
+            candidates = [
+                (score, row, partition)
+                for partition, partition_source_type in self._partitions_for(project, source_type)
+                for score, row in partition.lexical_top_k(terms, k, partition_source_type, sources)
+            ]
+            best = heapq.nlargest(k, candidates, key=lambda c: c[0])
+            return [partition.row(row, score, with_vectors) for score, row, partition in best]
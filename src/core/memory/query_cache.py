@@ -0,0 +1,79 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+from src.core.config import settings
+
+
+class TTLCache:
+    """
+    Cache LRU com expiração por tempo, thread-safe.
+    A TTL limita por quanto tempo um valor pode ficar desatualizado quando a mudança que o
+    invalidaria não é visível neste processo (ex: seed da base de conhecimento em outro processo).
+    """
+
+    def __init__(self, max_items: int, ttl_seconds: float):
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        if self.max_items <= 0 or self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_items:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# Compartilhados pelo processo: VectorMemory é instanciada por chamada em vários pontos
+# (PromptBuilder, search_codebase), então o cache não pode morar na instância.
+_embedding_cache: Optional[TTLCache] = None
+_result_cache: Optional[TTLCache] = None
+_lock = threading.Lock()
+
+
+def get_query_embedding_cache() -> TTLCache:
+    """Embeddings de consultas, por (identidade do modelo, texto)."""
+    global _embedding_cache
+    with _lock:
+        if _embedding_cache is None:
+            _embedding_cache = TTLCache(settings.SEARCH_CACHE_MAX_ITEMS, settings.SEARCH_CACHE_TTL_SECONDS)
+        return _embedding_cache
+
+
+def get_search_result_cache() -> TTLCache:
+    """Resultados de VectorMemory.search; a chave inclui a versão do índice, então reindexar invalida."""
+    global _result_cache
+    with _lock:
+        if _result_cache is None:
+            _result_cache = TTLCache(settings.SEARCH_CACHE_MAX_ITEMS, settings.SEARCH_CACHE_TTL_SECONDS)
+        return _result_cache
+
+
+def clear_query_caches():
+    global _embedding_cache, _result_cache
+    with _lock:
+        _embedding_cache = None
+        _result_cache = None
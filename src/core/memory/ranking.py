@@ -0,0 +1,57 @@
+import re
+import math
+from typing import Dict, Hashable, Iterator, List, Optional, Sequence
+
+# Tokens de identificadores/mensagens de erro: letras, dígitos e '_' (snake_case vira frase no tsquery)
+_TOKEN_RE = re.compile(r"[A-Za-z0-9_]+")
+MAX_LEXICAL_TERMS = 32
+
+
+def tokenize(text: str) -> Iterator[str]:
+    """Termos normalizados (minúsculos, sem '_' nas pontas, 2+ caracteres) usados na busca lexical."""
+    for token in _TOKEN_RE.findall(text):
+        token = token.strip("_").lower()
+        if len(token) >= 2:
+            yield token
+
+
+def lexical_query(query: str, max_terms: int = MAX_LEXICAL_TERMS) -> Optional[str]:
+    """
+    Converte texto livre (nome de função, linha de erro) em uma expressão para to_tsquery('simple', ...).
+    Os termos são unidos com OR ('|'): com ts_rank_cd, trechos que contêm mais termos ficam à frente,
+    sem exigir que todos apareçam (o que descartaria quase tudo numa linha de traceback).
+    Retorna None se não sobrar nenhum termo útil.
+    """
+    terms = []
+    seen = set()
+    for token in tokenize(query):
+        if token in seen:
+            continue
+        seen.add(token)
+        terms.append(token)
+        if len(terms) >= max_terms:
+            break
+    return " | ".join(terms) if terms else None
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Hashable]], k: int = 60) -> List[Hashable]:
+    """
+    Funde listas ranqueadas (ex: vetorial e lexical) por Reciprocal Rank Fusion:
+    score(d) = soma de 1 / (k + posição de d em cada lista). Só usa posições, então não
+    depende de escalas incompatíveis (distância de cosseno x ts_rank). Empates mantêm a
+    ordem da primeira lista em que o item apareceu.
+    """
+    scores: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for position, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + position)
+    return sorted(scores, key=lambda key: scores[key], reverse=True)
+
+
+def cosine_similarity(a: Optional[Sequence[float]], b: Optional[Sequence[float]]) -> Optional[float]:
+    """Similaridade de cosseno entre dois vetores; None se algum faltar ou for nulo."""
+    if a is None or b is None:
+        return None
+    dot = sum(float(x) * float(y) for x, y in zip(a, b))
+    norm = math.sqrt(sum(float(x) * float(x) for x in a)) * math.sqrt(sum(float(y) * float(y) for y in b))
+    return dot / norm if norm else None
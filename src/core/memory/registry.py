@@ -0,0 +1,185 @@
+import threading
+from typing import Dict, Optional, Tuple
+from langchain_core.embeddings import Embeddings
+from langchain_postgres import PGVectorStore, PGEngine
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from src.core.config import settings
+from src.core.llm.embedding_provider import EmbeddingProvider
+from src.core.memory.file_summary import file_summary_collection
+from src.core.memory.manifest import IndexManifest
+from src.core.memory.numpy_store import NumpyVectorStore
+from src.core.memory.query_cache import clear_query_caches
+from src.core.memory.schema import (
+    PARTITION_COLUMNS,
+    detect_embedding_dimension,
+    ensure_lexical_index,
+    ensure_partition_columns,
+    ensure_vector_index,
+    ensure_vector_table,
+    get_pgvector_version,
+)
+from src.core.logger import logger
+
+# Registro de recursos "quentes" do processo: engines SQLAlchemy, PGEngines e PGVectorStores.
+# Evita que cada VectorMemory/CodeIndexer/search_codebase recrie conexões, inspecione o
+# catálogo e valide o esquema a cada chamada.
+_lock = threading.RLock()
+_sql_engines: Dict[str, Engine] = {}
+_pg_engines: Dict[str, PGEngine] = {}
+_handles: Dict[Tuple[str, str, str], "VectorStoreHandle"] = {}
+
+
+def normalize_connection_string(connection_string: str) -> str:
+    """Normaliza para driver psycopg3 quando necessário para evitar carregar psycopg2 síncrono."""
+    if connection_string.startswith("postgresql+psycopg2://"):
+        return connection_string.replace("postgresql+psycopg2://", "postgresql+psycopg://", 1)
+    if connection_string.startswith("postgresql://"):
+        return connection_string.replace("postgresql://", "postgresql+psycopg://", 1)
+    return connection_string
+
+
+class VectorStoreHandle:
+    """
+    Conjunto de recursos prontos para uma coleção: store de escrita, engine de consulta, embeddings e dimensão.
+    No backend numpy, `store` é um NumpyVectorStore e `engine` é None (as consultas vão ao próprio store).
+    """
+
+    def __init__(
+        self, store, engine: Optional[Engine], embeddings: Embeddings, dimension: int, identity: str = "",
+        pgvector_version: Optional[Tuple[int, ...]] = None,
+    ):
+        self.store = store
+        self.engine = engine
+        self.embeddings = embeddings
+        self.dimension = dimension
+        self.identity = identity
+        # Versão da extensão 'vector' (decide a varredura iterativa nas buscas filtradas)
+        self.pgvector_version = pgvector_version
+
+
+def get_sql_engine(connection_string: str) -> Engine:
+    """Engine SQLAlchemy síncrono (com pool) compartilhado por string de conexão."""
+    connection_string = normalize_connection_string(connection_string)
+    with _lock:
+        engine = _sql_engines.get(connection_string)
+        if engine is None:
+            engine = create_engine(connection_string, pool_pre_ping=True)
+            _sql_engines[connection_string] = engine
+        return engine
+
+
+def get_pg_engine(connection_string: str) -> PGEngine:
+    """PGEngine (langchain-postgres) compartilhado por string de conexão."""
+    connection_string = normalize_connection_string(connection_string)
+    with _lock:
+        engine = _pg_engines.get(connection_string)
+        if engine is None:
+            engine = PGEngine.from_connection_string(connection_string)
+            _pg_engines[connection_string] = engine
+        return engine
+
+
+def get_vector_store(
+    connection_string: str, collection_name: str, manifest_collection: Optional[str] = None
+) -> VectorStoreHandle:
+    """
+    Retorna o handle da coleção para o modelo de embeddings configurado, criando-o na primeira chamada.
+    A chave é (string de conexão, coleção, identidade do modelo de embeddings); a verificação de
+    esquema/índice roda uma única vez por chave no processo.
+    Com settings.VECTOR_STORE_BACKEND="numpy" devolve o store em processo e não usa a conexão.
+    `manifest_collection` indica a coleção cujos manifestos descrevem esta tabela (padrão: ela mesma);
+    são esses manifestos que se invalidam quando a tabela é recriada.
+    """
+    manifest_collection = manifest_collection or collection_name
+    if settings.VECTOR_STORE_BACKEND == "numpy":
+        return get_numpy_store(collection_name, manifest_collection)
+
+    connection_string = normalize_connection_string(connection_string)
+    provider = EmbeddingProvider()
+    key = (connection_string, collection_name, provider.identity)
+
+    handle = _handles.get(key)
+    if handle is not None:
+        return handle
+
+    with _lock:
+        handle = _handles.get(key)
+        if handle is not None:
+            return handle
+
+        embeddings = provider.get_embeddings()
+        engine = get_sql_engine(connection_string)
+
+        dimension = detect_embedding_dimension(embeddings)
+        recreated = ensure_vector_table(engine, collection_name, dimension)
+        migrated = ensure_partition_columns(engine, collection_name)
+        if recreated or migrated:
+            IndexManifest.invalidate_collection(manifest_collection)
+        ensure_vector_index(engine, collection_name, dimension)
+        ensure_lexical_index(engine, collection_name)
+
+        store = PGVectorStore.create_sync(
+            engine=get_pg_engine(connection_string),
+            embedding_service=embeddings,
+            table_name=collection_name,
+            id_column="langchain_id",
+            metadata_json_column="cmetadata",
+            # project/source_type saem do metadata do Document e vão para colunas próprias
+            metadata_columns=list(PARTITION_COLUMNS),
+        )
+        handle = VectorStoreHandle(
+            store=store, engine=engine, embeddings=embeddings, dimension=dimension, identity=provider.identity,
+            pgvector_version=get_pgvector_version(engine),
+        )
+        _handles[key] = handle
+        logger.info(f"Vector store da coleção '{collection_name}' registrado no processo ({provider.identity}).")
+        return handle
+
+
+def get_file_summary_store(connection_string: str, collection_name: str) -> VectorStoreHandle:
+    """
+    Handle da tabela de resumos por arquivo da coleção (uma linha por arquivo, bem menor que a de
+    chunks). Mesmo esquema, índices e backend da coleção principal; os manifestos da coleção
+    principal descrevem as duas tabelas, então recriar esta também força a reindexação.
+    """
+    return get_vector_store(connection_string, file_summary_collection(collection_name), manifest_collection=collection_name)
+
+
+def get_numpy_store(collection_name: str, manifest_collection: Optional[str] = None) -> VectorStoreHandle:
+    """Handle do backend numpy (matriz memory-mapped por projeto), um por (coleção, modelo de embeddings)."""
+    provider = EmbeddingProvider()
+    key = ("numpy", collection_name, provider.identity)
+
+    handle = _handles.get(key)
+    if handle is not None:
+        return handle
+
+    with _lock:
+        handle = _handles.get(key)
+        if handle is not None:
+            return handle
+
+        embeddings = provider.get_embeddings()
+        dimension = detect_embedding_dimension(embeddings)
+        store = NumpyVectorStore(
+            collection_name, embeddings, dimension, provider.identity, manifest_collection=manifest_collection
+        )
+        handle = VectorStoreHandle(store=store, engine=None, embeddings=embeddings, dimension=dimension, identity=provider.identity)
+        _handles[key] = handle
+        logger.info(f"Vector store numpy da coleção '{collection_name}' registrado em '{store.state_dir}' ({provider.identity}).")
+        return handle
+
+
+def reset_registry():
+    """Descarta todos os recursos registrados e os caches de consulta (ex: após DROP da coleção ou em testes)."""
+    with _lock:
+        for engine in _sql_engines.values():
+            try:
+                engine.dispose()
+            except Exception as e:
+                logger.warning(f"Erro ao descartar engine: {e}")
+        _sql_engines.clear()
+        _pg_engines.clear()
+        _handles.clear()
+    clear_query_caches()
@@ -0,0 +1,307 @@
+import re
+from typing import List, Optional, Tuple
+from langchain_core.embeddings import Embeddings
+from sqlalchemy import text, inspect, Table, Column, MetaData, Text
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from pgvector.sqlalchemy import Vector
+from src.core.config import settings
+from src.core.logger import logger
+
+# Limite do pgvector para índices HNSW/IVFFlat sobre o tipo 'vector'
+MAX_INDEXABLE_DIMENSION = 2000
+
+REQUIRED_COLUMNS = {"langchain_id", "content", "embedding", "cmetadata"}
+
+# Particionamento lógico da coleção: cada linha pertence a um projeto e a um tipo de fonte.
+# São colunas reais (e não chaves do JSONB) para que o filtro use o índice btree.
+PARTITION_COLUMNS = ("project", "source_type")
+SOURCE_TYPE_CODE = "code"
+SOURCE_TYPE_KNOWLEDGE_BASE = "knowledge_base"
+
+# Versão do pgvector que introduziu a varredura iterativa (hnsw/ivfflat.iterative_scan)
+ITERATIVE_SCAN_MIN_VERSION = (0, 8)
+# Maior hnsw.ef_search aceito pelo pgvector
+MAX_EF_SEARCH = 1000
+
+# Busca lexical: tsvector gerado a partir de 'content'
+LEXICAL_COLUMN = "content_tsv"
+LEXICAL_CONFIG = "simple"
+
+
+def detect_embedding_dimension(embeddings: Embeddings) -> int:
+    """
+    Descobre a dimensão dos vetores do modelo de embeddings configurado.
+    Usa settings.EMBEDDING_DIMENSION quando definido; caso contrário embeda um texto curto
+    (a chamada passa pelo cache de embeddings, então só custa uma vez).
+    """
+    if settings.EMBEDDING_DIMENSION:
+        return settings.EMBEDDING_DIMENSION
+    vector = embeddings.embed_query("dimension probe")
+    if not vector:
+        raise ValueError("Não foi possível determinar a dimensão dos embeddings: o provedor retornou um vetor vazio.")
+    return len(vector)
+
+
+def get_vector_dimension(conn, table_name: str) -> Optional[int]:
+    """
+    Retorna a dimensão declarada da coluna 'embedding' (vector(n) -> n),
+    -1 se a coluna não tem dimensão fixa, ou None se a coluna não existe.
+    """
+    row = conn.execute(
+        text(
+            "SELECT atttypmod FROM pg_attribute "
+            "WHERE attrelid = to_regclass(:table_name) AND attname = 'embedding' AND NOT attisdropped"
+        ),
+        {"table_name": table_name},
+    ).fetchone()
+    return None if row is None else row[0]
+
+
+def _create_table(engine, table_name: str, dimension: int):
+    metadata = MetaData()
+
+    # Definição manual da tabela para garantir esquema correto
+    # content: armazena o texto do documento
+    # cmetadata: armazena metadados em formato JSONB
+    # embedding: vetor de embeddings com dimensão fixa (necessária para índices ANN)
+    _ = Table(
+        table_name,
+        metadata,
+        Column("langchain_id", UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()")),
+        Column("content", Text),
+        Column("embedding", Vector(dimension)),
+        Column("cmetadata", JSONB),
+        Column("project", Text),
+        Column("source_type", Text),
+        extend_existing=True
+    )
+    metadata.create_all(engine)
+
+
+def _drop_table(engine, table_name: str):
+    with engine.connect() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {table_name} CASCADE"))
+        conn.commit()
+
+
+def ensure_vector_table(engine, table_name: str, dimension: int) -> bool:
+    """
+    Garante que a tabela de vetores exista com o esquema EXATO necessário e com a
+    coluna 'embedding' em vector(dimension).
+    - Colunas faltando: dropa e recria.
+    - Coluna sem dimensão fixa (legado Vector(None)): tenta ALTER para vector(dimension);
+      se houver linhas com outra dimensão, dropa e recria.
+    - Dimensão diferente (modelo de embeddings trocado): os vetores antigos são inúteis, dropa e recria.
+    Retorna True se a tabela foi (re)criada do zero, para que chamadores invalidem estados derivados.
+    """
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+            conn.commit()
+    except Exception as e:
+        logger.warning(f"Não foi possível garantir a extensão 'vector': {e}")
+
+    insp = inspect(engine)
+    table_exists = table_name in insp.get_table_names()
+    should_recreate = False
+
+    if table_exists:
+        existing_columns = set(c["name"] for c in insp.get_columns(table_name))
+        missing_columns = REQUIRED_COLUMNS - existing_columns
+
+        if missing_columns:
+            logger.warning(f"Tabela '{table_name}' está incompleta. Faltando colunas: {missing_columns}. Recriando...")
+            should_recreate = True
+        else:
+            with engine.connect() as conn:
+                current_dim = get_vector_dimension(conn, table_name)
+
+            if current_dim == dimension:
+                logger.debug(f"Tabela '{table_name}' verificada: esquema e dimensão ({dimension}) corretos.")
+            elif current_dim is None or current_dim < 0:
+                logger.info(f"Coluna 'embedding' de '{table_name}' sem dimensão fixa. Convertendo para vector({dimension})...")
+                try:
+                    with engine.connect() as conn:
+                        conn.execute(text(f"ALTER TABLE {table_name} ALTER COLUMN embedding TYPE vector({dimension})"))
+                        conn.commit()
+                except Exception as e:
+                    logger.warning(f"Conversão falhou (vetores com dimensões diferentes?): {e}. Recriando...")
+                    should_recreate = True
+            else:
+                logger.warning(
+                    f"Tabela '{table_name}' tem vetores de dimensão {current_dim}, mas o modelo configurado "
+                    f"gera {dimension}. Os embeddings antigos são incompatíveis. Recriando..."
+                )
+                should_recreate = True
+
+    if should_recreate:
+        _drop_table(engine, table_name)
+        table_exists = False
+
+    if not table_exists:
+        logger.info(f"Criando tabela '{table_name}' manualmente via SQLAlchemy (vector({dimension}))...")
+        _create_table(engine, table_name, dimension)
+        logger.info(f"Tabela '{table_name}' criada com sucesso com o esquema correto.")
+        return True
+    return False
+
+
+def ensure_partition_columns(engine, table_name: str) -> bool:
+    """
+    Garante as colunas de partição (project, source_type) e o índice btree que as cobre.
+    Tabelas antigas ganham as colunas via ALTER (sem perder vetores); o source_type é
+    preenchido a partir do cmetadata, mas o projeto das linhas de código antigas é
+    desconhecido. Retorna True nesse caso, para que o chamador invalide os manifestos e a
+    próxima indexação refaça o upsert das linhas já com o projeto.
+    """
+    with engine.connect() as conn:
+        existing = {
+            row[0] for row in conn.execute(
+                text(
+                    "SELECT attname FROM pg_attribute "
+                    "WHERE attrelid = to_regclass(:table_name) AND attnum > 0 AND NOT attisdropped"
+                ),
+                {"table_name": table_name},
+            )
+        }
+        missing = [column for column in PARTITION_COLUMNS if column not in existing]
+        for column in missing:
+            conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS {column} TEXT"))
+        if missing:
+            logger.info(f"Colunas de partição {missing} adicionadas à tabela '{table_name}'.")
+            conn.execute(
+                text(
+                    f"UPDATE {table_name} SET source_type = CASE "
+                    f"WHEN cmetadata->>'source' = :kb THEN :kb ELSE :code END "
+                    f"WHERE source_type IS NULL"
+                ),
+                {"kb": SOURCE_TYPE_KNOWLEDGE_BASE, "code": SOURCE_TYPE_CODE},
+            )
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {table_name}_project_source_idx "
+            f"ON {table_name} (project, source_type)"
+        ))
+        conn.commit()
+    return "project" in missing
+
+
+def delete_project_rows(engine, table_name: str, project: str, source_type: Optional[str] = None) -> int:
+    """Apaga as linhas de um projeto (opcionalmente de um único tipo de fonte). Retorna quantas foram apagadas."""
+    sql = f"DELETE FROM {table_name} WHERE project = :project"
+    params = {"project": project}
+    if source_type:
+        sql += " AND source_type = :source_type"
+        params["source_type"] = source_type
+    with engine.connect() as conn:
+        result = conn.execute(text(sql), params)
+        conn.commit()
+    return result.rowcount
+
+
+def ensure_lexical_index(engine, table_name: str):
+    """
+    Garante a coluna 'content_tsv' (tsvector gerado a partir de 'content') e seu índice GIN,
+    usados pela busca lexical/híbrida. Por ser uma coluna GENERATED, os INSERTs do
+    PGVectorStore não precisam conhecê-la. A configuração 'simple' não aplica stemming nem
+    stopwords, preservando nomes de funções e termos de mensagens de erro.
+    """
+    with engine.connect() as conn:
+        conn.execute(text(
+            f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS {LEXICAL_COLUMN} tsvector "
+            f"GENERATED ALWAYS AS (to_tsvector('{LEXICAL_CONFIG}', coalesce(content, ''))) STORED"
+        ))
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {table_name}_{LEXICAL_COLUMN}_idx "
+            f"ON {table_name} USING gin ({LEXICAL_COLUMN})"
+        ))
+        conn.commit()
+    logger.debug(f"Índice lexical (GIN) garantido em '{table_name}'.")
+
+
+def vector_index_name(table_name: str) -> str:
+    return f"{table_name}_embedding_{settings.VECTOR_INDEX_TYPE}_idx"
+
+
+def ensure_vector_index(engine, table_name: str, dimension: int):
+    """
+    Cria (se ainda não existir) o índice ANN da coluna 'embedding' conforme settings.VECTOR_INDEX_TYPE.
+    HNSW pode ser criado com a tabela vazia; IVFFlat calcula os centróides no momento da
+    criação, então deve ser (re)criado depois que a coleção tiver dados.
+    """
+    index_type = settings.VECTOR_INDEX_TYPE
+    if index_type == "none":
+        return
+
+    if dimension > MAX_INDEXABLE_DIMENSION:
+        logger.warning(
+            f"Dimensão {dimension} excede o limite de {MAX_INDEXABLE_DIMENSION} do pgvector para índices ANN. "
+            f"A busca em '{table_name}' continuará sequencial."
+        )
+        return
+
+    if index_type == "hnsw":
+        options = f"m = {settings.VECTOR_INDEX_HNSW_M}, ef_construction = {settings.VECTOR_INDEX_HNSW_EF_CONSTRUCTION}"
+    elif index_type == "ivfflat":
+        options = f"lists = {settings.VECTOR_INDEX_IVFFLAT_LISTS}"
+    else:
+        raise ValueError(f"Tipo de índice vetorial desconhecido: '{index_type}'")
+
+    index_name = vector_index_name(table_name)
+    with engine.connect() as conn:
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} "
+            f"USING {index_type} (embedding vector_cosine_ops) WITH ({options})"
+        ))
+        conn.commit()
+    logger.debug(f"Índice vetorial '{index_name}' ({index_type}) garantido em '{table_name}'.")
+
+
+def get_pgvector_version(engine) -> Optional[Tuple[int, ...]]:
+    """Versão instalada da extensão 'vector' (ex: (0, 8, 0)), ou None se não foi possível descobrir."""
+    try:
+        with engine.connect() as conn:
+            row = conn.execute(text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")).fetchone()
+    except Exception as e:
+        logger.warning(f"Não foi possível descobrir a versão do pgvector: {e}")
+        return None
+    if row is None:
+        return None
+    return tuple(int(part) for part in re.findall(r"\d+", str(row[0]))) or None
+
+
+def index_query_settings(
+    k: int,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    filtered: bool = False,
+    pgvector_version: Optional[Tuple[int, ...]] = None,
+) -> List[str]:
+    """
+    Monta os comandos SET LOCAL que ajustam a precisão/latência da busca ANN para uma consulta.
+    O ef_search do HNSW nunca fica abaixo de k, senão a busca devolve menos de k resultados, nem
+    acima de MAX_EF_SEARCH, o limite do pgvector (valores maiores fazem a consulta falhar).
+
+    Em buscas filtradas (ex: por projeto) o pgvector aplica o WHERE depois da varredura do índice:
+    dos ef_search (HNSW) ou das listas visitadas (IVFFlat) só sobram as linhas do filtro, e a busca
+    pode devolver bem menos de k. Com VECTOR_SEARCH_ITERATIVE_SCAN="auto" (padrão) e pgvector >= 0.8
+    a varredura continua até achar k linhas (relaxed_order: a ordem final pode ter pequenas
+    inversões de distância, corrigidas pelo ORDER BY; strict_order garante a ordem, mais lento).
+    Sem varredura iterativa, a busca filtrada amplia ef_search/probes por
+    VECTOR_SEARCH_FILTERED_MULTIPLIER: mais recall por mais latência, sem garantia de k linhas.
+    """
+    statements = []
+    index_type = settings.VECTOR_INDEX_TYPE
+    iterative_scan = settings.VECTOR_SEARCH_ITERATIVE_SCAN
+    if iterative_scan == "auto":
+        supported = pgvector_version is not None and pgvector_version[:2] >= ITERATIVE_SCAN_MIN_VERSION
+        iterative_scan = "relaxed_order" if supported else "off"
+    widen = filtered and iterative_scan == "off"
+    multiplier = max(1, settings.VECTOR_SEARCH_FILTERED_MULTIPLIER) if widen else 1
+    if index_type == "hnsw":
+        ef = int(ef_search or settings.VECTOR_SEARCH_EF_SEARCH) * multiplier
+        statements.append(f"SET LOCAL hnsw.ef_search = {min(max(ef, int(k)), MAX_EF_SEARCH)}")
+    elif index_type == "ivfflat":
+        statements.append(f"SET LOCAL ivfflat.probes = {int(probes or settings.VECTOR_SEARCH_PROBES) * multiplier}")
+    if filtered and index_type != "none" and iterative_scan != "off":
+        statements.append(f"SET LOCAL {index_type}.iterative_scan = {iterative_scan}")
+    return statements
@@ -0,0 +1,117 @@
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+from src.core.memory.manifest import IndexManifest, current_index_version, project_key
+
+MAX_LOOKUP_RESULTS = 20
+
+# Identificadores citados num texto livre; "UserService.get" vale como um só
+_IDENTIFIER = re.compile(r"`([^`]+)`|([A-Za-z_$][\w$]*(?:\.[A-Za-z_$][\w$]*)*)")
+
+# Tabelas de símbolos prontas no processo, por (coleção, projeto): (versão do índice, tabela)
+_indexes: Dict[Tuple[str, str], Tuple[int, "SymbolIndex"]] = {}
+_indexes_lock = threading.Lock()
+
+
+class SymbolDefinition:
+    """Uma definição do projeto: nome, tipo (function, class, method, route...), arquivo e linhas."""
+
+    def __init__(self, name: str, kind: str, path: str, start_line: int, end_line: int):
+        self.name = name
+        self.kind = kind
+        self.path = path
+        self.start_line = start_line
+        self.end_line = end_line
+
+    def describe(self) -> str:
+        return f"{self.name} [{self.kind}] {self.path}:{self.start_line}-{self.end_line}"
+
+
+def _looks_like_code(token: str) -> bool:
+    # Palavras comuns em minúsculas ("user", "get") não contam: só nomes com cara de código
+    return "_" in token or "." in token or any(char.isupper() for char in token[1:])
+
+
+class SymbolIndex:
+    """
+    Tabela de símbolos de um projeto: dicionários em memória nome -> definições, montados a partir
+    das definições que o indexador guarda por arquivo no manifesto (mesma análise do chunking).
+    Consultas exatas ("onde está definido UserService?") são um acesso a dicionário, sem embedding
+    nem varredura vetorial. Métodos também respondem pelo nome curto ("get" de "UserService.get").
+    """
+
+    def __init__(self, files: Dict[str, dict]):
+        self._by_name: Dict[str, List[SymbolDefinition]] = {}
+        self._by_lower: Dict[str, List[SymbolDefinition]] = {}
+        self._count = 0
+        # Cópia dos itens: o indexador pode estar atualizando o manifesto em outra thread
+        for path, entry in sorted(list(files.items())):
+            for name, kind, start_line, end_line in entry.get("symbols") or []:
+                definition = SymbolDefinition(name, kind, path, start_line, end_line)
+                self._count += 1
+                keys = [name]
+                if kind == "method":
+                    keys.append(name.rsplit(".", 1)[-1])
+                for key in keys:
+                    self._by_name.setdefault(key, []).append(definition)
+                    self._by_lower.setdefault(key.lower(), []).append(definition)
+        for definitions in self._by_name.values():
+            # Nome completo antes do nome curto de método
+            definitions.sort(key=lambda d: d.kind == "method")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def lookup(self, name: str, kind: Optional[str] = None, limit: int = MAX_LOOKUP_RESULTS) -> List[SymbolDefinition]:
+        """Definições com o nome exato (ou, se não houver, ignorando maiúsculas/minúsculas)."""
+        name = name.strip().strip("`")
+        found = self._by_name.get(name) or self._by_lower.get(name.lower(), [])
+        if kind is not None:
+            found = [definition for definition in found if definition.kind == kind]
+        return found[:limit]
+
+    def mentioned_in(self, text: str, limit: int = MAX_LOOKUP_RESULTS) -> List[SymbolDefinition]:
+        """
+        Definições dos símbolos citados num texto livre (ex: descrição de um passo): nomes entre
+        crases ou com cara de código (CamelCase, snake_case, a.b). Só nomes exatos.
+        """
+        found: List[SymbolDefinition] = []
+        for quoted, bare in _IDENTIFIER.findall(text):
+            token = quoted or bare
+            if not quoted and not _looks_like_code(token):
+                continue
+            for definition in self._by_name.get(token, []):
+                if definition not in found:
+                    found.append(definition)
+                if len(found) >= limit:
+                    return found
+        return found
+
+
+def get_symbol_index(manifest: IndexManifest) -> SymbolIndex:
+    """Tabela de símbolos do projeto do manifesto, reconstruída só quando a versão do índice muda."""
+    key = (manifest.collection_name, manifest.project)
+    version = manifest.index_version
+    with _indexes_lock:
+        cached = _indexes.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    index = SymbolIndex(manifest.files)
+    with _indexes_lock:
+        _indexes[key] = (version, index)
+    return index
+
+
+def symbol_index_for_workspace(workspace_path: str, collection_name: str) -> SymbolIndex:
+    """
+    Como get_symbol_index, sem exigir um CodeIndexer: enquanto a versão do índice conhecida no
+    processo não muda, nem o manifesto é relido do disco.
+    """
+    key = (collection_name, project_key(workspace_path))
+    version = current_index_version(collection_name, key[1])
+    with _indexes_lock:
+        cached = _indexes.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    return get_symbol_index(IndexManifest(workspace_path, collection_name))
+
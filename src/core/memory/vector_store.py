@@ -1,141 +1,586 @@
-import os
-from typing import List, Tuple
-from langchain_postgres import PGVectorStore, PGEngine
-from sqlalchemy import create_engine, text, inspect, Table, Column, String, MetaData, Text
-from sqlalchemy.dialects.postgresql import UUID, JSONB
-from pgvector.sqlalchemy import Vector
-from src.core.llm.embedding_provider import EmbeddingProvider
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from langchain_core.vectorstores.utils import maximal_marginal_relevance
+from sqlalchemy import text
+from src.core.memory.file_summary import delete_project_summaries, file_summary_collection
+from src.core.memory.registry import get_file_summary_store, get_vector_store, reset_registry
+from src.core.memory.manifest import IndexManifest, collection_index_version, current_index_version
+from src.core.memory.query_cache import get_query_embedding_cache, get_search_result_cache
+from src.core.llm.embedding_cache import embed_queries
+from src.core.memory.ranking import cosine_similarity, lexical_query, reciprocal_rank_fusion
+from src.core.memory.schema import (
+    LEXICAL_COLUMN,
+    LEXICAL_CONFIG,
+    SOURCE_TYPE_CODE,
+    SOURCE_TYPE_KNOWLEDGE_BASE,
+    delete_project_rows,
+    index_query_settings,
+)
 from src.core.logger import logger
 from src.core.config import settings
 
 class VectorMemory:
     def __init__(self):
         """
-        Inicializa a memória vetorial criando seu próprio PGEngine.
-        Com apenas o driver 'psycopg' (v3) instalado, não há ambiguidade
-        e a biblioteca selecionará o driver async correto.
+        Inicializa a memória vetorial a partir do registro de recursos do processo.
+        A primeira instância por (conexão, coleção, modelo de embeddings) valida o esquema e
+        cria os engines; as seguintes reutilizam tudo e não fazem nenhuma ida ao banco.
+        Com VECTOR_STORE_BACKEND="numpy" as buscas rodam em processo (engine fica None).
         """
-        self.embedding_provider = EmbeddingProvider()
         self.collection_name = settings.PGVECTOR_COLLECTION_NAME
 
         connection_string = settings.POSTGRES_URL
-        if not connection_string:
+        if not connection_string and settings.VECTOR_STORE_BACKEND == "pgvector":
             raise ValueError("A variável de ambiente POSTGRES_URL não está definida.")
 
-        # Normaliza para driver psycopg3 quando necessário para evitar carregar psycopg2 síncrono
-        if connection_string.startswith("postgresql+psycopg2://"):
-            connection_string = connection_string.replace("postgresql+psycopg2://", "postgresql+psycopg://", 1)
-        elif connection_string.startswith("postgresql://"):
-            connection_string = connection_string.replace("postgresql://", "postgresql+psycopg://", 1)
-
+        self.connection_string = connection_string
         self._init_store(connection_string)
 
-    def _ensure_table_structure(self, engine):
-        """
-        Garante que a tabela de vetores exista com o esquema EXATO necessário.
-        Verifica se todas as colunas obrigatórias (langchain_id, content, embedding, cmetadata) existem.
-        Se o esquema estiver incorreto, dropa a tabela e a recria.
-        """
-        try:
-            insp = inspect(engine)
-            table_exists = self.collection_name in insp.get_table_names()
-
-            should_recreate = False
-            required_columns = {"langchain_id", "content", "embedding", "cmetadata"}
-
-            if table_exists:
-                existing_columns = set(c["name"] for c in insp.get_columns(self.collection_name))
-                missing_columns = required_columns - existing_columns
-
-                if missing_columns:
-                    logger.warning(f"Tabela '{self.collection_name}' está incompleta. Faltando colunas: {missing_columns}. Recriando...")
-                    should_recreate = True
-                else:
-                    logger.debug(f"Tabela '{self.collection_name}' verificada e possui todas as colunas necessárias.")
-
-            if should_recreate:
-                # Dropa a tabela existente
-                with engine.connect() as conn:
-                    conn.execute(text(f"DROP TABLE IF EXISTS {self.collection_name} CASCADE"))
-                    conn.commit()
-                table_exists = False
-
-            if not table_exists:
-                logger.info(f"Criando tabela '{self.collection_name}' manualmente via SQLAlchemy...")
-                metadata = MetaData()
-
-                # Definição manual da tabela para garantir esquema correto
-                # content: armazena o texto do documento
-                # cmetadata: armazena metadados em formato JSONB
-                # embedding: vetor de embeddings
-                _ = Table(
-                    self.collection_name,
-                    metadata,
-                    Column("langchain_id", UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()")),
-                    Column("content", Text),
-                    Column("embedding", Vector(None)),
-                    Column("cmetadata", JSONB),
-                    extend_existing=True
-                )
-
-                metadata.create_all(engine)
-                logger.info(f"Tabela '{self.collection_name}' criada com sucesso com o esquema correto.")
-
-        except Exception as e:
-            logger.error(f"Erro ao garantir estrutura da tabela via SQLAlchemy: {e}")
-            # Não lançamos exceção aqui para tentar deixar o PGVectorStore seguir seu fluxo se possível,
-            # mas o erro é logado.
-            raise e
-
     def _init_store(self, connection_string: str):
         try:
-            # 1. Cria um engine padrão do SQLAlchemy para manutenção da estrutura
-            #    Isso é necessário porque o PGEngine do langchain-postgres não é inspecionável
-            #    diretamente pelo SQLAlchemy.
-            maintenance_engine = create_engine(connection_string)
-            self._ensure_table_structure(maintenance_engine)
-            maintenance_engine.dispose()
-
-            # 2. Cria o engine especializado da própria biblioteca langchain-postgres
-            engine = PGEngine.from_connection_string(connection_string)
-
-            # 3. Passa o engine para a PGVectorStore
-            #   Mesmo que o create_sync tente criar, ele verá a tabela existente
-            #   e deve respeitá-la.
-            self.store = PGVectorStore.create_sync(
-                engine=engine,
-                embedding_service=self.embedding_provider.get_embeddings(),
-                table_name=self.collection_name,
-                id_column="langchain_id",
-                metadata_json_column="cmetadata",
-            )
-            logger.info(f"VectorMemory inicializada com sucesso para a coleção '{self.collection_name}'.")
+            handle = get_vector_store(connection_string, self.collection_name)
+            self.store = handle.store
+            self.engine = handle.engine
+            self.embeddings = handle.embeddings
+            self.dimension = handle.dimension
+            self.embedding_identity = handle.identity
+            self.pgvector_version = handle.pgvector_version
+            logger.debug(f"VectorMemory pronta para a coleção '{self.collection_name}'.")
         except Exception as e:
-            logger.error(f"Falha crítica ao inicializar PGVectorStore: {e}")
+            logger.error(f"Falha crítica ao inicializar o vector store ({settings.VECTOR_STORE_BACKEND}): {e}")
             raise
 
     def _self_heal_schema(self, connection_string: str):
         """
-        Método de legado/fallback. A lógica principal agora está em _ensure_table_structure.
+        Método de legado/fallback. A lógica principal agora está em schema.ensure_vector_table.
         """
         try:
-            engine = create_engine(connection_string)
-            with engine.connect() as conn:
+            with self.engine.connect() as conn:
                 logger.info(f"Dropando tabela '{self.collection_name}'...")
                 conn.execute(text(f"DROP TABLE IF EXISTS {self.collection_name} CASCADE"))
                 conn.commit()
+            # O esquema precisa ser revalidado na próxima inicialização
+            reset_registry()
             logger.info("Tabela removida.")
         except Exception as e:
             logger.error(f"Erro no self_heal: {e}")
 
-    def search(self, query: str, k: int = 5) -> List[Tuple[str, dict]]:
+    def index_version(self, project: str) -> int:
         """
-        Realiza uma busca por similaridade no banco de dados vetorial.
+        Versão do índice do projeto que as buscas enxergam agora. Junto com os tickets da
+        IndexQueue, permite ao chamador decidir entre esperar por dados frescos ou aceitar os atuais.
+        """
+        return current_index_version(self.collection_name, project)
+
+    def delete_project(self, project: str, source_type: Optional[str] = None) -> int:
+        """
+        Remove da coleção apenas as linhas de um projeto (sem afetar os demais) e invalida o
+        manifesto dele, para que a próxima indexação reconstrua o projeto do zero.
+        Retorna o número de linhas removidas.
+        """
+        if self.engine is None:
+            deleted = self.store.delete_project(project, source_type=source_type)
+        else:
+            deleted = delete_project_rows(self.engine, self.collection_name, project, source_type=source_type)
+        if source_type in (None, SOURCE_TYPE_CODE):
+            try:
+                delete_project_summaries(self._file_summaries(), self.collection_name, project)
+            except Exception as e:
+                logger.warning(f"Falha ao remover os resumos de arquivo do projeto '{project}': {e}")
+        IndexManifest.invalidate_project(self.collection_name, project)
+        logger.info(f"{deleted} linha(s) do projeto '{project}' removida(s) da coleção '{self.collection_name}'.")
+        return deleted
+
+    @staticmethod
+    def _filters(project: Optional[str], source_type: Optional[str]) -> Tuple[List[str], dict]:
+        conditions, params = [], {}
+        if project is not None:
+            # A base de conhecimento (project NULL) é compartilhada: entra em toda busca por projeto
+            conditions.append(f"(project = :project OR source_type = '{SOURCE_TYPE_KNOWLEDGE_BASE}')")
+            params["project"] = project
+        if source_type is not None:
+            conditions.append("source_type = :source_type")
+            params["source_type"] = source_type
+        return conditions, params
+
+    @staticmethod
+    def _to_result(row) -> Tuple[str, dict]:
+        _, content, metadata, row_project, row_source_type = row[:5]
+        metadata = dict(metadata or {})
+        if row_project is not None:
+            metadata.setdefault("project", row_project)
+        if row_source_type is not None:
+            metadata.setdefault("source_type", row_source_type)
+        return content, metadata
+
+    def _embed_query(self, query: str) -> List[float]:
+        """Embedding da consulta com cache LRU+TTL por (modelo, texto): retries do mesmo passo não reembedam."""
+        if not settings.SEARCH_CACHE_ENABLED:
+            return self.embeddings.embed_query(query)
+        cache = get_query_embedding_cache()
+        key = (self.embedding_identity, query)
+        vector = cache.get(key)
+        if vector is None:
+            vector = self.embeddings.embed_query(query)
+            cache.set(key, vector)
+        return vector
+
+    @staticmethod
+    def _vector_column(with_vectors: bool) -> str:
+        # real[] chega como lista de floats sem depender do adaptador do pgvector no driver
+        return ", CAST(embedding AS real[]) AS vector" if with_vectors else ""
+
+    def _vector_rows(
+        self, query_vector: List[float], k: int, conditions: List[str], params: dict, ef_search, probes,
+        with_vectors: bool = False, table: Optional[str] = None, store=None,
+    ) -> list:
+        # table/store: outra tabela da coleção (ex: resumos por arquivo) no lugar da de chunks
+        if self.engine is None:
+            return (store or self.store).vector_rows(query_vector, k, with_vectors=with_vectors, **params)
+        vector_literal = "[" + ",".join(str(float(x)) for x in query_vector) + "]"
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+
+        sql = text(
+            f"SELECT langchain_id, content, cmetadata, project, source_type, "
+            f"embedding <=> CAST(:query_vector AS vector) AS distance{self._vector_column(with_vectors)} "
+            f"FROM {table or self.collection_name} "
+            f"{where}"
+            f"ORDER BY embedding <=> CAST(:query_vector AS vector) "
+            f"LIMIT :k"
+        )
+        # SET LOCAL só vale dentro da transação: engine.begin() isola o ajuste nesta consulta
+        with self.engine.begin() as conn:
+            for statement in index_query_settings(
+                k, ef_search=ef_search, probes=probes, filtered=bool(conditions), pgvector_version=self.pgvector_version
+            ):
+                conn.execute(text(statement))
+            return conn.execute(sql, {**params, "query_vector": vector_literal, "k": k}).fetchall()
+
+    def _embed_queries(self, queries: Sequence[str]) -> List[List[float]]:
+        """Embeddings de várias consultas: as que não estão no cache vão ao provedor numa única chamada."""
+        cache = get_query_embedding_cache() if settings.SEARCH_CACHE_ENABLED else None
+        vectors: Dict[str, List[float]] = {}
+        if cache is not None:
+            for query in queries:
+                vector = cache.get((self.embedding_identity, query))
+                if vector is not None:
+                    vectors[query] = vector
+        missing = [query for query in dict.fromkeys(queries) if query not in vectors]
+        for query, vector in zip(missing, embed_queries(self.embeddings, missing)):
+            vectors[query] = vector
+            if cache is not None:
+                cache.set((self.embedding_identity, query), vector)
+        return [vectors[query] for query in queries]
+
+    @staticmethod
+    def _group_by_query(rows, count: int) -> List[list]:
+        grouped: List[list] = [[] for _ in range(count)]
+        for row in rows:
+            grouped[row[0] - 1].append(tuple(row[1:]))
+        return grouped
+
+    def _vector_rows_many(
+        self, query_vectors: List[List[float]], k: int, conditions: List[str], params: dict, ef_search, probes,
+        with_vectors: bool = False,
+    ) -> List[list]:
+        if self.engine is None:
+            return self.store.vector_rows_many(query_vectors, k, with_vectors=with_vectors, **params)
+        literals = ["[" + ",".join(str(float(x)) for x in vector) + "]" for vector in query_vectors]
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        vector_column = self._vector_column(with_vectors)
+
+        # Um único round trip: cada consulta vira uma linha de unnest e o LATERAL faz a
+        # busca ORDER BY <=> LIMIT k (que usa o índice ANN) para cada uma
+        sql = text(
+            f"SELECT q.ord, r.* "
+            f"FROM unnest(CAST(:query_vectors AS text[])) WITH ORDINALITY AS q(vec, ord) "
+            f"CROSS JOIN LATERAL ("
+            f"SELECT langchain_id, content, cmetadata, project, source_type, "
+            f"embedding <=> CAST(q.vec AS vector) AS distance{vector_column} "
+            f"FROM {self.collection_name} "
+            f"{where}"
+            f"ORDER BY embedding <=> CAST(q.vec AS vector) "
+            f"LIMIT :k"
+            f") AS r "
+            f"ORDER BY q.ord, r.distance"
+        )
+        with self.engine.begin() as conn:
+            for statement in index_query_settings(
+                k, ef_search=ef_search, probes=probes, filtered=bool(conditions), pgvector_version=self.pgvector_version
+            ):
+                conn.execute(text(statement))
+            rows = conn.execute(sql, {**params, "query_vectors": literals, "k": k}).fetchall()
+        return self._group_by_query(rows, len(query_vectors))
+
+    def _lexical_rows_many(
+        self, queries: Sequence[str], k: int, conditions: List[str], params: dict, with_vectors: bool = False
+    ) -> List[list]:
+        if self.engine is None:
+            return [self.store.lexical_rows(query, k, with_vectors=with_vectors, **params) for query in queries]
+        # Consultas sem termos úteis ficam fora do unnest e voltam vazias
+        positions, tsqueries = [], []
+        for position, query in enumerate(queries):
+            tsquery = lexical_query(query)
+            if tsquery:
+                positions.append(position)
+                tsqueries.append(tsquery)
+        grouped: List[list] = [[] for _ in queries]
+        if not tsqueries:
+            return grouped
+        where = " AND ".join([f"{LEXICAL_COLUMN} @@ to_tsquery('{LEXICAL_CONFIG}', q.expr)"] + conditions)
+
+        sql = text(
+            f"SELECT q.ord, r.* "
+            f"FROM unnest(CAST(:tsqueries AS text[])) WITH ORDINALITY AS q(expr, ord) "
+            f"CROSS JOIN LATERAL ("
+            f"SELECT langchain_id, content, cmetadata, project, source_type, "
+            f"ts_rank_cd({LEXICAL_COLUMN}, to_tsquery('{LEXICAL_CONFIG}', q.expr)) AS rank{self._vector_column(with_vectors)} "
+            f"FROM {self.collection_name} "
+            f"WHERE {where} "
+            f"ORDER BY rank DESC "
+            f"LIMIT :k"
+            f") AS r "
+            f"ORDER BY q.ord, r.rank DESC"
+        )
+        with self.engine.connect() as conn:
+            rows = conn.execute(sql, {**params, "tsqueries": tsqueries, "k": k}).fetchall()
+        for position, found in zip(positions, self._group_by_query(rows, len(tsqueries))):
+            grouped[position] = found
+        return grouped
+
+    def _lexical_rows(
+        self, query: str, k: int, conditions: List[str], params: dict, with_vectors: bool = False,
+        table: Optional[str] = None, store=None,
+    ) -> list:
+        if self.engine is None:
+            return (store or self.store).lexical_rows(query, k, with_vectors=with_vectors, **params)
+        tsquery = lexical_query(query)
+        if not tsquery:
+            return []
+        where = " AND ".join([f"{LEXICAL_COLUMN} @@ q"] + conditions)
+
+        sql = text(
+            f"SELECT langchain_id, content, cmetadata, project, source_type, "
+            f"ts_rank_cd({LEXICAL_COLUMN}, q) AS rank{self._vector_column(with_vectors)} "
+            f"FROM {table or self.collection_name}, to_tsquery('{LEXICAL_CONFIG}', :tsquery) AS q "
+            f"WHERE {where} "
+            f"ORDER BY rank DESC "
+            f"LIMIT :k"
+        )
+        with self.engine.connect() as conn:
+            return conn.execute(sql, {**params, "tsquery": tsquery, "k": k}).fetchall()
+
+    def search(
+        self,
+        query: str,
+        k: int = 5,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        project: Optional[str] = None,
+        source_type: Optional[str] = None,
+        mode: Optional[str] = None,
+        min_score: Optional[float] = None,
+        mmr: bool = False,
+        mmr_lambda: Optional[float] = None,
+        with_scores: bool = False,
+        file_shortlist: int = 0,
+    ) -> list:
         """
-        logger.info(f"Realizando busca por similaridade para a query: '{query[:50]}...'")
+        Busca trechos relevantes para a query no banco de dados vetorial.
+        - mode="vector": similaridade por distância de cosseno.
+        - mode="lexical": full-text (tsvector + GIN), sem nenhuma chamada ao provedor de embeddings.
+        - mode="hybrid": roda as duas e funde os rankings por RRF; se o embedding falhar,
+          devolve só o lado lexical. Se omitido, vale settings.VECTOR_SEARCH_MODE.
+        ef_search (HNSW) e probes (IVFFlat) permitem trocar latência por recall por consulta;
+        se omitidos, valem os padrões de settings.
+        project / source_type ("code" ou "knowledge_base") restringem a busca no próprio SQL,
+        para que projetos concorrentes não poluam o contexto uns dos outros. A base de conhecimento
+        (linhas sem projeto) é compartilhada e entra em toda busca por projeto.
+
+        Score de cada trecho: similaridade de cosseno com a query (1 - distância) nos modos
+        vector/hybrid (no híbrido, trechos achados só pelo lado lexical têm a similaridade
+        calculada a partir do vetor já lido); ts_rank_cd no modo lexical.
+        - min_score: descarta trechos com similaridade abaixo do limite (não vale no modo lexical
+          nem para trechos sem similaridade conhecida, ex: embedding indisponível).
+        - mmr: reordena os candidatos já buscados por Maximal Marginal Relevance (diversidade),
+          com peso de relevância mmr_lambda (padrão settings.SEARCH_MMR_LAMBDA).
+        - with_scores: retorna (conteúdo, metadados, score) em vez de (conteúdo, metadados).
+        - file_shortlist: busca em dois níveis. Primeiro seleciona os N arquivos mais relevantes na
+          tabela de resumos por arquivo (mesmo modo de busca) e depois busca só entre os chunks de
+          código desses arquivos (linhas de outros tipos de fonte não são restritas). Se a tabela de
+          resumos estiver vazia ou indisponível, ou se não houver vetor da query (modo lexical ou
+          embedding indisponível), busca em todos os chunks. 0 desliga.
+
+        Resultados ficam em cache (LRU+TTL) por (query, k, filtros, versão do índice): a mesma
+        busca repetida nos retries de um passo não chama o provedor nem o banco, e qualquer
+        reindexação do projeto (bump_version) muda a chave.
+        """
+        mode = mode or settings.VECTOR_SEARCH_MODE
+        mmr_lambda = settings.SEARCH_MMR_LAMBDA if mmr_lambda is None else mmr_lambda
+        options = (min_score, mmr, mmr_lambda)
+        cache_key = None
+        if settings.SEARCH_CACHE_ENABLED:
+            cache_key = self._cache_key(query, k, mode, ef_search, probes, project, source_type, options, file_shortlist)
+            cached = get_search_result_cache().get(cache_key)
+            if cached is not None:
+                logger.debug(f"Busca ({mode}) servida do cache: '{query[:50]}...'")
+                return self._output(cached, with_scores)
+
+        logger.info(f"Realizando busca ({mode}) para a query: '{query[:50]}...'")
+        conditions, params = self._filters(project, source_type)
         try:
-            documents = self.store.similarity_search_with_score(query, k=k)
-            return [(doc.page_content, doc.metadata) for doc, score in documents]
+            results, complete = self._search(query, k, conditions, params, ef_search, probes, mode, options, file_shortlist)
         except Exception as e:
             logger.error(f"Erro durante a busca por similaridade: {e}")
             return []
+        # Resultado degradado (embedding falhou no modo híbrido) não entra no cache
+        if cache_key is not None and complete:
+            get_search_result_cache().set(cache_key, self._output(results, True))
+        return self._output(results, with_scores)
+
+    def search_many(
+        self,
+        queries: Sequence[str],
+        k: int = 5,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        project: Optional[str] = None,
+        source_type: Optional[str] = None,
+        mode: Optional[str] = None,
+        min_score: Optional[float] = None,
+        mmr: bool = False,
+        mmr_lambda: Optional[float] = None,
+        with_scores: bool = False,
+    ) -> List[list]:
+        """
+        Versão em lote de `search`: uma lista de resultados por query, na mesma ordem.
+        As queries fora do cache são embedadas numa única chamada ao provedor e cada lado
+        (vetorial / lexical) roda em um único round trip ao banco (unnest + LATERAL), em vez
+        de N embeddings e N consultas. Mesmos modos, filtros, scores e cache de `search`.
+        """
+        mode = mode or settings.VECTOR_SEARCH_MODE
+        mmr_lambda = settings.SEARCH_MMR_LAMBDA if mmr_lambda is None else mmr_lambda
+        options = (min_score, mmr, mmr_lambda)
+        results: List[Optional[list]] = [None] * len(queries)
+        cache = get_search_result_cache() if settings.SEARCH_CACHE_ENABLED else None
+        # Mesma chave de `search` (sem busca em dois níveis): as duas APIs compartilham as entradas
+        keys = [
+            self._cache_key(q, k, mode, ef_search, probes, project, source_type, options, file_shortlist=0)
+            for q in queries
+        ] if cache is not None else []
+        if cache is not None:
+            for index, key in enumerate(keys):
+                cached = cache.get(key)
+                if cached is not None:
+                    results[index] = self._output(cached, with_scores)
+
+        pending = list(dict.fromkeys(q for q, found in zip(queries, results) if found is None))
+        if pending:
+            logger.info(f"Realizando {len(pending)} busca(s) em lote ({mode}).")
+            conditions, params = self._filters(project, source_type)
+            try:
+                fresh, complete = self._search_many(pending, k, conditions, params, ef_search, probes, mode, options)
+            except Exception as e:
+                logger.error(f"Erro durante a busca em lote por similaridade: {e}")
+                fresh, complete = {query: [] for query in pending}, False
+            for index, query in enumerate(queries):
+                if results[index] is None:
+                    results[index] = self._output(fresh[query], with_scores)
+                    if cache is not None and complete:
+                        cache.set(keys[index], self._output(fresh[query], True))
+        return results
+
+    @staticmethod
+    def _output(results: list, with_scores: bool) -> list:
+        # Cópias dos metadados: o chamador pode alterá-los sem corromper o cache
+        if with_scores:
+            return [(content, dict(metadata), score) for content, metadata, score in results]
+        return [(content, dict(metadata)) for content, metadata, _ in results]
+
+    def _cache_key(
+        self, query: str, k: int, mode: str, ef_search, probes, project, source_type, options: tuple, file_shortlist: int,
+    ) -> tuple:
+        """Chave do cache de resultados, usada por `search` e `search_many`."""
+        version = (
+            current_index_version(self.collection_name, project)
+            if project is not None
+            else collection_index_version(self.collection_name)
+        )
+        return (
+            self.collection_name, self.embedding_identity, query, k, mode,
+            ef_search, probes, project, source_type, options, file_shortlist, version,
+        )
+
+    @staticmethod
+    def _candidate_count(k: int, mode: str, mmr: bool) -> int:
+        # Híbrido e MMR escolhem entre mais candidatos do que os k devolvidos
+        if mode == "hybrid" or mmr:
+            return k * max(1, settings.HYBRID_CANDIDATE_MULTIPLIER)
+        return k
+
+    def _search(
+        self, query: str, k: int, conditions: List[str], params: dict, ef_search, probes, mode: str, options: tuple,
+        file_shortlist: int = 0,
+    ) -> Tuple[list, bool]:
+        """Executa a busca no modo pedido. Retorna ([(conteúdo, metadados, score)], completo)."""
+        min_score, mmr, _ = options
+        candidates = self._candidate_count(k, mode, mmr)
+        # Vetores dos candidatos só são lidos quando algum critério precisa deles
+        with_vectors = mmr or (mode == "hybrid" and min_score is not None)
+        complete = True
+        query_vector = None
+        if mode != "lexical":
+            try:
+                query_vector = self._embed_query(query)
+            except Exception as e:
+                if mode == "vector":
+                    raise
+                logger.warning(f"Busca vetorial indisponível ({e}); usando apenas a busca lexical.")
+                complete = False
+
+        if file_shortlist:
+            conditions, params, shortlisted = self._restrict_to_files(
+                query, query_vector, file_shortlist, mode, conditions, params, ef_search, probes
+            )
+            complete = complete and shortlisted
+
+        lexical = self._lexical_rows(query, candidates, conditions, params, with_vectors) if mode != "vector" else []
+        vector = []
+        if query_vector is not None:
+            try:
+                vector = self._vector_rows(query_vector, candidates, conditions, params, ef_search, probes, with_vectors)
+            except Exception as e:
+                if mode == "vector":
+                    raise
+                logger.warning(f"Busca vetorial indisponível ({e}); usando apenas a busca lexical.")
+                query_vector = None
+                complete = False
+        return self._select(k, mode, query_vector, vector, lexical, options), complete
+
+    def _file_summaries(self):
+        """Handle da tabela de resumos por arquivo (criado sob demanda: só a busca em dois níveis o usa)."""
+        return get_file_summary_store(self.connection_string, self.collection_name)
+
+    def _shortlist_files(
+        self, query: str, query_vector: Optional[List[float]], limit: int, mode: str, project: Optional[str],
+        ef_search, probes,
+    ) -> List[str]:
+        """Primeiro nível da busca: os arquivos (metadata["source"]) mais relevantes segundo os resumos."""
+        handle = self._file_summaries()
+        table = file_summary_collection(self.collection_name)
+        conditions, params = self._filters(project, None)
+        vector = []
+        if query_vector is not None:
+            vector = self._vector_rows(
+                query_vector, limit, conditions, params, ef_search, probes, table=table, store=handle.store
+            )
+        lexical = []
+        if mode != "vector":
+            lexical = self._lexical_rows(query, limit, conditions, params, table=table, store=handle.store)
+        rows = {}
+        for row in vector + lexical:
+            rows.setdefault(row[0], row)
+        fused = reciprocal_rank_fusion([[row[0] for row in vector], [row[0] for row in lexical]], k=settings.HYBRID_RRF_K)
+        sources = []
+        for key in fused:
+            source = (rows[key][2] or {}).get("source")
+            if source and source not in sources:
+                sources.append(source)
+        return sources[:limit]
+
+    def _restrict_to_files(
+        self, query: str, query_vector: Optional[List[float]], limit: int, mode: str,
+        conditions: List[str], params: dict, ef_search, probes,
+    ) -> Tuple[List[str], dict, bool]:
+        """
+        Restringe os chunks de código aos arquivos pré-selecionados. Retorna (condições, parâmetros, ok);
+        sem pré-seleção (tabela de resumos vazia ou com erro) a busca segue sem restrição.
+        """
+        if params.get("source_type") not in (None, SOURCE_TYPE_CODE):
+            return conditions, params, True
+        if query_vector is None:
+            # Sem vetor da query (modo lexical ou embedding indisponível) a pré-seleção seria só
+            # lexical sobre resumos curtos e excluiria arquivos que casam apenas pelo código
+            return conditions, params, True
+        try:
+            sources = self._shortlist_files(query, query_vector, limit, mode, params.get("project"), ef_search, probes)
+        except Exception as e:
+            logger.warning(f"Pré-seleção de arquivos indisponível ({e}); buscando em todos os chunks.")
+            return conditions, params, False
+        if not sources:
+            return conditions, params, True
+        logger.debug(f"Busca em dois níveis: {len(sources)} arquivo(s) pré-selecionado(s).")
+        restriction = f"(source_type IS DISTINCT FROM '{SOURCE_TYPE_CODE}' OR cmetadata->>'source' = ANY(:sources))"
+        return conditions + [restriction], {**params, "sources": sources}, True
+
+    def _search_many(
+        self, queries: List[str], k: int, conditions: List[str], params: dict, ef_search, probes, mode: str, options: tuple
+    ) -> Tuple[Dict[str, list], bool]:
+        min_score, mmr, _ = options
+        candidates = self._candidate_count(k, mode, mmr)
+        with_vectors = mmr or (mode == "hybrid" and min_score is not None)
+        no_rows = [[] for _ in queries]
+        query_vectors: List[Optional[List[float]]] = [None] * len(queries)
+        if mode == "lexical":
+            lexical = self._lexical_rows_many(queries, candidates, conditions, params)
+            vector = no_rows
+        elif mode == "vector":
+            query_vectors = self._embed_queries(queries)
+            vector = self._vector_rows_many(query_vectors, candidates, conditions, params, ef_search, probes, with_vectors)
+            lexical = no_rows
+        else:
+            lexical = self._lexical_rows_many(queries, candidates, conditions, params, with_vectors)
+            try:
+                query_vectors = self._embed_queries(queries)
+                vector = self._vector_rows_many(query_vectors, candidates, conditions, params, ef_search, probes, with_vectors)
+            except Exception as e:
+                logger.warning(f"Busca vetorial em lote indisponível ({e}); usando apenas a busca lexical.")
+                return {
+                    q: self._select(k, mode, None, [], rows, options) for q, rows in zip(queries, lexical)
+                }, False
+        return {
+            q: self._select(k, mode, qv, v, l, options)
+            for q, qv, v, l in zip(queries, query_vectors, vector, lexical)
+        }, True
+
+    def _select(
+        self, k: int, mode: str, query_vector: Optional[List[float]], vector: list, lexical: list, options: tuple
+    ) -> List[Tuple[str, dict, Optional[float]]]:
+        """Ordena (RRF no híbrido), pontua, aplica o limite de similaridade e o MMR, e corta em k."""
+        min_score, mmr, mmr_lambda = options
+        if mode == "lexical":
+            # ts_rank_cd está em outra escala: min_score (similaridade de cosseno) não se aplica
+            scored = [(row, float(row[5])) for row in lexical]
+        else:
+            similarities = {row[0]: 1.0 - float(row[5]) for row in vector}
+            if mode == "vector":
+                ordered = vector
+            else:
+                rows = {}
+                for row in vector + lexical:
+                    rows.setdefault(row[0], row)
+                fused = reciprocal_rank_fusion(
+                    [[row[0] for row in vector], [row[0] for row in lexical]],
+                    k=settings.HYBRID_RRF_K,
+                )
+                ordered = [rows[key] for key in fused]
+            scored = [
+                (row, similarities[row[0]] if row[0] in similarities else cosine_similarity(query_vector, _row_vector(row)))
+                for row in ordered
+            ]
+            if min_score is not None:
+                scored = [(row, score) for row, score in scored if score is None or score >= min_score]
+            if mmr and query_vector is not None and len(scored) > k and all(_row_vector(row) is not None for row, _ in scored):
+                picked = maximal_marginal_relevance(
+                    np.asarray(query_vector, dtype=np.float32),
+                    [_row_vector(row) for row, _ in scored],
+                    lambda_mult=mmr_lambda,
+                    k=k,
+                )
+                scored = [scored[index] for index in picked]
+        return [(*self._to_result(row), score) for row, score in scored[:k]]
+
+
+def _row_vector(row) -> Optional[list]:
+    """Vetor do trecho (coluna extra pedida com with_vectors), se a linha o trouxer."""
+    return row[6] if len(row) > 6 and row[6] is not None else None
@@ -0,0 +1,186 @@
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+from src.core.config import settings
+from src.core.logger import logger
+from src.core.memory.file_filter import IGNORE_FILES
+from src.core.memory.index_queue import schedule_indexing
+
+# watchdog (inotify/FSEvents/ReadDirectoryChangesW) é opcional: sem ele o watcher usa polling
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+
+# Eventos de diretório que mudam o conjunto de arquivos sob ele: só esses reagendam a subárvore
+_DIRECTORY_RESCAN_EVENTS = ("created", "moved", "deleted")
+
+
+class _WatchdogHandler(FileSystemEventHandler):
+    """Repassa os eventos do watchdog ao WorkspaceWatcher."""
+
+    def __init__(self, watcher: "WorkspaceWatcher"):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if event.event_type in ("opened", "closed_no_write"):
+            return
+        if event.is_directory and event.event_type not in _DIRECTORY_RESCAN_EVENTS:
+            # "modified" de diretório chega a cada escrita de um filho (que já tem evento próprio);
+            # reagendar a subárvore inteira por isso faria uma varredura a cada arquivo salvo
+            return
+        paths = [event.src_path]
+        dest_path = getattr(event, "dest_path", "")
+        if dest_path:
+            paths.append(dest_path)
+        self.watcher.notify(paths, is_directory=event.is_directory)
+
+
+class WorkspaceWatcher:
+    """
+    Observa o workspace de um projeto e envia os caminhos alterados para a indexação incremental.
+
+    Cobre mudanças que não passam pelo ResponseHandler (geradores de código, `npm init`,
+    `cargo new` executados no sandbox). Usa watchdog quando instalado e, caso contrário,
+    compara snapshots de (size, mtime) a cada `poll_interval` segundos. Os diretórios de
+    CodeIndexer.EXCLUDE_DIRS são ignorados, e o debounce fica a cargo da IndexQueue, que
+    agrupa os eventos de uma rajada em uma única passada restrita aos caminhos alterados.
+    """
+
+    def __init__(self, indexer, backend: Optional[str] = None, poll_interval: Optional[float] = None):
+        self.indexer = indexer
+        self.poll_interval = poll_interval if poll_interval is not None else settings.INDEX_WATCH_POLL_SECONDS
+        requested = backend or settings.INDEX_WATCH_BACKEND
+        if requested == "watchdog" and Observer is None:
+            logger.warning("watchdog não está instalado; o watcher de workspace usará polling.")
+        self.backend = "watchdog" if requested in ("auto", "watchdog") and Observer is not None else "polling"
+
+        self._observer = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._snapshot: Dict[str, Tuple[int, float]] = {}
+
+    @property
+    def project(self) -> str:
+        return self.indexer.project
+
+    @property
+    def is_running(self) -> bool:
+        if self._observer is not None:
+            return self._observer.is_alive()
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.is_running:
+            return
+        self._stop.clear()
+        if self.backend == "watchdog":
+            self._observer = Observer()
+            self._observer.schedule(_WatchdogHandler(self), self.indexer.workspace_path, recursive=True)
+            self._observer.daemon = True
+            self._observer.start()
+        else:
+            self._snapshot = self._take_snapshot()
+            self._thread = threading.Thread(target=self._poll_loop, name=f"watcher-{self.project}", daemon=True)
+            self._thread.start()
+        logger.info(f"Watcher ({self.backend}) ativo para o workspace '{self.indexer.workspace_path}'.")
+
+    def stop(self):
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+            self._observer = None
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _is_relevant(self, rel_path: str, is_directory: bool) -> bool:
+        if self.indexer.ignore_matcher.is_ignored(rel_path, is_dir=is_directory):
+            return False
+        if is_directory:
+            return True
+        # Arquivo não indexável só interessa se já estava no índice (ex: renomeado para .bak)
+        return self.indexer.is_indexable(rel_path) or self.indexer.manifest.get(rel_path) is not None
+
+    def notify(self, paths: Iterable[str], is_directory: bool = False):
+        """Filtra os caminhos alterados e agenda uma passada de indexação restrita a eles."""
+        relevant = set()
+        for path in paths:
+            rel_path = self.indexer.to_relative(path)
+            if rel_path in IGNORE_FILES:
+                # Regras de ignore mudaram: só uma varredura completa sabe o que entra e o que sai
+                self._schedule(None)
+                return
+            if rel_path and self._is_relevant(rel_path, is_directory):
+                relevant.add(rel_path)
+        if relevant:
+            self._schedule(relevant)
+
+    def _schedule(self, paths):
+        try:
+            schedule_indexing(self.indexer, paths=paths)
+        except Exception as e:
+            logger.warning(f"Falha ao agendar indexação a partir do watcher: {e}")
+
+    def _take_snapshot(self) -> Dict[str, Tuple[int, float]]:
+        return {
+            rel_path: (st.st_size, st.st_mtime)
+            for rel_path, (_, st) in self.indexer._scan_workspace().items()
+        }
+
+    def poll_once(self):
+        """Compara o workspace com o último snapshot e notifica os caminhos que mudaram."""
+        current = self._take_snapshot()
+        previous = self._snapshot
+        changed = [p for p, sig in current.items() if previous.get(p) != sig]
+        changed.extend(p for p in previous if p not in current)
+        self._snapshot = current
+        if changed:
+            self.notify(changed)
+
+    def _poll_loop(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll_once()
+            except Exception as e:
+                logger.warning(f"Erro no polling do workspace '{self.indexer.workspace_path}': {e}")
+
+
+_watchers: Dict[str, WorkspaceWatcher] = {}
+_watchers_lock = threading.Lock()
+
+
+def watch_workspace(indexer, backend: Optional[str] = None) -> WorkspaceWatcher:
+    """Inicia (uma única vez por projeto no processo) o watcher do workspace do `indexer`."""
+    with _watchers_lock:
+        watcher = _watchers.get(indexer.project)
+        if watcher is None or not watcher.is_running:
+            watcher = WorkspaceWatcher(indexer, backend=backend)
+            watcher.start()
+            _watchers[indexer.project] = watcher
+        return watcher
+
+
+def is_watched(project: str) -> bool:
+    with _watchers_lock:
+        watcher = _watchers.get(project)
+        return watcher is not None and watcher.is_running
+
+
+def unwatch_workspace(project: str):
+    with _watchers_lock:
+        watcher = _watchers.pop(project, None)
+    if watcher is not None:
+        watcher.stop()
+
+
+def stop_all_watchers():
+    with _watchers_lock:
+        watchers = list(_watchers.values())
+        _watchers.clear()
+    for watcher in watchers:
+        watcher.stop()
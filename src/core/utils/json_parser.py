@@ -30,3 +30,73 @@ def extract_json_from_text(text: str) -> Optional[Dict[str, Any]]:
             return json.loads(corrected_str)
         except json.JSONDecodeError:
             return None
+
+
+class JsonObjectScanner:
+    """
+    Incrementally finds the end of the first top-level JSON object in text that arrives in
+    pieces (token streaming). Braces inside strings are ignored; a balanced candidate that does
+    not parse (e.g. "{name}" in the prose before the JSON) is skipped and scanning resumes.
+    Once `feed` returns True, the rest of the generation is not needed.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.start: Optional[int] = None
+        self.end: Optional[int] = None
+        self.value: Optional[Any] = None
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    @property
+    def complete(self) -> bool:
+        return self.end is not None
+
+    @property
+    def json_text(self) -> Optional[str]:
+        return self.text[self.start:self.end] if self.complete else None
+
+    def feed(self, chunk: str) -> bool:
+        """Appends a chunk; returns True once a complete, parseable object has been received."""
+        if self.complete:
+            return True
+        self.text += chunk
+        while self._pos < len(self.text):
+            char = self.text[self._pos]
+            self._pos += 1
+            if self.start is None:
+                if char == "{":
+                    self.start, self._depth = self._pos - 1, 1
+                continue
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            if char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0 and self._accept(self.text[self.start:self._pos]):
+                    self.end = self._pos
+                    return True
+                if self._depth == 0:
+                    # Not JSON after all: resume right after the opening brace
+                    self._pos, self.start = self.start + 1, None
+        return False
+
+    def _accept(self, candidate: str) -> bool:
+        for attempt in (candidate, re.sub(r',\s*([\}\]])', r'\1', candidate)):
+            try:
+                self.value = json.loads(attempt)
+                return True
+            except json.JSONDecodeError:
+                continue
+        return False
@@ -1,8 +1,30 @@
 import os
 import sys
+import argparse
 from sqlalchemy import create_engine, text
 
-def reset_vector_db():
+# Ensure src is in pythonpath
+sys.path.append(os.getcwd())
+
+from src.core.memory.manifest import IndexManifest, project_key
+from src.core.memory.schema import delete_project_rows
+
+def reset_project(db_url, collection_name, project):
+    """Deletes only the rows of one project, leaving other projects and the knowledge base intact."""
+    # Accept either a workspace path or an already computed project key
+    if os.path.isdir(project):
+        project = project_key(project)
+
+    print(f"Deleting rows of project '{project}' from table {collection_name}...")
+    engine = create_engine(db_url)
+    try:
+        deleted = delete_project_rows(engine, collection_name, project)
+    finally:
+        engine.dispose()
+    IndexManifest.invalidate_project(collection_name, project)
+    print(f"{deleted} rows deleted.")
+
+def reset_vector_db(project=None):
     # Use the internal container URL structure or environment variable
     db_url = os.getenv("POSTGRES_URL")
     if not db_url:
@@ -15,6 +37,14 @@ def reset_vector_db():
 
     collection_name = os.getenv("PGVECTOR_COLLECTION_NAME", "code_collection")
 
+    if project:
+        try:
+            reset_project(db_url, collection_name, project)
+        except Exception as e:
+            print(f"Error resetting project: {e}")
+            sys.exit(1)
+        return
+
     print(f"Connecting to database to drop table: {collection_name}")
 
     try:
@@ -32,9 +62,16 @@ def reset_vector_db():
             conn.commit()
             print("Tables dropped successfully.")
 
+        # Incremental indexing manifests point at chunks that no longer exist
+        IndexManifest.invalidate_collection(collection_name)
+
     except Exception as e:
         print(f"Error resetting database: {e}")
         sys.exit(1)
 
 if __name__ == "__main__":
-    reset_vector_db()
+    parser = argparse.ArgumentParser(description="Reset the vector DB (whole collection or a single project).")
+    parser.add_argument("--project", help="Workspace path or project key to reset; other projects are kept.")
+    args = parser.parse_args()
+
+    reset_vector_db(project=args.project)
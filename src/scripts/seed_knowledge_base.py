@@ -11,12 +11,20 @@ from langchain_text_splitters import MarkdownHeaderTextSplitter, RecursiveCharac
 from langchain_postgres import PGVectorStore, PGEngine
 from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
-from sqlalchemy import create_engine, text, inspect, Table, Column, MetaData, Text
-from sqlalchemy.dialects.postgresql import UUID, JSONB
-from pgvector.sqlalchemy import Vector
+from sqlalchemy import create_engine, text
 
 from src.core.config import settings
 from src.core.llm.embedding_provider import EmbeddingProvider
+from src.core.memory.manifest import IndexManifest, chunk_id
+from src.core.memory.schema import (
+    PARTITION_COLUMNS,
+    SOURCE_TYPE_KNOWLEDGE_BASE,
+    detect_embedding_dimension,
+    ensure_lexical_index,
+    ensure_partition_columns,
+    ensure_vector_index,
+    ensure_vector_table,
+)
 
 # Setup Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -33,59 +41,47 @@ class FakeEmbeddings(Embeddings):
     def embed_query(self, text: str) -> List[float]:
         return [1.0] * self.size
 
-def ensure_table_structure(connection_string, collection_name):
+def ensure_table_structure(connection_string, collection_name, dimension):
     """
-    Manually creates the table with the correct schema (langchain_id)
-    to match VectorMemory expectations.
+    Creates/validates the table with the correct schema (langchain_id, fixed-dimension
+    embedding and ANN index) to match VectorMemory expectations.
     """
     engine = create_engine(connection_string)
     try:
-        # Enable pgvector extension first
-        with engine.connect() as conn:
-             conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
-             conn.commit()
-
-        insp = inspect(engine)
-        table_exists = collection_name in insp.get_table_names()
-
-        should_recreate = False
-        if table_exists:
-            existing_columns = set(c["name"] for c in insp.get_columns(collection_name))
-            if "langchain_id" not in existing_columns:
-                logger.warning(f"Table {collection_name} exists but missing 'langchain_id'. Dropping...")
-                should_recreate = True
-            # Also check for cmetadata if we are enforcing it
-            if "cmetadata" not in existing_columns:
-                logger.warning(f"Table {collection_name} exists but missing 'cmetadata'. Dropping...")
-                should_recreate = True
-
-        if should_recreate:
-            with engine.connect() as conn:
-                conn.execute(text(f"DROP TABLE IF EXISTS {collection_name} CASCADE"))
-                conn.commit()
-            table_exists = False
-
-        if not table_exists:
-            logger.info(f"Creating table '{collection_name}' manually...")
-            metadata = MetaData()
-            _ = Table(
-                collection_name,
-                metadata,
-                Column("langchain_id", UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()")),
-                Column("content", Text),
-                Column("embedding", Vector(None)), # Dimension will be inferred or NULL
-                Column("cmetadata", JSONB),
-                extend_existing=True
-            )
-            metadata.create_all(engine)
-            logger.info("Table created successfully.")
-
+        recreated = ensure_vector_table(engine, collection_name, dimension)
+        migrated = ensure_partition_columns(engine, collection_name)
+        if recreated or migrated:
+            IndexManifest.invalidate_collection(collection_name)
+        ensure_vector_index(engine, collection_name, dimension)
+        ensure_lexical_index(engine, collection_name)
     except Exception as e:
         logger.error(f"Error ensuring table structure: {e}")
         raise e
     finally:
         engine.dispose()
 
+def remove_stale_knowledge_chunks(connection_string, collection_name, keep_ids: List[str]):
+    """
+    Removes knowledge_base chunks left over from previous runs (e.g. the reference
+    file shrank or was edited), keeping only the ids produced by the current run.
+    """
+    engine = create_engine(connection_string)
+    try:
+        with engine.connect() as conn:
+            result = conn.execute(
+                text(
+                    f"DELETE FROM {collection_name} "
+                    "WHERE source_type = :source_type "
+                    "AND NOT (langchain_id::text = ANY(:keep_ids))"
+                ),
+                {"source_type": SOURCE_TYPE_KNOWLEDGE_BASE, "keep_ids": keep_ids},
+            )
+            conn.commit()
+            if result.rowcount:
+                logger.info(f"Removed {result.rowcount} stale knowledge_base chunks.")
+    finally:
+        engine.dispose()
+
 def seed_knowledge_base(mock: bool = False):
     file_path = "referencias/MJProjectGeneratorReferencias.txt"
     if not os.path.exists(file_path):
@@ -119,6 +115,7 @@ def seed_knowledge_base(mock: bool = False):
 
         base_metadata = {
             "source": "knowledge_base",
+            "source_type": SOURCE_TYPE_KNOWLEDGE_BASE,
             "type": "guide",
             "topic": topic
         }
@@ -153,9 +150,6 @@ def seed_knowledge_base(mock: bool = False):
     logger.info(f"Connecting to Vector DB: {collection_name}")
 
     try:
-        # Ensure schema is correct before langchain tries anything
-        ensure_table_structure(connection_string, collection_name)
-
         if mock:
             logger.warning("Using MOCK embeddings (FakeEmbeddings).")
             embeddings = FakeEmbeddings(size=768)
@@ -163,17 +157,26 @@ def seed_knowledge_base(mock: bool = False):
             embedding_provider = EmbeddingProvider()
             embeddings = embedding_provider.get_embeddings()
 
+        # Ensure schema is correct before langchain tries anything
+        dimension = len(embeddings.embed_query("dimension probe")) if mock else detect_embedding_dimension(embeddings)
+        ensure_table_structure(connection_string, collection_name, dimension)
+
         engine = PGEngine.from_connection_string(connection_string)
         store = PGVectorStore.create_sync(
             engine=engine,
             embedding_service=embeddings,
             table_name=collection_name,
             id_column="langchain_id",
-            metadata_json_column="cmetadata"  # Matches VectorMemory schema
+            metadata_json_column="cmetadata",  # Matches VectorMemory schema
+            metadata_columns=list(PARTITION_COLUMNS)
         )
 
+        # IDs determinísticos: re-executar o seed faz upsert em vez de duplicar a base
+        ids = [chunk_id("knowledge_base", file_path, i, d.page_content) for i, d in enumerate(documents)]
+
         logger.info("Adding documents to vector store...")
-        store.add_documents(documents)
+        store.add_documents(documents, ids=ids)
+        remove_stale_knowledge_chunks(connection_string, collection_name, ids)
         logger.info("Knowledge base seeding completed successfully.")
 
     except Exception as e:
@@ -5,8 +5,12 @@ from src.tools.secure_executor import SecureExecutorTool
 from src.tools.git_tool import GitTool
 # --- NOVAS IMPORTAÇÕES ---
 from src.core.memory.vector_store import VectorMemory
-from src.core.memory.indexer import CodeIndexer
+from src.core.memory.indexer import CodeIndexer, code_collection_name
+from src.core.memory.manifest import project_key
+from src.core.memory.context_packing import pack_context
+from src.core.memory.symbol_index import symbol_index_for_workspace
 from src.core.logger import logger
+from src.core.config import settings
 
 # O caminho do workspace será lido de uma variável de ambiente para flexibilidade
 WORKSPACE_PATH = os.getenv("MJATOMIC_WORKSPACE_PATH", "./workspace")
@@ -106,18 +110,47 @@ def search_codebase(query: str) -> str:
     logger.info(f"🧠 Executando busca na base de código com a query: {query}")
     try:
         memory = VectorMemory()
-        results = memory.search(query, k=3)
+        results = memory.search(
+            query,
+            k=3,
+            project=project_key(WORKSPACE_PATH),
+            min_score=settings.CONTEXT_MIN_SIMILARITY,
+            mmr=settings.CONTEXT_MMR,
+            file_shortlist=settings.CONTEXT_FILE_SHORTLIST,
+        )
         if not results:
             return "Nenhum resultado relevante encontrado na base de código."
 
         context = "Resultados da busca na base de código:\n\n"
-        for text, metadata in results:
-            context += f"--- Trecho do arquivo: {metadata.get('source', 'desconhecido')} ---\n"
-            context += f"{text}\n\n"
+        # Trechos vizinhos do mesmo arquivo chegam mesclados e sem texto repetido
+        for snippet in pack_context(results):
+            context += f"--- {snippet.header('Trecho do arquivo', 'linhas')} ---\n"
+            context += f"{snippet.text}\n\n"
         return context
     except Exception as e:
         return f"Erro ao executar a busca na base de código: {str(e)}"
 
+@tool
+def find_symbol(name: str) -> str:
+    """
+    Localiza onde um símbolo (classe, função, método ou rota HTTP) está definido no projeto, pelo nome exato.
+    Use esta ferramenta para perguntas do tipo "onde está definido X?": é uma consulta direta à
+    tabela de símbolos, mais rápida e precisa que search_codebase.
+    Exemplo: find_symbol('UserService') ou find_symbol('GET /users')
+    """
+    logger.info(f"🔎 Procurando definição do símbolo: {name}")
+    try:
+        index = symbol_index_for_workspace(WORKSPACE_PATH, code_collection_name())
+        definitions = index.lookup(name)
+        if not definitions:
+            return (
+                f"Nenhuma definição encontrada para '{name}'. Use search_codebase para uma busca aproximada "
+                f"ou update_codebase_memory se o arquivo acabou de ser criado."
+            )
+        return "Definições encontradas (nome [tipo] arquivo:linhas):\n" + "\n".join(d.describe() for d in definitions)
+    except Exception as e:
+        return f"Erro ao consultar a tabela de símbolos: {str(e)}"
+
 @tool
 def update_codebase_memory() -> str:
     """
@@ -157,6 +190,7 @@ core_tools = [
     list_files,
     execute_command,
     search_codebase,
+    find_symbol,
     update_codebase_memory,
     setup_git_repository
 ]
@@ -0,0 +1,136 @@
+from src.core.memory.chunking import CodeChunker
+
+PYTHON_SOURCE = '''import os
+import sys
+
+
+def small():
+    return 1
+
+
+@decorator
+def decorated(x):
+    # comentário
+    return x * 2
+
+
+class Service:
+    def run(self):
+        return os.getcwd()
+'''
+
+def test_python_one_chunk_per_top_level_symbol():
+    chunker = CodeChunker(max_chars=1000, min_chars=0)
+    docs = chunker.split(PYTHON_SOURCE, "app/service.py", {"source": "/ws/app/service.py"})
+
+    by_symbol = {d.metadata.get("symbol"): d for d in docs}
+    assert set(by_symbol) == {None, "small", "decorated", "Service"}
+    assert by_symbol["decorated"].page_content.startswith("@decorator")
+    assert (by_symbol["decorated"].metadata["start_line"], by_symbol["decorated"].metadata["end_line"]) == (9, 12)
+    assert by_symbol["Service"].metadata["source"] == "/ws/app/service.py"
+
+def test_small_neighbours_are_merged():
+    chunker = CodeChunker(max_chars=1000, min_chars=200)
+    docs = chunker.split(PYTHON_SOURCE, "service.py")
+
+    assert len(docs) == 1
+    assert docs[0].metadata["symbol"] == "small, decorated, Service"
+    assert docs[0].metadata["start_line"] == 1
+
+def test_oversized_class_is_split_by_method():
+    body = "\n".join(f"        value_{i} = {i}" for i in range(20))
+    source = f"class Big:\n    def a(self):\n{body}\n\n    def b(self):\n{body}\n"
+    docs = CodeChunker(max_chars=500, min_chars=0).split(source, "big.py")
+
+    assert [d.metadata["symbol"] for d in docs] == ["Big.a", "Big.b"]
+    assert docs[0].page_content.startswith("class Big:")
+
+def test_oversized_function_falls_back_to_overlap_split_with_line_ranges():
+    body = "\n".join(f"    value_{i} = {i}" for i in range(100))
+    source = f"def huge():\n{body}\n"
+    docs = CodeChunker(max_chars=300, min_chars=0, overlap=30).split(source, "huge.py")
+
+    assert len(docs) > 1
+    assert all(d.metadata["symbol"] == "huge" for d in docs)
+    assert docs[0].metadata["start_line"] == 1
+    for doc in docs:
+        lines = source.split("\n")[doc.metadata["start_line"] - 1:doc.metadata["end_line"]]
+        assert "\n".join(lines).strip() == doc.page_content.strip()
+
+def test_typescript_declarations_with_leading_comments():
+    source = (
+        "import { x } from './x';\n"
+        "\n"
+        "/** Docs */\n"
+        "export function foo(): number {\n"
+        "  return 1;\n"
+        "}\n"
+        "\n"
+        "export class Bar {\n"
+        "  baz() {}\n"
+        "}\n"
+    )
+    docs = CodeChunker(max_chars=1000, min_chars=0).split(source, "src/a.ts")
+
+    assert [d.metadata.get("symbol") for d in docs] == [None, "foo", "Bar"]
+    assert docs[1].page_content.startswith("/** Docs */")
+    assert (docs[2].metadata["start_line"], docs[2].metadata["end_line"]) == (8, 10)
+
+def test_go_and_rust_declarations():
+    go = "package main\n\nfunc (s *Server) Start() error {\n\treturn nil\n}\n\ntype Server struct{}\n"
+    rust = "use std::io;\n\n#[derive(Debug)]\npub struct Point { x: i32 }\n\nimpl Display for Point {\n}\n"
+    chunker = CodeChunker(max_chars=1000, min_chars=0)
+
+    assert [d.metadata.get("symbol") for d in chunker.split(go, "main.go")] == [None, "Start", "Server"]
+    rust_docs = chunker.split(rust, "lib.rs")
+    assert [d.metadata.get("symbol") for d in rust_docs] == [None, "Point", "Point"]
+    assert rust_docs[1].page_content.startswith("#[derive(Debug)]")
+
+def test_syntax_error_and_plain_text_use_character_split():
+    docs = CodeChunker(text_chunk_size=50, overlap=0).split("def broken(:\n" + "x" * 120, "bad.py")
+    assert len(docs) > 1
+    assert "symbol" not in docs[0].metadata
+    assert docs[0].metadata["start_line"] == 1
+
+def test_definitions_come_from_the_same_parse_with_kinds_lines_and_routes():
+    source = (
+        "@router.get('/users')\n"
+        "async def list_users():\n"
+        "    return []\n\n"
+        "class UserService:\n"
+        "    def get(self, id):\n"
+        "        return id\n\n"
+        "@app.route('/login', methods=['POST'])\n"
+        "def login():\n"
+        "    pass\n"
+    )
+    docs, definitions = CodeChunker(min_chars=0).split_with_definitions(source, "api.py")
+
+    assert docs == CodeChunker(min_chars=0).split(source, "api.py")
+    assert definitions == [
+        ("list_users", "function", 2, 3),
+        ("GET /users", "route", 1, 3),
+        ("UserService", "class", 5, 7),
+        ("UserService.get", "method", 6, 7),
+        ("login", "function", 10, 11),
+        ("POST /login", "route", 9, 11),
+    ]
+
+def test_typescript_definitions_and_express_routes():
+    source = (
+        "// Serviço de usuários\n"
+        "export class UserService {\n"
+        "  get() {}\n"
+        "}\n\n"
+        "export interface User { id: number }\n"
+        "app.get('/users', handler);\n"
+    )
+    _, definitions = CodeChunker(min_chars=0).split_with_definitions(source, "users.ts")
+
+    assert ("UserService", "class", 2, 4) in definitions
+    assert ("User", "interface", 6, 7) in definitions
+    assert ("GET /users", "route", 7, 7) in definitions
+
+def test_plain_text_has_no_definitions():
+    _, definitions = CodeChunker().split_with_definitions("apenas texto", "notes.txt")
+    assert definitions == []
@@ -0,0 +1,58 @@
+from src.core.memory.context_packing import pack_context, render_context
+
+def _hit(text, source="a.py", start=None, end=None, symbol=None, score=0.9):
+    metadata = {"source": source}
+    if start is not None:
+        metadata.update(start_line=start, end_line=end)
+    if symbol:
+        metadata["symbol"] = symbol
+    return (text, metadata, score)
+
+def test_adjacent_chunks_of_same_file_are_merged_in_line_order():
+    hits = [
+        _hit("def b():\n    return 2", start=3, end=4, symbol="b"),
+        _hit("def a():\n    return 1", start=1, end=2, symbol="a"),
+        _hit("x = 1", source="other.py", start=1, end=1),
+    ]
+    snippets = pack_context(hits, max_chars=1000)
+
+    assert [s.source for s in snippets] == ["a.py", "other.py"]
+    assert snippets[0].text == "def a():\n    return 1\ndef b():\n    return 2"
+    assert snippets[0].header() == "File: a.py (lines 1-4, a, b)"
+
+def test_splitter_overlap_is_not_repeated():
+    first = "line one\nline two\nshared tail"
+    second = "shared tail\nline four"
+    snippets = pack_context([_hit(first, start=10, end=12), _hit(second, start=12, end=13)], max_chars=1000)
+
+    assert len(snippets) == 1
+    assert snippets[0].text == "line one\nline two\nshared tail\nline four"
+    assert (snippets[0].start_line, snippets[0].end_line) == (10, 13)
+
+def test_overlapping_line_ranges_drop_repeated_lines():
+    snippets = pack_context([_hit("a\nb\nc", start=1, end=3), _hit("b\nc\nd", start=2, end=4)], max_chars=1000)
+    assert snippets[0].text == "a\nb\nc\nd"
+    # Sem sobreposição textual (ex: espaços diferentes) cai na contagem de linhas
+    snippets = pack_context([_hit("x\ny", start=1, end=2), _hit("Y\nz", start=2, end=3)], max_chars=1000)
+    assert snippets[0].text == "x\ny\nz"
+
+def test_gap_between_ranges_keeps_separate_snippets():
+    snippets = pack_context([_hit("a", start=1, end=1), _hit("c", start=3, end=3)], max_chars=1000)
+    assert [(s.start_line, s.text) for s in snippets] == [(1, "a"), (3, "c")]
+
+def test_duplicates_are_removed_and_budget_is_filled_in_relevance_order():
+    hits = [
+        _hit("most relevant " * 3, source="kb.md"),
+        _hit("most relevant", source="copy.md"),
+        _hit("x" * 100, source="big.py", start=1, end=1),
+        _hit("never reached", source="c.py", start=1, end=1),
+    ]
+    snippets = pack_context(hits, max_chars=80)
+
+    assert [s.source for s in snippets] == ["kb.md", "big.py"]
+    assert snippets[1].text.endswith("...[restante truncado]...")
+    assert len(snippets[1].text.split("\n")[0]) == 80 - len(snippets[0].text)
+
+def test_accepts_hits_without_scores_and_renders_prompt_block():
+    rendered = render_context(pack_context([("body", {"source": "a.py", "start_line": 3, "end_line": 4})]))
+    assert rendered == "\nFile: a.py (lines 3-4)\nbody\n"
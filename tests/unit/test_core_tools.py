@@ -3,7 +3,7 @@ from unittest.mock import patch, mock_open, MagicMock
 import os
 from src.tools.core_tools import (
     write_file, read_file, list_files, execute_command,
-    search_codebase, update_codebase_memory, _resolve_path
+    search_codebase, find_symbol, update_codebase_memory, _resolve_path
 )
 
 @pytest.fixture
@@ -71,3 +71,19 @@ def test_update_codebase_memory_success(MockIndexer):
 
     # Check call count
     assert mock_instance.index_workspace.call_count >= 1
+
+def test_find_symbol_reports_definitions_without_vector_search(mock_workspace):
+    from src.core.memory.symbol_index import SymbolIndex
+    index = SymbolIndex({"app/services.py": {"symbols": [["UserService", "class", 10, 40]]}})
+    with patch("src.tools.core_tools.symbol_index_for_workspace", return_value=index) as mock_index, \
+         patch("src.tools.core_tools.VectorMemory") as MockMemory, \
+         patch.dict(os.environ, {"PGVECTOR_COLLECTION_NAME": "other_collection"}):
+        result = find_symbol.invoke("UserService")
+        missing = find_symbol.invoke("Nope")
+
+    # Mesma coleção (e manifestos) do CodeIndexer
+    assert mock_index.call_args[0][1] == "other_collection"
+
+    assert "UserService [class] app/services.py:10-40" in result
+    assert "Nenhuma definição encontrada" in missing
+    MockMemory.assert_not_called()
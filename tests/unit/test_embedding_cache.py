@@ -0,0 +1,114 @@
+from unittest.mock import MagicMock, patch
+from src.core.llm.embedding_cache import CachedEmbeddings, LRUEmbeddingCache, PostgresEmbeddingCacheStore, embed_queries, text_hash
+from src.core.memory.registry import get_sql_engine, reset_registry
+from src.core.llm.embedding_provider import EmbeddingProvider
+from src.core.config import settings
+
+def _fake_embeddings():
+    inner = MagicMock()
+    inner.embed_documents.side_effect = lambda texts: [[float(len(t))] for t in texts]
+    inner.embed_query.side_effect = lambda t: [float(len(t)), 0.0]
+    return inner
+
+def test_embed_documents_only_embeds_misses_once():
+    inner = _fake_embeddings()
+    cached = CachedEmbeddings(inner, provider="p", model="m", memory_cache=LRUEmbeddingCache(100))
+
+    first = cached.embed_documents(["a", "bb", "a"])
+    assert first == [[1.0], [2.0], [1.0]]
+    # Duplicatas dentro do lote são embedadas uma única vez
+    inner.embed_documents.assert_called_once_with(["a", "bb"])
+
+    second = cached.embed_documents(["bb", "ccc"])
+    assert second == [[2.0], [3.0]]
+    assert inner.embed_documents.call_args[0][0] == ["ccc"]
+
+def test_persistent_store_is_consulted_before_provider():
+    inner = _fake_embeddings()
+    store = MagicMock()
+    store.get_many.return_value = {text_hash("a"): [9.0]}
+    cached = CachedEmbeddings(inner, provider="p", model="m", memory_cache=LRUEmbeddingCache(100), store=store)
+
+    result = cached.embed_documents(["a", "b"])
+
+    assert result == [[9.0], [1.0]]
+    inner.embed_documents.assert_called_once_with(["b"])
+    store.set_many.assert_called_once_with("p", "m", {text_hash("b"): [1.0]})
+
+def test_embed_query_is_cached_separately_from_documents():
+    inner = _fake_embeddings()
+    cached = CachedEmbeddings(inner, provider="p", model="m", memory_cache=LRUEmbeddingCache(100))
+
+    cached.embed_documents(["q"])
+    assert cached.embed_query("q") == [1.0, 0.0]
+    assert cached.embed_query("q") == [1.0, 0.0]
+    inner.embed_query.assert_called_once_with("q")
+
+def test_embed_queries_batches_misses_and_shares_query_namespace():
+    inner = _fake_embeddings()
+    inner.embed_queries.side_effect = lambda texts: [[float(len(t)), 0.0] for t in texts]
+    cached = CachedEmbeddings(inner, provider="p", model="m", memory_cache=LRUEmbeddingCache(100))
+
+    assert cached.embed_query("q") == [1.0, 0.0]
+    assert cached.embed_queries(["q", "rr", "sss", "rr"]) == [[1.0, 0.0], [2.0, 0.0], [3.0, 0.0], [2.0, 0.0]]
+    inner.embed_queries.assert_called_once_with(["rr", "sss"])
+    inner.embed_documents.assert_not_called()
+
+def test_embed_queries_falls_back_to_one_call_per_query():
+    class QueryOnly:
+        def embed_query(self, text):
+            return [float(len(text))]
+
+    assert embed_queries(QueryOnly(), ["a", "bb"]) == [[1.0], [2.0]]
+    assert embed_queries(QueryOnly(), []) == []
+
+def test_lru_evicts_oldest_entry():
+    cache = LRUEmbeddingCache(max_items=2)
+    cache.set(("p", "m", "1"), [1.0])
+    cache.set(("p", "m", "2"), [2.0])
+    cache.get(("p", "m", "1"))
+    cache.set(("p", "m", "3"), [3.0])
+
+    assert cache.get(("p", "m", "2")) is None
+    assert cache.get(("p", "m", "1")) == [1.0]
+
+def test_embedding_provider_wraps_with_cache():
+    with patch.object(settings, "EMBEDDING_PROVIDER", "ollama"), \
+         patch.object(settings, "EMBEDDING_CACHE_ENABLED", True), \
+         patch.object(settings, "EMBEDDING_CACHE_BACKEND", "memory"), \
+         patch("src.core.llm.embedding_provider.OllamaEmbeddings"):
+        embeddings = EmbeddingProvider().get_embeddings()
+
+    assert isinstance(embeddings, CachedEmbeddings)
+    assert embeddings.store is None
+    assert embeddings.model == settings.OLLAMA_EMBEDDING_MODEL
+
+def test_lru_stores_float32_and_is_bounded_by_bytes():
+    # 100 dimensões em float32 = 400 bytes por vetor
+    cache = LRUEmbeddingCache(max_items=100, max_bytes=1000)
+    for i in range(3):
+        cache.set(("p", "m", str(i)), [float(i)] * 100)
+
+    assert cache.nbytes == 800
+    assert cache.get(("p", "m", "0")) is None
+    assert cache.get(("p", "m", "2")) == [2.0] * 100
+
+def test_postgres_store_uses_the_process_engine():
+    reset_registry()
+    with patch("src.core.memory.registry.create_engine") as mock_create_engine:
+        conn = mock_create_engine.return_value.connect.return_value.__enter__.return_value
+        conn.execute.return_value.fetchall.return_value = [(text_hash("a"), [1.0])]
+        store = PostgresEmbeddingCacheStore("postgresql://u:p@db/dev", "embedding_cache")
+
+        assert store.get_many("p", "m", [text_hash("a")]) == {text_hash("a"): [1.0]}
+        assert store.get_many("p", "m", [text_hash("a")]) == {text_hash("a"): [1.0]}
+
+        # Mesmo engine (e pool) do registro, com a string normalizada para psycopg3
+        mock_create_engine.assert_called_once_with("postgresql+psycopg://u:p@db/dev", pool_pre_ping=True)
+        assert get_sql_engine("postgresql://u:p@db/dev") is mock_create_engine.return_value
+        # CREATE TABLE só na primeira vez
+        assert sum("CREATE TABLE" in str(c.args[0]) for c in conn.execute.call_args_list) == 1
+
+        reset_registry()
+        mock_create_engine.return_value.dispose.assert_called_once()
+    reset_registry()
@@ -0,0 +1,61 @@
+import os
+from unittest.mock import patch
+from src.core.memory.file_filter import IgnoreMatcher, is_generated_name, sniff_content
+from src.core.config import settings
+
+def _matcher(tmp_path, gitignore, aiignore=None):
+    (tmp_path / ".gitignore").write_text(gitignore, encoding="utf-8")
+    if aiignore is not None:
+        (tmp_path / ".aiignore").write_text(aiignore, encoding="utf-8")
+    return IgnoreMatcher(str(tmp_path), exclude_dirs={"node_modules"})
+
+def test_gitignore_semantics(tmp_path):
+    matcher = _matcher(tmp_path, "# comentário\n*.log\n/build\ndocs/**/*.md\n!docs/keep/README.md\ntmp/\n")
+
+    assert matcher.is_ignored("app.log")
+    assert matcher.is_ignored("src/deep/app.log")
+    assert matcher.is_ignored("build", is_dir=True)
+    assert matcher.is_ignored("build/out.js")
+    assert not matcher.is_ignored("src/build/out.js")  # '/build' é ancorado na raiz
+    assert matcher.is_ignored("docs/a/b.md")
+    assert not matcher.is_ignored("docs/keep/README.md")
+    assert matcher.is_ignored("tmp/x.py")
+    assert not matcher.is_ignored("tmp")  # 'tmp/' só casa diretórios
+    assert matcher.is_ignored("web/node_modules/lib.js")
+    assert not matcher.is_ignored("src/main.py")
+
+def test_aiignore_and_refresh(tmp_path):
+    matcher = _matcher(tmp_path, "", aiignore="fixtures/\n")
+    assert matcher.is_ignored("fixtures/data.json")
+
+    (tmp_path / ".aiignore").write_text("secrets.py\n", encoding="utf-8")
+    os.utime(tmp_path / ".aiignore", (1, 1))
+    matcher.refresh()
+    assert not matcher.is_ignored("fixtures/data.json")
+    assert matcher.is_ignored("secrets.py")
+
+def test_gitignore_can_be_disabled(tmp_path):
+    with patch.object(settings, "INDEX_RESPECT_GITIGNORE", False):
+        matcher = _matcher(tmp_path, "*.py\n")
+    assert not matcher.is_ignored("main.py")
+    assert matcher.is_ignored("node_modules/x.js")
+
+def test_generated_names():
+    assert is_generated_name("app.min.js")
+    assert is_generated_name("package-lock.json")
+    assert not is_generated_name("package.json")
+
+def test_sniff_content(tmp_path):
+    binary = tmp_path / "data.txt"
+    binary.write_bytes(b"abc\x00def")
+    minified = tmp_path / "bundle.js"
+    minified.write_text("var a=1;" * 500, encoding="utf-8")
+    generated = tmp_path / "api_pb.go"
+    generated.write_text("// Code generated by protoc-gen-go. DO NOT EDIT.\npackage api\n", encoding="utf-8")
+    normal = tmp_path / "main.py"
+    normal.write_text("def main():\n    return 1\n", encoding="utf-8")
+
+    assert sniff_content(str(binary)) == "binary"
+    assert sniff_content(str(minified)) == "minified"
+    assert sniff_content(str(generated)) == "generated"
+    assert sniff_content(str(normal)) is None
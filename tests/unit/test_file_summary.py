@@ -0,0 +1,46 @@
+from langchain_core.documents import Document
+from src.core.memory.chunking import CodeChunker
+from src.core.memory.file_summary import build_file_summary, file_summary_collection, file_summary_id
+
+
+def _summary(rel_path, text):
+    chunks = CodeChunker(min_chars=0).split(text, rel_path, {"source": f"/ws/{rel_path}", "project": "p1"})
+    return build_file_summary(rel_path, text, chunks)
+
+
+def test_python_summary_has_path_public_symbols_and_docstring():
+    text = (
+        '"""Autenticação de usuários via JWT.\n\nDetalhes de uso que não entram no resumo."""\n'
+        "import jwt\n\n"
+        "def login(user):\n    return jwt.encode(user)\n\n"
+        "def _helper():\n    pass\n\n"
+        "class TokenStore:\n    def get(self):\n        pass\n"
+    )
+    summary = _summary("app/auth.py", text)
+
+    assert summary.page_content.split("\n") == [
+        "Arquivo: app/auth.py",
+        "Símbolos: login, TokenStore",
+        "Autenticação de usuários via JWT.",
+    ]
+    assert summary.metadata["source"] == "/ws/app/auth.py"
+    assert summary.metadata["project"] == "p1"
+    assert summary.metadata["path"] == "app/auth.py"
+    assert "start_line" not in summary.metadata and "symbol" not in summary.metadata
+
+
+def test_leading_comment_and_markdown_headings_become_the_digest():
+    js = _summary("src/api.js", "#!/usr/bin/env node\n// Cliente HTTP da API\n// com retry\nexport function get() {}\n")
+    assert js.page_content.endswith("Cliente HTTP da API\ncom retry")
+    assert "Símbolos: get" in js.page_content
+
+    md = _summary("README.md", "# Projeto\ntexto\n## Instalação\nmais texto\n")
+    assert md.page_content.endswith("Projeto\nInstalação")
+
+
+def test_empty_file_has_no_summary_and_ids_are_stable():
+    assert build_file_summary("empty.py", "", []) is None
+    assert build_file_summary("blank.py", "\n\n", [Document(page_content="\n", metadata={})]) is None
+    assert file_summary_id("p1", "a.py") == file_summary_id("p1", "a.py")
+    assert file_summary_id("p1", "a.py") != file_summary_id("p2", "a.py")
+    assert file_summary_collection("code_collection") == "code_collection_files"
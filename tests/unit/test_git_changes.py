@@ -0,0 +1,67 @@
+import shutil
+import subprocess
+import pytest
+from src.core.memory.git_changes import GitChangeDetector
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git não disponível")
+
+def _git(cwd, *args):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+@pytest.fixture
+def repo(tmp_path):
+    _git(tmp_path, "init", "-q")
+    _git(tmp_path, "config", "user.email", "t@t")
+    _git(tmp_path, "config", "user.name", "t")
+    (tmp_path / "a.py").write_text("a = 1", encoding="utf-8")
+    (tmp_path / "b.py").write_text("b = 1", encoding="utf-8")
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "-q", "-m", "init")
+    return tmp_path
+
+def test_non_git_workspace_returns_none(tmp_path):
+    assert GitChangeDetector(str(tmp_path)).snapshot() is None
+
+def test_snapshot_tracks_dirty_and_untracked_files(repo):
+    detector = GitChangeDetector(str(repo))
+    clean = detector.snapshot()
+    assert clean.dirty_paths == []
+
+    (repo / "a.py").write_text("a = 2", encoding="utf-8")
+    (repo / "new.py").write_text("n = 1", encoding="utf-8")
+    dirty = detector.snapshot()
+    assert dirty.commit == clean.commit
+    assert dirty.dirty_paths == ["a.py", "new.py"]
+
+    # Nova edição num arquivo já sujo muda o hash mesmo sem mudar o status do git
+    (repo / "a.py").write_text("a = 3  # maior", encoding="utf-8")
+    assert detector.snapshot().dirty_hash != dirty.dirty_hash
+
+def test_changed_since_covers_commits_deletes_and_reverted_files(repo):
+    detector = GitChangeDetector(str(repo))
+    (repo / "a.py").write_text("a = 2", encoding="utf-8")
+    previous = detector.snapshot().to_dict()
+
+    # a.py é revertido; b.py é apagado e commitado; c.py é criado
+    _git(repo, "checkout", "--", "a.py")
+    _git(repo, "rm", "-q", "b.py")
+    _git(repo, "commit", "-q", "-m", "rm b")
+    (repo / "c.py").write_text("c = 1", encoding="utf-8")
+
+    current = detector.snapshot()
+    assert detector.changed_since(previous, current) == ["a.py", "b.py", "c.py"]
+    assert detector.changed_since({"commit": "0" * 40}, current) is None
+
+def test_subdirectory_workspace_uses_relative_paths(repo):
+    (repo / "proj").mkdir()
+    (repo / "proj" / "x.py").write_text("x = 1", encoding="utf-8")
+    (repo / "outside.py").write_text("o = 1", encoding="utf-8")
+
+    snapshot = GitChangeDetector(str(repo / "proj")).snapshot()
+    assert snapshot.dirty_paths == ["x.py"]
+
+def test_path_filter(repo):
+    (repo / "node_modules").mkdir()
+    (repo / "node_modules" / "lib.js").write_text("x", encoding="utf-8")
+    detector = GitChangeDetector(str(repo), path_filter=lambda p: not p.startswith("node_modules/"))
+    assert detector.snapshot().dirty_paths == []
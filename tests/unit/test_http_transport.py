@@ -0,0 +1,198 @@
+import json
+import asyncio
+import threading
+import urllib.error
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from langchain_core.messages import HumanMessage
+from src.core.llm.clients import http_transport
+from src.core.llm.clients.http_transport import AsyncPooledHTTPTransport, PooledHTTPTransport
+from src.core.llm.clients.local_openai import LocalOpenAIClient
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.connections.add(self.client_address)
+        if body.get("stream"):
+            return self._stream_completion()
+        status = 400 if body.get("fail") else 200
+        data = json.dumps({"echo": body, "path": self.path}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        # Simula o servidor/proxy fechando a conexão ociosa sem avisar o cliente (sem "Connection: close")
+        self.close_connection = bool(body.get("drop"))
+
+    def _stream_completion(self):
+        # Completion em server-sent events com transfer-encoding chunked, como o LM Studio
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        events = [{"choices": [{"delta": {"content": token}}]} for token in ["{", '"ok": true', "}"]]
+        lines = [f"data: {json.dumps(event)}\n\n" for event in events] + ["data: [DONE]\n\n"]
+        for line in lines:
+            data = line.encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.connections = set()
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _url(server, path="/v1/embeddings"):
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+def test_requests_reuse_one_keep_alive_connection(server):
+    transport = PooledHTTPTransport(pool_size=2, timeout=5, connect_timeout=5, idle_timeout=30)
+    url = _url(server)
+
+    for i in range(5):
+        result = transport.post_json(url, {"input": i})
+        assert result == {"echo": {"input": i}, "path": "/v1/embeddings"}
+
+    # Mesma porta de origem em todas as requisições: uma única conexão TCP
+    assert len(server.connections) == 1
+    assert transport.idle_connections(url) == 1
+    transport.close()
+    assert transport.idle_connections(url) == 0
+
+
+def test_http_error_status_raises_http_error(server):
+    transport = PooledHTTPTransport(pool_size=2, timeout=5, connect_timeout=5, idle_timeout=30)
+
+    with pytest.raises(urllib.error.HTTPError) as excinfo:
+        transport.post_json(_url(server), {"fail": True})
+
+    assert excinfo.value.code == 400
+    transport.close()
+
+
+def test_stale_pooled_connection_is_replaced(server):
+    transport = PooledHTTPTransport(pool_size=2, timeout=5, connect_timeout=5, idle_timeout=30)
+    url = _url(server)
+    transport.post_json(url, {"drop": True})
+    assert transport.idle_connections(url) == 1
+
+    # A conexão do pool já foi fechada pelo servidor: a próxima requisição reconecta sem erro
+    assert transport.post_json(url, {"input": 2})["echo"] == {"input": 2}
+    assert len(server.connections) == 2
+    transport.close()
+
+
+def test_idle_connections_past_timeout_are_dropped(server):
+    transport = PooledHTTPTransport(pool_size=2, timeout=5, connect_timeout=5, idle_timeout=0)
+    url = _url(server)
+
+    transport.post_json(url, {"input": 1})
+    transport.post_json(url, {"input": 2})
+
+    assert len(server.connections) == 2
+    transport.close()
+
+
+def test_unreachable_host_raises_url_error():
+    transport = PooledHTTPTransport(pool_size=1, timeout=1, connect_timeout=1, idle_timeout=30)
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    port = httpd.server_address[1]
+    httpd.server_close()
+
+    with pytest.raises(urllib.error.URLError):
+        transport.post_json(f"http://127.0.0.1:{port}/v1/chat/completions", {})
+
+
+def test_streamed_completion_returns_connection_to_pool(server, monkeypatch):
+    transport = PooledHTTPTransport(pool_size=2, timeout=5, connect_timeout=5, idle_timeout=30)
+    monkeypatch.setattr(http_transport, "_transport", transport)
+    client = LocalOpenAIClient(model_name="m", base_url=_url(server, ""))
+    url = f"{client.base_url}/chat/completions"
+
+    assert "".join(client.stream([HumanMessage(content="Hi")])) == '{"ok": true}'
+    assert transport.idle_connections(url) == 1
+
+    # Parar de ler no meio descarta a conexão em vez de devolvê-la ao pool com dados pendentes
+    tokens = client.stream([HumanMessage(content="Hi")])
+    assert next(tokens) == "{"
+    tokens.close()
+    assert transport.idle_connections(url) == 0
+    transport.close()
+
+
+def test_async_transport_reuses_connection_and_raises_http_error(server):
+    url = _url(server)
+
+    async def scenario():
+        transport = AsyncPooledHTTPTransport(pool_size=2, timeout=5, connect_timeout=5, idle_timeout=30)
+        results = [await transport.post_json(url, {"input": i}) for i in range(3)]
+        idle = transport.idle_connections(url)
+        with pytest.raises(urllib.error.HTTPError) as excinfo:
+            await transport.post_json(url, {"fail": True})
+        transport.close()
+        return results, idle, excinfo.value.code
+
+    results, idle, code = asyncio.run(scenario())
+
+    assert [result["echo"] for result in results] == [{"input": 0}, {"input": 1}, {"input": 2}]
+    assert idle == 1
+    assert code == 400
+    assert len(server.connections) == 1
+
+
+def test_async_transport_concurrent_requests_and_stale_connection(server):
+    url = _url(server)
+
+    async def scenario():
+        transport = AsyncPooledHTTPTransport(pool_size=4, timeout=5, connect_timeout=5, idle_timeout=30)
+        results = await asyncio.gather(*[transport.post_json(url, {"input": i}) for i in range(4)])
+        await transport.post_json(url, {"drop": True})
+        # A conexão devolvida ao pool foi fechada pelo servidor: a requisição seguinte reconecta
+        retried = await transport.post_json(url, {"input": "again"})
+        transport.close()
+        return results, retried
+
+    results, retried = asyncio.run(scenario())
+
+    assert [result["echo"]["input"] for result in results] == [0, 1, 2, 3]
+    assert retried["echo"] == {"input": "again"}
+
+
+def test_async_streamed_completion(server, monkeypatch):
+    async def scenario():
+        transport = AsyncPooledHTTPTransport(pool_size=2, timeout=5, connect_timeout=5, idle_timeout=30)
+        monkeypatch.setattr("src.core.llm.clients.local_openai.get_async_http_transport", lambda: transport)
+        client = LocalOpenAIClient(model_name="m", base_url=_url(server, ""))
+        url = f"{client.base_url}/chat/completions"
+
+        text = "".join([token async for token in client.astream([HumanMessage(content="Hi")])])
+        pooled = transport.idle_connections(url)
+
+        tokens = client.astream([HumanMessage(content="Hi")])
+        first = await tokens.__anext__()
+        await tokens.aclose()
+        after_close = transport.idle_connections(url)
+        transport.close()
+        return text, pooled, first, after_close
+
+    text, pooled, first, after_close = asyncio.run(scenario())
+
+    assert text == '{"ok": true}'
+    assert pooled == 1
+    assert first == "{"
+    assert after_close == 0
@@ -0,0 +1,70 @@
+import threading
+from unittest.mock import MagicMock, patch
+from src.core.memory.index_queue import IndexQueue, schedule_indexing
+from src.core.config import settings
+
+def _indexer(project="proj", started=None, release=None):
+    indexer = MagicMock()
+    indexer.project = project
+    indexer.index_version = 0
+
+    def run():
+        if started:
+            started.set()
+        if release:
+            release.wait(2)
+        indexer.index_version += 1
+
+    indexer.index_workspace.side_effect = run
+    return indexer
+
+def test_burst_of_requests_is_coalesced_into_one_pass():
+    queue = IndexQueue(debounce_seconds=0.05)
+    indexer = _indexer()
+
+    tickets = [queue.request(indexer) for _ in range(5)]
+
+    assert queue.wait("proj", tickets[-1], timeout=2)
+    assert indexer.index_workspace.call_count == 1
+    assert queue.is_fresh("proj")
+
+def test_wait_times_out_while_indexing_is_running():
+    queue = IndexQueue(debounce_seconds=0)
+    started, release = threading.Event(), threading.Event()
+    indexer = _indexer(started=started, release=release)
+
+    ticket = queue.request(indexer)
+    assert started.wait(2)
+    # Leitor que aceita dados antigos não fica preso à indexação
+    assert queue.wait("proj", ticket, timeout=0.05) is False
+    assert not queue.is_fresh("proj")
+
+    release.set()
+    assert queue.wait("proj", ticket, timeout=2)
+
+def test_failed_pass_still_releases_waiters():
+    queue = IndexQueue(debounce_seconds=0)
+    indexer = _indexer()
+    indexer.index_workspace.side_effect = RuntimeError("db down")
+
+    ticket = queue.request(indexer)
+    assert queue.wait("proj", ticket, timeout=2)
+
+def test_schedule_indexing_sync_mode_runs_inline():
+    indexer = _indexer()
+    with patch.object(settings, "INDEX_QUEUE_MODE", "sync"):
+        version = schedule_indexing(indexer)
+    indexer.index_workspace.assert_called_once()
+    assert version == 1
+
+def test_coalesced_requests_merge_paths_and_full_scan_wins():
+    queue = IndexQueue(debounce_seconds=10)
+    indexer = _indexer()
+
+    queue.request(indexer, paths=["a.py"])
+    queue.request(indexer, paths=["b.py"])
+    assert queue._pending["proj"]["paths"] == {"a.py", "b.py"}
+
+    queue.request(indexer)
+    queue.request(indexer, paths=["c.py"])
+    assert queue._pending["proj"]["paths"] is None
@@ -0,0 +1,32 @@
+from src.core.utils.json_parser import JsonObjectScanner, extract_json_from_text
+
+
+def test_extract_json_from_markdown_block():
+    assert extract_json_from_text('Here:\n```json\n{"a": 1}\n```') == {"a": 1}
+
+
+def test_scanner_completes_on_balanced_object_across_chunks():
+    scanner = JsonObjectScanner()
+    chunks = ['Sure! ```json\n{"a": {"b": "}{\\"', '"}, "c": [1, 2', ']}', '\n``` Hope it helps']
+
+    results = [scanner.feed(chunk) for chunk in chunks]
+
+    assert results == [False, False, True, True]
+    assert scanner.value == {"a": {"b": '}{"'}, "c": [1, 2]}
+    assert scanner.json_text == '{"a": {"b": "}{\\""}, "c": [1, 2]}'
+
+
+def test_scanner_skips_braces_in_prose_and_fixes_trailing_commas():
+    scanner = JsonObjectScanner()
+
+    assert not scanner.feed("Fill {name} in: ")
+    assert scanner.feed('{"name": "x", "tags": ["a",],}')
+    assert scanner.value == {"name": "x", "tags": ["a"]}
+
+
+def test_scanner_incomplete_object():
+    scanner = JsonObjectScanner()
+
+    assert not scanner.feed('{"name": "x"')
+    assert not scanner.complete
+    assert scanner.json_text is None
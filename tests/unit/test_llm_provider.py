@@ -1,5 +1,7 @@
+import asyncio
+import time
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 import os
 import json
 from pydantic import BaseModel
@@ -7,6 +9,8 @@ from langchain_core.messages import HumanMessage
 
 # Importa a classe a ser testada
 from src.core.llm.provider import LLMProvider
+from src.core.llm.api_key_manager import ApiKeyManager
+from src.core.llm.structured_strategy import StructuredStrategyMemory
 # LocalOpenAIClient is now in its own module
 from src.core.llm.clients.local_openai import LocalOpenAIClient
 
@@ -17,6 +21,13 @@ class MockSchema(BaseModel):
 
 class TestLLMProvider(unittest.TestCase):
 
+    def setUp(self):
+        # Strategy memory in RAM only: tests must not read or write the real state file
+        memory_patcher = patch('src.core.llm.provider.get_strategy_memory',
+                               return_value=StructuredStrategyMemory(None, reprobe_seconds=3600))
+        self.strategy_memory = memory_patcher.start()
+        self.addCleanup(memory_patcher.stop)
+
     @patch('src.core.llm.provider.ChatGoogleGenerativeAI')
     @patch('src.core.llm.provider.key_manager')
     def test_key_rotation_integration(self, mock_key_manager, mock_chat_google):
@@ -57,17 +68,14 @@ class TestLLMProvider(unittest.TestCase):
                 self.assertEqual(calls[2].kwargs.get('google_api_key'), 'key_C') # get_llm 2
                 self.assertEqual(calls[3].kwargs.get('google_api_key'), 'key_D') # get_llm 3
 
-    @patch('src.core.llm.clients.local_openai.urllib.request.urlopen')
-    @patch('src.core.llm.clients.local_openai.json.load')
-    def test_local_openai_client(self, mock_json_load, mock_urlopen):
+    @patch('src.core.llm.clients.local_openai.get_http_transport')
+    def test_local_openai_client(self, mock_get_transport):
         """
         Tests the LocalOpenAIClient invoke method.
         """
-        # Mock HTTP response context manager
-        mock_response = MagicMock()
-        mock_urlopen.return_value.__enter__.return_value = mock_response
-
-        mock_json_load.return_value = {
+        # Mock the pooled HTTP transport
+        mock_transport = mock_get_transport.return_value
+        mock_transport.post_json.return_value = {
             "choices": [{"message": {"content": "Hello Local"}}]
         }
 
@@ -77,24 +85,20 @@ class TestLLMProvider(unittest.TestCase):
         self.assertEqual(resp.content, "Hello Local")
 
         # Verify URL
-        args, kwargs = mock_urlopen.call_args
-        req = args[0]
-        self.assertEqual(req.full_url, "http://localhost:1234/v1/chat/completions")
+        args, kwargs = mock_transport.post_json.call_args
+        self.assertEqual(args[0], "http://localhost:1234/v1/chat/completions")
+        self.assertEqual(args[1]["model"], "test-local")
 
-    @patch('src.core.llm.clients.local_openai.urllib.request.urlopen')
-    @patch('src.core.llm.clients.local_openai.json.load')
-    def test_generate_response_local_fallback(self, mock_json_load, mock_urlopen):
+    @patch('src.core.llm.clients.local_openai.get_http_transport')
+    def test_generate_response_local_fallback(self, mock_get_transport):
         """
         Tests that generate_response works with Local provider (Plan B).
         """
         expected_json = '{"name": "Alice", "age": 30}'
 
         # Mock successful response
-        mock_response = MagicMock()
-        mock_urlopen.return_value.__enter__.return_value = mock_response
-
         # We need to handle possible multiple calls if it falls back, but let's assume Plan B works
-        mock_json_load.return_value = {
+        mock_get_transport.return_value.post_json.return_value = {
             "choices": [{"message": {"content": expected_json}}]
         }
 
@@ -142,3 +146,113 @@ class TestLLMProvider(unittest.TestCase):
 
             # Verify with_structured_output was called
             mock_llm_instance.with_structured_output.assert_called_with(MockSchema)
+
+    @staticmethod
+    def _sse(tokens, consumed):
+        """Server-sent event lines of a chat completion stream; records how many lines were read."""
+        for token in tokens:
+            consumed.append(token)
+            yield f'data: {json.dumps({"choices": [{"delta": {"content": token}}]})}\n'.encode("utf-8")
+        yield b"data: [DONE]\n"
+
+    @patch('src.core.llm.clients.local_openai.get_http_transport')
+    def test_generate_stream_yields_tokens(self, mock_get_transport):
+        """
+        Tests that generate_stream yields the streamed deltas of the local client.
+        """
+        consumed = []
+        response = mock_get_transport.return_value.post.return_value.__enter__.return_value
+        response.__iter__.return_value = self._sse(["Hel", "lo", " Local"], consumed)
+
+        provider = LLMProvider(model_name="test-local", base_url="http://localhost:1234", provider="local")
+
+        self.assertEqual(list(provider.generate_stream("Hi")), ["Hel", "lo", " Local"])
+        args, kwargs = mock_get_transport.return_value.post.call_args
+        self.assertEqual(args[0], "http://localhost:1234/v1/chat/completions")
+        self.assertTrue(args[1]["stream"])
+
+    @patch('src.core.llm.clients.local_openai.get_http_transport')
+    def test_structured_stream_stops_after_json_object(self, mock_get_transport):
+        """
+        Tests that a streamed structured call stops reading once the JSON object is balanced.
+        """
+        consumed = []
+        tokens = ['{"name": "Ali', 'ce", "age"', ': 30}', ' This JSON', ' describes', ' a user.']
+        response = mock_get_transport.return_value.post.return_value.__enter__.return_value
+        response.__iter__.return_value = self._sse(tokens, consumed)
+
+        provider = LLMProvider(model_name="test-local", base_url="http://localhost:1234", provider="local")
+        result_obj = provider.generate_response("User prompt", schema=MockSchema, stream=True)
+
+        self.assertEqual(result_obj, MockSchema(name="Alice", age=30))
+        # The explanation after the JSON was never read
+        self.assertEqual(consumed, tokens[:3])
+        # Leaving the transport context early closes the connection (the server stops generating)
+        mock_get_transport.return_value.post.return_value.__exit__.assert_called_once()
+
+    @patch('src.core.llm.clients.local_openai.get_async_http_transport')
+    def test_agenerate_response_runs_concurrently(self, mock_get_transport):
+        """
+        Tests that agenerate_response calls overlap on one event loop (no thread per request).
+        """
+        active = []
+        peak = []
+
+        async def fake_post_json(url, payload, headers):
+            active.append(url)
+            peak.append(len(active))
+            await asyncio.sleep(0.01)
+            active.remove(url)
+            return {"choices": [{"message": {"content": '{"name": "Alice", "age": 30}'}}]}
+
+        mock_get_transport.return_value.post_json = AsyncMock(side_effect=fake_post_json)
+        provider = LLMProvider(model_name="test-local", base_url="http://localhost:1234", provider="local")
+
+        async def run():
+            return await asyncio.gather(*[
+                provider.agenerate_response("User prompt", schema=MockSchema) for _ in range(3)
+            ])
+
+        results = asyncio.run(run())
+
+        self.assertEqual(results, [MockSchema(name="Alice", age=30)] * 3)
+        self.assertEqual(max(peak), 3)
+        payload = mock_get_transport.return_value.post_json.call_args[0][1]
+        self.assertEqual(payload["response_format"]["type"], "json_schema")
+
+    @patch('src.core.llm.provider.ChatGoogleGenerativeAI')
+    @patch('src.core.llm.provider.key_manager')
+    def test_agenerate_response_google_uses_async_key_rotation(self, mock_key_manager, mock_chat_google):
+        """
+        Tests that the async path takes the key from aget_next_key (no blocking sleep).
+        """
+        mock_key_manager.get_next_key.return_value = "init_key"
+        mock_key_manager.aget_next_key = AsyncMock(return_value="async_key")
+        mock_chat_google.return_value.ainvoke = AsyncMock(return_value=MagicMock(content="Hello"))
+
+        provider = LLMProvider(model_name="test-google", provider="google")
+        result = asyncio.run(provider.agenerate_response("Hi"))
+
+        self.assertEqual(result, "Hello")
+        self.assertEqual(mock_chat_google.call_args.kwargs.get('google_api_key'), "async_key")
+        mock_key_manager.get_next_key.assert_called_once()  # only __init__
+
+    def test_key_manager_rate_limit_waits_outside_lock(self):
+        """
+        Tests that the rate limiter reserves spaced slots and the async variant awaits them.
+        """
+        manager = object.__new__(ApiKeyManager)
+        manager.keys = ["key_A", "key_B"]
+        manager.delay_between_requests = 0.05
+        manager.last_request_time = 0
+        manager.current_index = 0
+
+        async def run():
+            return await asyncio.gather(*[manager.aget_next_key() for _ in range(3)])
+
+        start = time.time()
+        keys = asyncio.run(run())
+
+        self.assertEqual(keys, ["key_A", "key_B", "key_A"])
+        # Slots stay spaced by delay_between_requests even when requested concurrently
+        self.assertGreaterEqual(time.time() - start, 0.09)
@@ -0,0 +1,212 @@
+import zlib
+import numpy as np
+import pytest
+from unittest.mock import patch
+from langchain_core.documents import Document
+from src.core.config import settings
+from src.core.memory import numpy_store
+from src.core.memory.numpy_store import NumpyVectorStore
+from src.core.memory.registry import reset_registry
+
+DIMENSION = 32
+
+class BagOfWordsEmbeddings:
+    """Embeddings determinísticos: cada palavra soma 1 numa posição fixa do vetor."""
+
+    def _embed(self, text):
+        vector = [0.0] * DIMENSION
+        for word in text.lower().split():
+            vector[zlib.crc32(word.encode()) % DIMENSION] += 1.0
+        return vector
+
+    def embed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+def _store(tmp_path, identity="fake/model", dtype="float32"):
+    return NumpyVectorStore("col", BagOfWordsEmbeddings(), DIMENSION, identity, state_dir=str(tmp_path), dtype=dtype)
+
+def _doc(content, project="p1", source_type="code", **metadata):
+    return Document(page_content=content, metadata={"project": project, "source_type": source_type, **metadata})
+
+def _ids(rows):
+    return [row[0] for row in rows]
+
+def test_vector_search_ranks_by_cosine_and_filters_partitions(tmp_path):
+    store = _store(tmp_path)
+    store.add_documents(
+        [_doc("parse config file"), _doc("render html page"), _doc("parse config", project="p2")],
+        ids=["a", "b", "c"],
+    )
+    query = store.embeddings.embed_query("parse config")
+
+    rows = store.vector_rows(query, k=2, project="p1")
+    assert _ids(rows) == ["a", "b"]
+    assert rows[0][1] == "parse config file"
+    assert rows[0][3:5] == ("p1", "code")
+    assert "project" not in rows[0][2]
+    assert 0.0 <= rows[0][5] < rows[1][5]
+
+    assert _ids(store.vector_rows(query, k=1)) == ["c"]
+
+def test_project_search_includes_shared_knowledge_base(tmp_path):
+    store = _store(tmp_path)
+    store.add_documents(
+        [
+            _doc("parse config file"),
+            _doc("parse config guide", project=None, source_type="knowledge_base"),
+            _doc("parse config notes", project=None),
+            _doc("parse config", project="p2"),
+        ],
+        ids=["a", "kb", "shared-code", "c"],
+    )
+    query = store.embeddings.embed_query("parse config")
+
+    # A base de conhecimento (sem projeto) aparece nas buscas de qualquer projeto; outros projetos não
+    assert set(_ids(store.vector_rows(query, k=5, project="p1"))) == {"a", "kb"}
+    assert _ids(store.vector_rows(query, k=5, project="p1", source_type="knowledge_base")) == ["kb"]
+    assert _ids(store.vector_rows(query, k=5, project="p1", source_type="code")) == ["a"]
+    assert set(_ids(store.lexical_rows("config", k=5, project="p1"))) == {"a", "kb"}
+
+def test_top_k_matches_brute_force(tmp_path):
+    store = _store(tmp_path)
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(300, DIMENSION)).astype(np.float32)
+    with patch.object(store.embeddings, "embed_documents", return_value=vectors.tolist()):
+        store.add_documents([_doc(f"d{i}") for i in range(300)], ids=[str(i) for i in range(300)])
+
+    query = rng.normal(size=DIMENSION)
+    expected = np.argsort(-(vectors / np.linalg.norm(vectors, axis=1, keepdims=True)) @ query)[:10]
+    assert _ids(store.vector_rows(query, k=10, project="p1")) == [str(i) for i in expected]
+
+def test_upsert_delete_and_reload_from_disk(tmp_path):
+    store = _store(tmp_path)
+    store.add_documents([_doc("alpha one"), _doc("beta two")], ids=["a", "b"])
+    store.add_documents([_doc("alpha updated")], ids=["a"])
+    store.delete(ids=["b"])
+
+    reloaded = _store(tmp_path)
+    rows = reloaded.vector_rows(reloaded.embeddings.embed_query("alpha"), k=5, project="p1")
+    assert [(r[0], r[1]) for r in rows] == [("a", "alpha updated")]
+
+def test_truncated_log_line_is_ignored(tmp_path):
+    store = _store(tmp_path)
+    store.add_documents([_doc("alpha")], ids=["a"])
+    with open(tmp_path / "col__p1.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"op": "add", "start": 1, "ite')
+
+    assert _ids(_store(tmp_path).vector_rows([1.0] * DIMENSION, k=5)) == ["a"]
+
+def test_compaction_rewrites_files_and_keeps_live_rows(tmp_path):
+    store = _store(tmp_path)
+    store.add_documents([_doc(f"doc {i}") for i in range(4)], ids=["0", "1", "2", "3"])
+    with patch.object(numpy_store, "COMPACT_MIN_DEAD_ROWS", 1):
+        store.delete(ids=["0", "1", "2"])
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["col__p1.1.vec", "col__p1.jsonl"]
+    assert _ids(_store(tmp_path).vector_rows([1.0] * DIMENSION, k=5)) == ["3"]
+
+def test_model_change_drops_partition_and_invalidates_manifest(tmp_path):
+    _store(tmp_path).add_documents([_doc("alpha")], ids=["a"])
+
+    with patch("src.core.memory.numpy_store.IndexManifest.invalidate_project") as mock_invalidate:
+        other = _store(tmp_path, identity="other/model")
+        assert other.vector_rows([1.0] * DIMENSION, k=5, project="p1") == []
+    mock_invalidate.assert_called_once_with("col", "p1")
+
+def test_lexical_rows_and_delete_project(tmp_path):
+    store = _store(tmp_path, dtype="float16")
+    store.add_documents(
+        [_doc("def parse_config(path): pass"), _doc("config docs", source_type="knowledge_base"), _doc("other")],
+        ids=["a", "b", "c"],
+    )
+    assert _ids(store.lexical_rows("KeyError in parse_config", k=5, project="p1")) == ["a"]
+    assert _ids(store.lexical_rows("config", k=5, source_type="knowledge_base")) == ["b"]
+
+    assert store.delete_project("p1", source_type="knowledge_base") == 1
+    assert store.delete_project("p1") == 2
+    assert store.lexical_rows("config", k=5) == []
+
+def test_vector_memory_uses_numpy_backend_without_postgres(tmp_path):
+    from src.core.memory.vector_store import VectorMemory
+    reset_registry()
+    with patch.object(settings, "VECTOR_STORE_BACKEND", "numpy"), \
+         patch.object(settings, "NUMPY_STORE_DIR", str(tmp_path)), \
+         patch("src.core.memory.registry.EmbeddingProvider") as MockEmbed, \
+         patch("src.core.memory.registry.create_engine") as mock_create_engine:
+        MockEmbed.return_value.identity = "fake/model"
+        MockEmbed.return_value.get_embeddings.return_value = BagOfWordsEmbeddings()
+
+        mem = VectorMemory()
+        assert mem.engine is None
+        mem.store.add_documents([_doc("parse config file"), _doc("render page")], ids=["a", "b"])
+
+        results = mem.search("parse config", k=1, project="p1", mode="hybrid")
+        assert results == [("parse config file", {"project": "p1", "source_type": "code"})]
+        assert mem.delete_project("p1") == 2
+        mock_create_engine.assert_not_called()
+    reset_registry()
+
+def test_vector_rows_many_matches_single_queries(tmp_path):
+    store = _store(tmp_path)
+    store.add_documents([_doc("parse config"), _doc("render page"), _doc("kb", project=None)], ids=["a", "b", "c"])
+    queries = [store.embeddings.embed_query(q) for q in ("parse", "render page", "kb")]
+
+    batched = store.vector_rows_many(queries, k=2)
+    assert batched == [store.vector_rows(q, k=2) for q in queries]
+    assert _ids(batched[1])[0] == "b"
+    assert _ids(batched[2])[0] == "c"
+
+def test_rows_can_carry_vectors_for_mmr(tmp_path):
+    store = _store(tmp_path, dtype="float16")
+    store.add_documents([_doc("alpha beta")], ids=["a"])
+
+    row = store.vector_rows(store.embeddings.embed_query("alpha"), k=1, with_vectors=True)[0]
+    assert len(row) == 7
+    assert row[6].dtype == np.float32
+    assert np.linalg.norm(row[6]) == pytest.approx(1.0, abs=1e-3)
+    assert len(store.lexical_rows("alpha", k=1, with_vectors=True)[0]) == 7
+
+def test_two_level_search_restricts_code_chunks_to_shortlisted_files(tmp_path):
+    from src.core.memory.vector_store import VectorMemory
+    reset_registry()
+    with patch.object(settings, "VECTOR_STORE_BACKEND", "numpy"), \
+         patch.object(settings, "NUMPY_STORE_DIR", str(tmp_path)), \
+         patch("src.core.memory.registry.EmbeddingProvider") as MockEmbed:
+        MockEmbed.return_value.identity = "fake/model"
+        MockEmbed.return_value.get_embeddings.return_value = BagOfWordsEmbeddings()
+
+        mem = VectorMemory()
+        mem.store.add_documents(
+            [
+                _doc("def render(): parse template", source="/ws/view.py"),
+                _doc("def parse(): read config", source="/ws/config.py"),
+                _doc("parse guide", project=None, source_type="knowledge_base", source="kb"),
+            ],
+            ids=["view", "config", "kb"],
+        )
+        summaries = mem._file_summaries().store
+        summaries.add_documents(
+            [
+                _doc("Arquivo: view.py html page rendering", source="/ws/view.py"),
+                _doc("Arquivo: config.py config loading", source="/ws/config.py"),
+            ],
+            ids=["s-view", "s-config"],
+        )
+
+        flat = [c for c, _ in mem.search("parse config", k=3, project="p1", mode="vector")]
+        assert set(flat) == {"def render(): parse template", "def parse(): read config", "parse guide"}
+
+        results = mem.search("parse config", k=3, project="p1", mode="vector", file_shortlist=1)
+        assert sorted(m["source"] for _, m in results) == ["/ws/config.py", "kb"]
+
+        # Sem vetor da query (modo lexical) não há pré-seleção: o arquivo que casa só pelo código
+        # (o resumo de view.py não fala em "parse" nem em "config") continua sendo encontrado
+        everywhere = mem.search("parse config", k=3, project="p1", mode="lexical", file_shortlist=1)
+        assert set(c for c, _ in everywhere) == {"def render(): parse template", "def parse(): read config", "parse guide"}
+
+        assert mem.delete_project("p1") == 2
+        assert summaries.lexical_rows("config", k=5) == []
+    reset_registry()
@@ -0,0 +1,26 @@
+from unittest.mock import patch
+from src.core.memory.query_cache import TTLCache
+
+def test_lru_eviction():
+    cache = TTLCache(max_items=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+def test_entries_expire_after_ttl():
+    cache = TTLCache(max_items=10, ttl_seconds=5)
+    with patch("src.core.memory.query_cache.time.monotonic", return_value=100.0):
+        cache.set("a", 1)
+    with patch("src.core.memory.query_cache.time.monotonic", return_value=104.0):
+        assert cache.get("a") == 1
+    with patch("src.core.memory.query_cache.time.monotonic", return_value=105.0):
+        assert cache.get("a") is None
+    assert len(cache) == 0
+
+def test_disabled_when_size_or_ttl_is_zero():
+    for cache in (TTLCache(max_items=0, ttl_seconds=60), TTLCache(max_items=10, ttl_seconds=0)):
+        cache.set("a", 1)
+        assert cache.get("a") is None
@@ -0,0 +1,23 @@
+from src.core.memory.ranking import lexical_query, reciprocal_rank_fusion
+
+def test_lexical_query_builds_or_expression_from_identifiers():
+    assert lexical_query("KeyError in parse_config()") == "keyerror | in | parse_config"
+    assert lexical_query("a ! ?") is None
+
+def test_lexical_query_dedupes_and_caps_terms():
+    assert lexical_query("foo FOO foo bar", max_terms=1) == "foo"
+
+def test_reciprocal_rank_fusion_rewards_items_in_both_lists():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d"]], k=60)
+    assert fused[0] == "c"
+    assert set(fused) == {"a", "b", "c", "d"}
+
+def test_reciprocal_rank_fusion_with_single_list_keeps_order():
+    assert reciprocal_rank_fusion([["x", "y", "z"], []]) == ["x", "y", "z"]
+
+def test_cosine_similarity():
+    from src.core.memory.ranking import cosine_similarity
+    assert cosine_similarity([1.0, 0.0], [2.0, 0.0]) == 1.0
+    assert cosine_similarity([1.0, 0.0], [0.0, 3.0]) == 0.0
+    assert cosine_similarity([1.0, 0.0], None) is None
+    assert cosine_similarity([0.0, 0.0], [1.0, 0.0]) is None
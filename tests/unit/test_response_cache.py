@@ -0,0 +1,103 @@
+import os
+import time
+from unittest.mock import patch
+from pydantic import BaseModel
+from src.core.config import settings
+from src.core.llm.provider import LLMProvider
+from src.core.llm.response_cache import (
+    DiskResponseCacheStore,
+    LLMResponseCache,
+    reset_response_cache,
+    response_cache_key,
+    should_use_cache,
+)
+from src.core.memory.query_cache import TTLCache
+
+
+class Plan(BaseModel):
+    steps: list
+
+
+class OtherPlan(BaseModel):
+    steps: list
+    owner: str = ""
+
+
+def test_key_covers_every_call_parameter():
+    base = response_cache_key("local", "m", 0.1, "sys", "prompt", Plan)
+
+    assert base == response_cache_key("local", "m", 0.1, "sys", "prompt", Plan)
+    variants = [
+        response_cache_key("google", "m", 0.1, "sys", "prompt", Plan),
+        response_cache_key("local", "m2", 0.1, "sys", "prompt", Plan),
+        response_cache_key("local", "m", 0.5, "sys", "prompt", Plan),
+        response_cache_key("local", "m", 0.1, None, "prompt", Plan),
+        response_cache_key("local", "m", 0.1, "sys", "prompt!", Plan),
+        response_cache_key("local", "m", 0.1, "sys", "prompt", OtherPlan),
+        response_cache_key("local", "m", 0.1, "sys", "prompt"),
+    ]
+    assert base not in variants
+    assert len(set(variants)) == len(variants)
+
+
+def test_should_use_cache_policy():
+    with patch.object(settings, "LLM_CACHE_ENABLED", True), patch.object(settings, "LLM_CACHE_MAX_TEMPERATURE", 0.2):
+        assert should_use_cache(0.1)
+        assert not should_use_cache(0.7)
+        assert should_use_cache(0.7, cache=True)
+        assert not should_use_cache(0.1, cache=False)
+    with patch.object(settings, "LLM_CACHE_ENABLED", False):
+        assert not should_use_cache(0.0, cache=True)
+
+
+def test_structured_values_round_trip_as_fresh_instances(tmp_path):
+    store = DiskResponseCacheStore(str(tmp_path), ttl_seconds=60, max_bytes=0)
+    cache = LLMResponseCache(TTLCache(10, 60), store)
+    cache.set("k", Plan(steps=["a"]))
+
+    first = cache.get("k", Plan)
+    first.steps.append("mutated")
+    assert cache.get("k", Plan) == Plan(steps=["a"])
+
+    # Hit do disco com a memória vazia (ex: outro processo)
+    assert LLMResponseCache(TTLCache(10, 60), store).get("k", Plan) == Plan(steps=["a"])
+
+
+def test_disk_store_expires_and_evicts_least_recently_used(tmp_path):
+    expired = DiskResponseCacheStore(str(tmp_path / "ttl"), ttl_seconds=-1, max_bytes=0)
+    expired.set("a" * 64, {"type": "text", "value": "x"})
+    assert expired.get("a" * 64) is None
+
+    store = DiskResponseCacheStore(str(tmp_path / "lru"), ttl_seconds=60, max_bytes=400)
+    keys = [f"{i:064x}" for i in range(4)]
+    for i, key in enumerate(keys):
+        store.set(key, {"type": "text", "value": "v" * 100})
+        os.utime(store._path(key), (time.time() - 100 + i, time.time() - 100 + i))
+        if i == 0:
+            # Leitura recente: a primeira chave passa a ser a mais recentemente usada
+            store.get(key)
+
+    assert store.get(keys[0]) is not None
+    assert store.get(keys[1]) is None
+    assert sum(size for _, size, _ in store._files()) <= 400
+
+
+def test_generate_response_serves_repeated_calls_from_cache():
+    reset_response_cache()
+    with patch.object(settings, "LLM_CACHE_ENABLED", True), \
+         patch.object(settings, "LLM_CACHE_BACKEND", "memory"), \
+         patch('src.core.llm.provider.get_strategy_memory', return_value=None), \
+         patch('src.core.llm.clients.local_openai.get_http_transport') as mock_get_transport:
+        mock_get_transport.return_value.post_json.return_value = {
+            "choices": [{"message": {"content": '{"steps": ["a", "b"]}'}}]
+        }
+        provider = LLMProvider(model_name="test-local", base_url="http://localhost:1234", provider="local")
+
+        first = provider.generate_response("Plan it", schema=Plan)
+        second = provider.generate_response("Plan it", schema=Plan)
+        provider.generate_response("Plan it", schema=Plan, cache=False)
+
+    reset_response_cache()
+    assert first == second == Plan(steps=["a", "b"])
+    # Uma chamada real para as duas primeiras; cache=False ignora o cache
+    assert mock_get_transport.return_value.post_json.call_count == 2
@@ -0,0 +1,137 @@
+import json
+import time
+import urllib.error
+from unittest.mock import patch
+from pydantic import BaseModel
+from src.core.llm.provider import LLMProvider
+from src.core.llm.structured_strategy import STRATEGY_MANUAL, STRATEGY_NATIVE, StructuredStrategyMemory
+
+
+class Verdict(BaseModel):
+    approved: bool
+
+
+class Plan(BaseModel):
+    steps: list
+
+
+def test_manual_strategy_skips_native_until_reprobe(tmp_path):
+    path = str(tmp_path / "strategies.json")
+    memory = StructuredStrategyMemory(path, reprobe_seconds=3600)
+
+    assert memory.should_try_native("local", "m", Verdict)
+    memory.record("local", "m", Verdict, STRATEGY_MANUAL)
+    assert not memory.should_try_native("local", "m", Verdict)
+    # Outro schema ou modelo não é afetado
+    assert memory.should_try_native("local", "m", Plan)
+    assert memory.should_try_native("local", "other", Verdict)
+
+    # Persistido entre processos
+    assert not StructuredStrategyMemory(path, reprobe_seconds=3600).should_try_native("local", "m", Verdict)
+
+    # Passado o intervalo de re-probe, a nativa volta a ser tentada
+    with patch("src.core.llm.structured_strategy.time.time", return_value=time.time() + 3601):
+        assert memory.should_try_native("local", "m", Verdict)
+
+    memory.record("local", "m", Verdict, STRATEGY_NATIVE)
+    assert memory.should_try_native("local", "m", Verdict)
+    with open(path, encoding="utf-8") as f:
+        assert [entry["strategy"] for entry in json.load(f)["strategies"].values()] == [STRATEGY_NATIVE]
+
+
+def test_corrupted_file_is_ignored(tmp_path):
+    path = tmp_path / "strategies.json"
+    path.write_text("{not json")
+
+    assert StructuredStrategyMemory(str(path), reprobe_seconds=3600).should_try_native("local", "m", Verdict)
+
+
+def test_provider_goes_straight_to_manual_parsing_after_native_failure(tmp_path):
+    memory = StructuredStrategyMemory(str(tmp_path / "strategies.json"), reprobe_seconds=3600)
+
+    def fake_post_json(url, payload, headers):
+        if "response_format" in payload:
+            # Servidor sem suporte a json_schema: texto livre em vez do objeto
+            return {"choices": [{"message": {"content": "Sure, approved!"}}]}
+        return {"choices": [{"message": {"content": 'Here: {"approved": true}'}}]}
+
+    with patch('src.core.llm.provider.get_strategy_memory', return_value=memory), \
+         patch('src.core.llm.clients.local_openai.get_http_transport') as mock_get_transport:
+        post_json = mock_get_transport.return_value.post_json
+        post_json.side_effect = fake_post_json
+        provider = LLMProvider(model_name="test-local", base_url="http://localhost:1234", provider="local")
+
+        first = provider.generate_response("Review", schema=Verdict, cache=False)
+        calls_after_first = post_json.call_count
+        second = provider.generate_response("Review again", schema=Verdict, cache=False)
+
+    assert first == second == Verdict(approved=True)
+    assert calls_after_first == 2
+    # Segunda chamada: só o Plano C, sem a tentativa nativa perdida
+    assert post_json.call_count == 3
+    assert "response_format" not in post_json.call_args[0][1]
+
+
+def test_skipped_native_output_reserves_no_google_key(tmp_path):
+    memory = StructuredStrategyMemory(str(tmp_path / "strategies.json"), reprobe_seconds=3600)
+    memory.record("google", "test-google", Verdict, STRATEGY_MANUAL)
+
+    with patch('src.core.llm.provider.get_strategy_memory', return_value=memory), \
+         patch('src.core.llm.provider.key_manager') as mock_key_manager, \
+         patch('src.core.llm.provider.ChatGoogleGenerativeAI') as mock_chat_google:
+        mock_chat_google.return_value.invoke.return_value.content = '{"approved": false}'
+        provider = LLMProvider(model_name="test-google", provider="google")
+        mock_key_manager.reset_mock()
+
+        assert provider.generate_response("Review", schema=Verdict, cache=False) == Verdict(approved=False)
+
+    # Só a chave do Plano C: nenhuma vaga do rate limit gasta com a instância nativa não usada
+    mock_key_manager.get_next_key.assert_called_once()
+    mock_chat_google.return_value.with_structured_output.assert_not_called()
+
+
+def test_transport_errors_of_native_output_are_not_remembered(tmp_path):
+    memory = StructuredStrategyMemory(str(tmp_path / "strategies.json"), reprobe_seconds=3600)
+
+    def fake_post_json(url, payload, headers):
+        if "response_format" in payload:
+            raise urllib.error.HTTPError(url, 429, "Too Many Requests", {}, None)
+        return {"choices": [{"message": {"content": '{"approved": true}'}}]}
+
+    with patch('src.core.llm.provider.get_strategy_memory', return_value=memory), \
+         patch('src.core.llm.clients.local_openai.get_http_transport') as mock_get_transport:
+        mock_get_transport.return_value.post_json.side_effect = fake_post_json
+        provider = LLMProvider(model_name="test-local", base_url="http://localhost:1234", provider="local")
+        assert provider.generate_response("Review", schema=Verdict, cache=False) == Verdict(approved=True)
+
+    with patch('src.core.llm.provider.get_strategy_memory', return_value=memory), \
+         patch('src.core.llm.provider.key_manager'), \
+         patch('src.core.llm.provider.ChatGoogleGenerativeAI') as mock_chat_google:
+        mock_chat_google.return_value.with_structured_output.return_value.invoke.side_effect = TimeoutError("read timed out")
+        mock_chat_google.return_value.invoke.return_value.content = '{"approved": true}'
+        provider = LLMProvider(model_name="test-google", provider="google")
+        assert provider.generate_response("Review", schema=Verdict, cache=False) == Verdict(approved=True)
+
+    # Falha de transporte/rate limit não diz nada sobre o suporte à saída nativa
+    assert memory.should_try_native("local", "test-local", Verdict)
+    assert memory.should_try_native("google", "test-google", Verdict)
+
+
+def test_rejected_response_format_is_remembered_per_endpoint(tmp_path):
+    memory = StructuredStrategyMemory(str(tmp_path / "strategies.json"), reprobe_seconds=3600)
+
+    def fake_post_json(url, payload, headers):
+        if "response_format" in payload:
+            # Servidor que não aceita json_schema: 400 em vez de uma resposta
+            raise urllib.error.HTTPError(url, 400, "'response_format.type' must be 'json_object' or 'text'", {}, None)
+        return {"choices": [{"message": {"content": '{"approved": true}'}}]}
+
+    with patch('src.core.llm.provider.get_strategy_memory', return_value=memory), \
+         patch('src.core.llm.clients.local_openai.get_http_transport') as mock_get_transport:
+        mock_get_transport.return_value.post_json.side_effect = fake_post_json
+        provider = LLMProvider(model_name="test-local", base_url="http://localhost:1234", provider="local")
+        assert provider.generate_response("Review", schema=Verdict, cache=False) == Verdict(approved=True)
+
+    assert not memory.should_try_native("local", "test-local", Verdict, base_url="http://localhost:1234/")
+    # Outro servidor com o mesmo nome de modelo continua tentando a saída nativa
+    assert memory.should_try_native("local", "test-local", Verdict, base_url="http://ollama:11434")
@@ -0,0 +1,55 @@
+from src.core.memory.manifest import IndexManifest
+from src.core.memory.symbol_index import SymbolIndex, get_symbol_index
+
+FILES = {
+    "app/services.py": {
+        "symbols": [
+            ["UserService", "class", 10, 40],
+            ["UserService.get_user", "method", 12, 20],
+            ["create_app", "function", 42, 50],
+        ]
+    },
+    "app/routes.py": {"symbols": [["GET /users", "route", 3, 8], ["list_users", "function", 4, 8]]},
+    "README.md": {"chunk_ids": []},
+}
+
+
+def test_exact_lookup_with_file_and_lines():
+    index = SymbolIndex(FILES)
+
+    assert len(index) == 5
+    [definition] = index.lookup("UserService")
+    assert (definition.path, definition.start_line, definition.end_line, definition.kind) == ("app/services.py", 10, 40, "class")
+    assert definition.describe() == "UserService [class] app/services.py:10-40"
+    assert index.lookup("GET /users")[0].path == "app/routes.py"
+
+
+def test_method_short_name_case_insensitive_fallback_and_kind_filter():
+    index = SymbolIndex(FILES)
+
+    assert [d.name for d in index.lookup("get_user")] == ["UserService.get_user"]
+    assert [d.name for d in index.lookup("userservice")] == ["UserService"]
+    assert index.lookup("UserService", kind="function") == []
+    assert index.lookup("missing") == []
+
+
+def test_mentioned_in_only_matches_code_like_names():
+    index = SymbolIndex(FILES)
+    text = "Add pagination to list_users and reuse UserService; the create_app factory and `GET /users` stay. Get user data."
+
+    assert [d.name for d in index.mentioned_in(text)] == ["list_users", "UserService", "create_app", "GET /users"]
+    assert index.mentioned_in(text, limit=1)[0].name == "list_users"
+
+
+def test_index_is_rebuilt_only_when_the_index_version_changes(tmp_path):
+    manifest = IndexManifest(str(tmp_path), "col", state_dir=str(tmp_path / "state"))
+    manifest.update("a.py", 1, 0.0, "x", [], [["alpha", "function", 1, 2]])
+    manifest.bump_version()
+
+    first = get_symbol_index(manifest)
+    assert get_symbol_index(manifest) is first
+
+    manifest.update("b.py", 1, 0.0, "y", [], [["beta", "function", 1, 2]])
+    assert get_symbol_index(manifest) is first
+    manifest.bump_version()
+    assert get_symbol_index(manifest).lookup("beta")[0].path == "b.py"
@@ -0,0 +1,100 @@
+from unittest.mock import MagicMock, patch
+from src.core.memory.schema import ensure_vector_index, ensure_partition_columns, index_query_settings, detect_embedding_dimension, get_pgvector_version
+from src.core.config import settings
+
+def test_index_query_settings_hnsw_never_below_k():
+    with patch.object(settings, "VECTOR_INDEX_TYPE", "hnsw"), \
+         patch.object(settings, "VECTOR_SEARCH_EF_SEARCH", 40):
+        assert index_query_settings(k=5) == ["SET LOCAL hnsw.ef_search = 40"]
+        assert index_query_settings(k=100) == ["SET LOCAL hnsw.ef_search = 100"]
+        assert index_query_settings(k=5, ef_search=200) == ["SET LOCAL hnsw.ef_search = 200"]
+        # Limite do pgvector: ef_search acima de 1000 faz a consulta falhar
+        assert index_query_settings(k=5000) == ["SET LOCAL hnsw.ef_search = 1000"]
+        assert index_query_settings(k=5, ef_search=4000) == ["SET LOCAL hnsw.ef_search = 1000"]
+
+def test_index_query_settings_none():
+    with patch.object(settings, "VECTOR_INDEX_TYPE", "none"):
+        assert index_query_settings(k=5, ef_search=10, probes=3) == []
+
+def test_index_query_settings_iterative_scan_only_for_filtered_queries():
+    with patch.object(settings, "VECTOR_INDEX_TYPE", "hnsw"), \
+         patch.object(settings, "VECTOR_SEARCH_ITERATIVE_SCAN", "relaxed_order"):
+        assert "SET LOCAL hnsw.iterative_scan = relaxed_order" in index_query_settings(k=5, filtered=True)
+        assert len(index_query_settings(k=5)) == 1
+
+def test_index_query_settings_auto_iterative_scan_depends_on_pgvector_version():
+    with patch.object(settings, "VECTOR_INDEX_TYPE", "hnsw"), \
+         patch.object(settings, "VECTOR_SEARCH_EF_SEARCH", 40), \
+         patch.object(settings, "VECTOR_SEARCH_ITERATIVE_SCAN", "auto"), \
+         patch.object(settings, "VECTOR_SEARCH_FILTERED_MULTIPLIER", 4):
+        assert index_query_settings(k=5, filtered=True, pgvector_version=(0, 8, 0)) == [
+            "SET LOCAL hnsw.ef_search = 40",
+            "SET LOCAL hnsw.iterative_scan = relaxed_order",
+        ]
+        # pgvector antigo (ou versão desconhecida): o filtro corta candidatos, então ef_search é ampliado
+        assert index_query_settings(k=5, filtered=True, pgvector_version=(0, 7, 4)) == ["SET LOCAL hnsw.ef_search = 160"]
+        assert index_query_settings(k=5, ef_search=400, filtered=True) == ["SET LOCAL hnsw.ef_search = 1000"]
+        assert index_query_settings(k=5, pgvector_version=(0, 7, 4)) == ["SET LOCAL hnsw.ef_search = 40"]
+    with patch.object(settings, "VECTOR_INDEX_TYPE", "ivfflat"), \
+         patch.object(settings, "VECTOR_SEARCH_PROBES", 10), \
+         patch.object(settings, "VECTOR_SEARCH_ITERATIVE_SCAN", "auto"), \
+         patch.object(settings, "VECTOR_SEARCH_FILTERED_MULTIPLIER", 4):
+        assert index_query_settings(k=5, filtered=True) == ["SET LOCAL ivfflat.probes = 40"]
+
+def test_get_pgvector_version():
+    engine = MagicMock()
+    conn = engine.connect.return_value.__enter__.return_value
+    conn.execute.return_value.fetchone.return_value = ("0.8.0",)
+    assert get_pgvector_version(engine) == (0, 8, 0)
+
+    conn.execute.return_value.fetchone.return_value = None
+    assert get_pgvector_version(engine) is None
+    conn.execute.side_effect = RuntimeError("sem permissão")
+    assert get_pgvector_version(engine) is None
+
+def test_ensure_partition_columns_migrates_legacy_table():
+    engine = MagicMock()
+    conn = engine.connect.return_value.__enter__.return_value
+    conn.execute.return_value = [("langchain_id",), ("content",), ("embedding",), ("cmetadata",)]
+
+    assert ensure_partition_columns(engine, "code_collection") is True
+    statements = [str(c.args[0]) for c in conn.execute.call_args_list]
+    assert "ALTER TABLE code_collection ADD COLUMN IF NOT EXISTS project TEXT" in statements
+    assert "ALTER TABLE code_collection ADD COLUMN IF NOT EXISTS source_type TEXT" in statements
+    assert any("code_collection_project_source_idx" in s for s in statements)
+
+def test_ensure_partition_columns_noop_on_current_schema():
+    engine = MagicMock()
+    conn = engine.connect.return_value.__enter__.return_value
+    conn.execute.return_value = [("cmetadata",), ("project",), ("source_type",)]
+
+    assert ensure_partition_columns(engine, "code_collection") is False
+    statements = [str(c.args[0]) for c in conn.execute.call_args_list]
+    assert not any("ALTER TABLE" in s for s in statements)
+
+def test_ensure_vector_index_hnsw_statement():
+    engine = MagicMock()
+    conn = engine.connect.return_value.__enter__.return_value
+    with patch.object(settings, "VECTOR_INDEX_TYPE", "hnsw"), \
+         patch.object(settings, "VECTOR_INDEX_HNSW_M", 24), \
+         patch.object(settings, "VECTOR_INDEX_HNSW_EF_CONSTRUCTION", 128):
+        ensure_vector_index(engine, "code_collection", 768)
+
+    statement = str(conn.execute.call_args[0][0])
+    assert "CREATE INDEX IF NOT EXISTS code_collection_embedding_hnsw_idx" in statement
+    assert "USING hnsw (embedding vector_cosine_ops)" in statement
+    assert "m = 24, ef_construction = 128" in statement
+
+def test_ensure_vector_index_skips_oversized_dimension():
+    engine = MagicMock()
+    with patch.object(settings, "VECTOR_INDEX_TYPE", "hnsw"):
+        ensure_vector_index(engine, "code_collection", 3072)
+    engine.connect.assert_not_called()
+
+def test_detect_embedding_dimension_prefers_setting():
+    embeddings = MagicMock()
+    embeddings.embed_query.return_value = [0.0] * 768
+    with patch.object(settings, "EMBEDDING_DIMENSION", None):
+        assert detect_embedding_dimension(embeddings) == 768
+    with patch.object(settings, "EMBEDDING_DIMENSION", 1024):
+        assert detect_embedding_dimension(embeddings) == 1024